@@ -0,0 +1,132 @@
+import io
+import wave
+
+import numpy as np
+
+from transcription import SAMPLE_RATE
+
+try:
+    import opuslib  # Optional: only needed for clients that send Opus frames
+except Exception:  # ImportError, or opuslib's own error when libopus itself is missing
+    opuslib = None
+
+
+# Sample rates a client (query parameter) or WAV header may claim; anything else is rejected
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+
+class UnsupportedAudio(Exception):
+    """Raised when an uploaded chunk can't be decoded."""
+
+
+class InvalidSampleRate(UnsupportedAudio):
+    """Raised for a sample rate outside MIN_SAMPLE_RATE..MAX_SAMPLE_RATE."""
+
+
+def check_sample_rate(rate) -> int:
+    if isinstance(rate, bool) or not isinstance(rate, (int, np.integer)) or not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+        raise InvalidSampleRate(f"Sample rate must be an integer between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE} Hz, got {rate!r}")
+    return int(rate)
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int = SAMPLE_RATE) -> np.ndarray:
+    # Linear interpolation is plenty for speech going into whisper
+    check_sample_rate(from_rate)
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / from_rate
+    target = np.linspace(0, duration, int(duration * to_rate), endpoint=False)
+    source = np.arange(len(samples)) / from_rate
+    return np.interp(target, source, samples).astype(np.float32)
+
+
+def decode_pcm16(data: bytes, sample_rate: int = SAMPLE_RATE, channels: int = 1, big_endian: bool = False) -> np.ndarray:
+    # Raw 16-bit PCM (little endian unless big_endian) -> mono float32 at 16 kHz
+    if len(data) % (2 * channels):
+        raise UnsupportedAudio("PCM chunk length is not a whole number of 16-bit frames")
+    samples = np.frombuffer(data, dtype=">i2" if big_endian else "<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, sample_rate)
+
+
+def content_type_params(content_type: str) -> dict:
+    # "audio/L16; rate=8000; channels=2" -> {"rate": "8000", "channels": "2"}
+    params = {}
+    for part in (content_type or "").split(";")[1:]:
+        name, _, value = part.partition("=")
+        params[name.strip().lower()] = value.strip().strip('"')
+    return params
+
+
+def decode_l16(data: bytes, content_type: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    # audio/L16 is big endian (RFC 2586); its rate= and channels= parameters win over the query string
+    params = content_type_params(content_type)
+    try:
+        rate = int(params.get("rate", sample_rate))
+        channels = int(params.get("channels", 1))
+    except ValueError:
+        raise UnsupportedAudio(f"Invalid audio/L16 parameters: {content_type}")
+    if not 1 <= channels <= 8:
+        raise UnsupportedAudio(f"Unsupported audio/L16 channel count: {channels}")
+    return decode_pcm16(data, rate, channels, big_endian=True)
+
+
+def decode_wav(data: bytes) -> np.ndarray:
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudio(f"Invalid WAV data: {e}")
+
+    if width == 2:
+        return decode_pcm16(frames, rate, channels)
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise UnsupportedAudio(f"Unsupported WAV sample width: {width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+class OpusFrameDecoder:
+    """Decodes a stream of raw Opus packets (one per message) for a single session."""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = 1):
+        if opuslib is None:
+            raise UnsupportedAudio("Opus audio requires the opuslib package")
+        self.channels = channels
+        try:
+            self._decoder = opuslib.Decoder(sample_rate, channels)
+        except Exception as e:
+            raise UnsupportedAudio(f"Can't create Opus decoder: {e}")
+
+    def decode(self, packet: bytes) -> np.ndarray:
+        # 120 ms is the largest Opus frame; a corrupt packet is the client's problem, not a server error
+        try:
+            pcm = self._decoder.decode(packet, frame_size=SAMPLE_RATE * 120 // 1000)
+        except Exception as e:
+            raise UnsupportedAudio(f"Invalid Opus packet: {e}")
+        return decode_pcm16(pcm, SAMPLE_RATE, self.channels)
+
+
+def decode_chunk(data: bytes, content_type: str, sample_rate: int = SAMPLE_RATE, opus: OpusFrameDecoder = None) -> np.ndarray:
+    # Picks a decoder from the chunk's content type; everything stays in memory.
+    # audio/pcm (and untyped bodies) is little endian 16-bit PCM, what browsers and pyaudio produce.
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("audio/wav", "audio/x-wav", "audio/wave"):
+        return decode_wav(data)
+    if media_type == "audio/l16":
+        return decode_l16(data, content_type, sample_rate)
+    if media_type in ("audio/pcm", "application/octet-stream", ""):
+        return decode_pcm16(data, sample_rate)
+    if media_type == "audio/opus":
+        return (opus or OpusFrameDecoder()).decode(data)
+    raise UnsupportedAudio(f"Unsupported audio content type: {media_type}")
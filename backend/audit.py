@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class AuditSink:
+    """Buffers audit events in memory and writes them to Supabase in bulk from a background thread."""
+
+    def __init__(
+        self,
+        client=None,
+        table: str = "audit_logs",
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        max_retries: int = 3,
+        spill_path: str = "audit_spill.jsonl",
+        client_factory: Optional[Callable[[], object]] = None,
+    ):
+        # client_factory defers creating the Supabase client until the first batch is written
+        self._client = client
+        self._client_factory = client_factory
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spill_path = spill_path
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        # A replay interrupted by a crash leaves its events in the .replay file; requeue them on disk
+        replay_path = self.spill_path + ".replay"
+        if os.path.exists(replay_path):
+            with self._spill_lock, open(replay_path, "r", encoding="utf-8") as src, open(self.spill_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(replay_path)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: dict):
+        # Never block the request; if the buffer is full the event goes straight to disk
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logging.warning("Audit buffer full, spilling event to disk")
+            self._spill([event])
+
+    def stop(self, timeout: float = 10.0):
+        # Signal the worker and wait for it to drain whatever is still buffered
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        # Anything left (worker stuck or never started) still has to be persisted
+        leftover = self._drain_queue(self._queue.qsize())
+        if leftover:
+            self._flush(leftover)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                batch = self._next_batch()
+                if batch:
+                    if self._flush(batch):
+                        self._replay_spill()
+            except Exception:
+                # Keep the writer alive; a dead thread would silently stop persisting audit events
+                logging.exception("Audit writer iteration failed")
+                time.sleep(self.flush_interval)
+
+    def _next_batch(self) -> List[dict]:
+        # Collect up to batch_size events, or whatever arrived within flush_interval
+        batch: List[dict] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            if self._stop.is_set():
+                batch.extend(self._drain_queue(self.batch_size - len(batch)))
+                break
+        return batch
+
+    def _drain_queue(self, limit: int) -> List[dict]:
+        items: List[dict] = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, batch: List[dict]) -> bool:
+        # Bulk insert with exponential backoff; spill to disk if Supabase stays unreachable
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.client.table(self.table).insert(batch).execute()
+                return True
+            except Exception as e:
+                logging.warning(f"Audit flush failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+        self._spill(batch)
+        return False
+
+    def _spill(self, events: List[dict]) -> bool:
+        try:
+            lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            return True
+        except Exception as e:
+            # Last resort: keep the events in the server log so they can be recovered by hand
+            logging.error(f"Failed to spill audit events to {self.spill_path}: {e} | {events}")
+            return False
+
+    def _replay_spill(self):
+        # Once Supabase is reachable again, push previously spilled events back up
+        if not os.path.exists(self.spill_path):
+            return
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if os.path.exists(replay_path):
+                return
+            os.replace(self.spill_path, replay_path)
+
+        # A crash while spilling leaves a partial last line; set undecodable lines aside instead of aborting
+        events, corrupt = [], []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            with open(self.spill_path + ".corrupt", "a", encoding="utf-8") as f:
+                f.writelines(corrupt)
+            logging.warning(f"Skipped {len(corrupt)} undecodable spilled audit lines (kept in {self.spill_path}.corrupt)")
+
+        for i in range(0, len(events), self.batch_size):
+            chunk = events[i:i + self.batch_size]
+            try:
+                self.client.table(self.table).insert(chunk).execute()
+            except Exception as e:
+                logging.warning(f"Audit spill replay failed after {i} of {len(events)} events, keeping the rest on disk: {e}")
+                # The .replay file is only dropped once the remainder is safely back in the spill file
+                if self._spill(events[i:]):
+                    os.remove(replay_path)
+                return
+        os.remove(replay_path)
+        logging.info(f"Replayed {len(events)} spilled audit events")
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import jwt
+
+from http_client import HttpClient
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+
+class InvalidToken(Exception):
+    """Raised when a bearer token fails verification."""
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally: signature, expiry, audience and issuer.
+
+    Asymmetric tokens are checked against Supabase's JWKS, which is cached and refreshed in the
+    background (and on an unknown kid, at most once per min_refresh_interval). Projects still on the
+    legacy shared secret can set jwt_secret for HS256. Verified tokens are remembered in an LRU until
+    they expire, so repeat requests with the same token skip the signature check entirely.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        http: HttpClient,
+        audience: str = "authenticated",
+        issuer: Optional[str] = None,
+        jwt_secret: Optional[str] = None,
+        refresh_interval: float = 600.0,
+        min_refresh_interval: float = 30.0,
+        cache_size: int = 10000,
+        leeway: float = 30.0,
+    ):
+        self.jwks_url = jwks_url
+        self.http = http
+        self.audience = audience
+        self.issuer = issuer
+        self.jwt_secret = jwt_secret
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.cache_size = cache_size
+        self.leeway = leeway
+        self._keys: Dict[str, object] = {}
+        self._keys_fetched_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._verified: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.verifications = 0
+        self.failures = 0
+
+    async def start(self):
+        # The first fetch happens in the background so a slow or unreachable Supabase doesn't hold up startup;
+        # a request that arrives before it finishes fetches the keys itself (unknown kid)
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    @property
+    def ready(self) -> bool:
+        return self._keys_fetched_at > 0 or self.jwt_secret is not None
+
+    def stop(self):
+        if self._refresher:
+            self._refresher.cancel()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_keys()
+            except Exception as e:
+                logging.warning(f"JWKS refresh failed, keeping {len(self._keys)} cached keys: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh_keys(self):
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Another request may have refreshed while we waited for the lock
+            if time.monotonic() - self._keys_fetched_at < self.min_refresh_interval and self._keys:
+                return
+            response = await self.http.get(self.jwks_url)
+            response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get("keys", []):
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK(jwk).key
+                except jwt.PyJWTError as e:
+                    logging.warning(f"Skipping unusable JWKS key {jwk.get('kid')}: {e}")
+            self._keys = keys
+            self._keys_fetched_at = time.monotonic()
+
+    async def _signing_key(self, kid: Optional[str]):
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._keys_fetched_at >= self.min_refresh_interval:
+            # Supabase may have rotated keys since our last refresh
+            await self.refresh_keys()
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+        return key
+
+    @staticmethod
+    def _fingerprint(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    async def verify(self, token: str) -> dict:
+        fingerprint = self._fingerprint(token)
+        now = time.time()
+        with self._lock:
+            if fingerprint in self._revoked:
+                raise InvalidToken("Token has been revoked")
+            cached = self._verified.get(fingerprint)
+            if cached and cached[1] > now:
+                self._verified.move_to_end(fingerprint)
+                self.cache_hits += 1
+                return cached[0]
+
+        try:
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get("alg")
+            if algorithm == "HS256" and self.jwt_secret:
+                key = self.jwt_secret
+            elif algorithm in ASYMMETRIC_ALGORITHMS:
+                key = await self._signing_key(header.get("kid"))
+            else:
+                raise InvalidToken(f"Unsupported token algorithm: {algorithm}")
+
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"]},
+            )
+        except InvalidToken:
+            self.failures += 1
+            raise
+        except jwt.PyJWTError as e:
+            self.failures += 1
+            raise InvalidToken(str(e))
+
+        with self._lock:
+            self.verifications += 1
+            self._verified[fingerprint] = (claims, claims["exp"])
+            self._verified.move_to_end(fingerprint)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return claims
+
+    def revoke(self, token: str, claims: Optional[dict] = None):
+        # After logout the token is rejected locally until it would have expired anyway
+        fingerprint = self._fingerprint(token)
+        now = time.time()
+        with self._lock:
+            self._verified.pop(fingerprint, None)
+            self._revoked[fingerprint] = (claims or {}).get("exp", now + 3600)
+            for key, exp in list(self._revoked.items()):
+                if exp < now:
+                    del self._revoked[key]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "cached_tokens": len(self._verified),
+                "revoked_tokens": len(self._revoked),
+                "signing_keys": len(self._keys),
+                "cache_hits": self.cache_hits,
+                "verifications": self.verifications,
+                "failures": self.failures,
+            }
@@ -0,0 +1,54 @@
+"""
+Local stand-in for the Hugging Face inference router with configurable latency and error rate.
+Requests with "stream": true get text-generation-inference style SSE tokens, the first after
+BENCH_HF_FIRST_TOKEN_MS and the rest spread over the remaining latency. Point the app at it with
+HF_API_BASE, e.g.:
+
+    BENCH_HF_LATENCY_MS=800 uvicorn bench.fake_hf:app --port 54322
+"""
+import asyncio
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("BENCH_HF_LATENCY_MS", "800"))
+JITTER_MS = float(os.getenv("BENCH_HF_JITTER_MS", "200"))
+ERROR_RATE = float(os.getenv("BENCH_HF_ERROR_RATE", "0"))  # fraction of calls answered with a 503
+FIRST_TOKEN_MS = float(os.getenv("BENCH_HF_FIRST_TOKEN_MS", "150"))
+
+app = FastAPI()
+calls = {"total": 0, "errors": 0}
+
+
+@app.post("/hf-inference/models/{model_id:path}")
+async def summarize(model_id: str, request: Request):
+    payload = await request.json()
+    calls["total"] += 1
+    latency = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000.0
+    # Echo a short, deterministic "summary" of the prompt
+    words = payload.get("inputs", "").split()[-40:]
+    if payload.get("stream"):
+        return StreamingResponse(_tokens(words, latency), media_type="text/event-stream")
+    await asyncio.sleep(latency)
+    if random.random() < ERROR_RATE:
+        calls["errors"] += 1
+        return JSONResponse({"error": "Model is currently loading", "estimated_time": 2.0}, status_code=503)
+    return [{"summary_text": " ".join(words)}]
+
+
+async def _tokens(words, latency: float):
+    first = min(latency, FIRST_TOKEN_MS / 1000.0)
+    await asyncio.sleep(first)
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep((latency - first) / len(words))
+        token = {"text": (" " if i else "") + word, "special": False}
+        yield f"data: {json.dumps({'token': token, 'generated_text': None})}\n\n"
+
+
+@app.get("/__stats")
+def stats():
+    return calls
@@ -0,0 +1,236 @@
+"""
+Local stand-in for Supabase's REST and auth endpoints, backed by a SQLite file from bench/synthea.py.
+
+It understands the subset of PostgREST the backend uses (select, eq/neq/gt/gte/lt/lte/like/ilike/in/is
+filters, or=/and() groups, order, limit/offset and inserts), and adds a configurable per-request latency
+so the numbers resemble a hosted database. Run it with:
+
+    BENCH_DB=bench.db BENCH_DB_LATENCY_MS=15 uvicorn bench.fake_supabase:app --port 54321
+"""
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from bench.synthea import GENERATED_ID_TABLES, TABLES, create_schema
+
+DB_PATH = os.getenv("BENCH_DB", "bench.db")
+LATENCY_MS = float(os.getenv("BENCH_DB_LATENCY_MS", "15"))
+JITTER_MS = float(os.getenv("BENCH_DB_JITTER_MS", "5"))
+
+IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "or", "and", "columns", "on_conflict"}
+
+app = FastAPI()
+_local = threading.local()
+requests_by_table: Counter = Counter()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_schema(conn)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _columns(table: str) -> List[str]:
+    if table not in TABLES:
+        raise HTTPException(status_code=404, detail={"code": "42P01", "message": f'relation "public.{table}" does not exist'})
+    return (["id"] if table in GENERATED_ID_TABLES else []) + TABLES[table]
+
+
+def _column(table: str, name: str) -> str:
+    if name not in _columns(table):
+        raise HTTPException(status_code=400, detail={"code": "42703", "message": f"column {table}.{name} does not exist"})
+    return f'"{name}"'
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _split_top_level(text: str) -> List[str]:
+    # Split on commas that are outside quotes and parentheses
+    parts, depth, quoted, current, i = [], 0, False, [], 0
+    while i < len(text):
+        c = text[i]
+        if quoted and c == "\\" and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if c == '"':
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and c == ",":
+            parts.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(c)
+        i += 1
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _condition(table: str, column: str, expression: str) -> Tuple[str, list]:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+    sql_column = _column(table, column)
+    if op == "in":
+        values = [_unquote(v) for v in _split_top_level(value.strip("()"))]
+        sql, params = f"{sql_column} IN ({','.join('?' for _ in values)})", values
+    elif op == "is":
+        sql, params = f"{sql_column} IS {'NULL' if value == 'null' else _unquote(value).upper()}", []
+    elif op in OPERATORS:
+        value = _unquote(value)
+        if op in ("like", "ilike"):
+            value = value.replace("*", "%")
+        sql, params = f"{sql_column} {OPERATORS[op]} ?", [value]
+    else:
+        raise HTTPException(status_code=400, detail={"code": "PGRST100", "message": f"unsupported operator {op}"})
+    return (f"NOT ({sql})" if negate else sql), params
+
+
+def _group(table: str, joiner: str, body: str) -> Tuple[str, list]:
+    # body is the inside of or=(...) / and(...): comma separated conditions or nested groups
+    clauses, params = [], []
+    for part in _split_top_level(body):
+        match = re.match(r"^(and|or)\((.*)\)$", part)
+        if match:
+            sql, p = _group(table, match.group(1).upper(), match.group(2))
+        else:
+            column, _, expression = part.partition(".")
+            sql, p = _condition(table, column, expression)
+        clauses.append(f"({sql})")
+        params.extend(p)
+    return f" {joiner} ".join(clauses), params
+
+
+async def _simulate_latency():
+    delay = LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000.0)
+
+
+def _select(table: str, query_params) -> List[dict]:
+    select = query_params.get("select", "*")
+    if select.strip() == "*":
+        columns = "*"
+    else:
+        names = [c.strip() for c in select.split(",") if c.strip()]
+        columns = ", ".join(_column(table, c) for c in names if IDENT_RE.match(c))
+
+    where, params = [], []
+    for key, value in query_params.multi_items():
+        if key == "or":
+            sql, p = _group(table, "OR", value.strip()[1:-1])
+        elif key == "and":
+            sql, p = _group(table, "AND", value.strip()[1:-1])
+        elif key in RESERVED_PARAMS:
+            continue
+        else:
+            sql, p = _condition(table, key, value)
+        where.append(f"({sql})")
+        params.extend(p)
+
+    sql = f'SELECT {columns} FROM "{table}"'
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    order = query_params.get("order")
+    if order:
+        terms = []
+        for term in order.split(","):
+            column, *modifiers = term.split(".")
+            direction = "DESC" if "desc" in modifiers else "ASC"
+            terms.append(f"{_column(table, column)} {direction}")
+        sql += " ORDER BY " + ", ".join(terms)
+    limit = query_params.get("limit")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+        if query_params.get("offset"):
+            sql += f" OFFSET {int(query_params['offset'])}"
+    return [dict(row) for row in _conn().execute(sql, params).fetchall()]
+
+
+def _insert(table: str, body) -> List[dict]:
+    rows = body if isinstance(body, list) else [body]
+    conn = _conn()
+    inserted = []
+    now = datetime.now(timezone.utc).isoformat()
+    for row in rows:
+        row = dict(row)
+        if "created_at" in TABLES[table]:
+            row.setdefault("created_at", now)
+        names = [_column(table, name) for name in row]
+        cursor = conn.execute(
+            f'INSERT INTO "{table}" ({", ".join(names)}) VALUES ({", ".join("?" for _ in row)})',
+            [str(v) if isinstance(v, (dict, list)) else v for v in row.values()],
+        )
+        inserted.append(dict(conn.execute(f'SELECT * FROM "{table}" WHERE rowid = ?', (cursor.lastrowid,)).fetchone()))
+    conn.commit()
+    return inserted
+
+
+@app.get("/rest/v1/{table}")
+async def rest_select(table: str, request: Request):
+    requests_by_table[table] += 1
+    await _simulate_latency()
+    return await asyncio.to_thread(_select, table, request.query_params)
+
+
+@app.post("/rest/v1/{table}", status_code=201)
+async def rest_insert(table: str, request: Request):
+    requests_by_table[table] += 1
+    body = await request.json()
+    await _simulate_latency()
+    rows = await asyncio.to_thread(_insert, table, body)
+    if "return=representation" in request.headers.get("prefer", ""):
+        return JSONResponse(rows, status_code=201)
+    return Response(status_code=201)
+
+
+# The app verifies bench tokens with SUPABASE_JWT_SECRET (HS256), so no signing keys are published
+@app.get("/auth/v1/.well-known/jwks.json")
+def jwks():
+    return {"keys": []}
+
+
+@app.post("/auth/v1/logout", status_code=204)
+def logout():
+    return Response(status_code=204)
+
+
+# Request counts per table, so a run can show how much the app's caches saved
+@app.get("/__stats")
+def stats():
+    return dict(requests_by_table)
+
+
+@app.exception_handler(HTTPException)
+async def postgrest_error(request: Request, exc: HTTPException):
+    # PostgREST error body shape, so postgrest-py raises a normal APIError
+    detail = exc.detail if isinstance(exc.detail, dict) else {"message": str(exc.detail)}
+    return JSONResponse({"code": detail.get("code"), "message": detail.get("message"), "details": None, "hint": None},
+                        status_code=exc.status_code)
@@ -0,0 +1,97 @@
+import json
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile on an already sorted list
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Collects (operation, seconds, ok) samples for one scenario run."""
+
+    def __init__(self, scenario: str):
+        self.scenario = scenario
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def add(self, op: str, seconds: float, ok: bool = True):
+        if ok:
+            self.samples[op].append(seconds)
+        else:
+            self.errors[op] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started
+        ops = {}
+        for op in sorted(set(self.samples) | set(self.errors)):
+            values = sorted(self.samples.get(op, []))
+            ops[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": (values[-1] if values else math.nan) * 1000,
+                "throughput_per_s": len(values) / wall if wall > 0 else 0.0,
+            }
+        return {"scenario": self.scenario, "wall_seconds": wall, "ops": ops}
+
+
+def print_summary(summary: dict):
+    print(f"\n== {summary['scenario']} ({summary['wall_seconds']:.1f}s) ==")
+    print(f"{'operation':22} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'ops/s':>8}")
+    for op, s in summary["ops"].items():
+        print(f"{op:22} {s['count']:>6} {s['errors']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} "
+              f"{s['max_ms']:>9.1f} {s['throughput_per_s']:>8.1f}")
+
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Returns a line per operation whose p95 or throughput got worse than the baseline by more than tolerance."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if not before:
+            continue
+        for op, now in result["ops"].items():
+            old = before["ops"].get(op)
+            if not old or not old["count"] or not now["count"]:
+                continue
+            if now["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}/{op}: p95 {old['p95_ms']:.1f}ms -> {now['p95_ms']:.1f}ms")
+            if now["throughput_per_s"] < old["throughput_per_s"] * (1 - tolerance):
+                regressions.append(f"{result['scenario']}/{op}: throughput {old['throughput_per_s']:.1f}/s -> {now['throughput_per_s']:.1f}/s")
+            if now["errors"] > old["errors"]:
+                regressions.append(f"{result['scenario']}/{op}: errors {old['errors']} -> {now['errors']}")
+    return regressions
+
+
+def stage_breakdown(metrics_text: str) -> Dict[str, dict]:
+    # Average time per stage from the app's /metrics handoff_stage_duration_seconds histogram
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for line in metrics_text.splitlines():
+        if not line.startswith("handoff_stage_duration_seconds_"):
+            continue
+        name, _, value = line.rpartition(" ")
+        if name.startswith("handoff_stage_duration_seconds_sum"):
+            sums[name[len("handoff_stage_duration_seconds_sum"):]] = float(value)
+        elif name.startswith("handoff_stage_duration_seconds_count"):
+            counts[name[len("handoff_stage_duration_seconds_count"):]] = float(value)
+    return {
+        labels: {"count": int(counts[labels]), "avg_ms": 1000 * sums[labels] / counts[labels]}
+        for labels in sums if counts.get(labels)
+    }
@@ -0,0 +1,272 @@
+"""
+Benchmarks the API end to end against local stand-ins for Supabase and Hugging Face.
+
+Run from the backend folder:
+
+    python -m bench.run                                  # all scenarios, default sizes
+    python -m bench.run --scenarios chart_storm --nurses 100 --db-latency-ms 25
+    python -m bench.run --json before.json               # save results...
+    python -m bench.run --baseline before.json           # ...and fail (exit 1) if p95/throughput regress
+
+The dictation scenario needs Whisper installed (it runs the real transcription pool). Feed it recorded
+handoffs with --wav; without them it uses a synthetic voiced signal, which exercises the same code paths
+but says nothing about transcript quality.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import httpx
+import jwt
+import numpy as np
+
+from audio_decode import decode_wav
+from bench.report import Recorder, compare, print_summary, stage_breakdown
+from bench.scenarios import SCENARIOS, BenchContext
+from bench.synthea import generate
+from transcription import SAMPLE_RATE
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_JWT_SECRET = "bench-secret-not-for-production-use-0123456789"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(target: str, port: int, env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server for {url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def make_token_factory(secret: str, supabase_url: str):
+    def make_token(nurse: int) -> str:
+        return jwt.encode(
+            {
+                "sub": f"bench-nurse-{nurse}",
+                "email": f"nurse{nurse}@bench.local",
+                "aud": "authenticated",
+                "role": "authenticated",
+                "iss": f"{supabase_url}/auth/v1",
+                "exp": int(time.time()) + 3600,
+            },
+            secret,
+            algorithm="HS256",
+        )
+    return make_token
+
+
+def synthetic_dictation(seconds: float = 20.0, seed: int = 7) -> np.ndarray:
+    # Speech-like stand-in: voiced bursts (a pitch with harmonics and a syllable-rate envelope) between pauses
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.15 * t) > -0.3)
+    audio = 0.3 * voiced * envelope + 0.005 * rng.standard_normal(len(t))
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+
+
+def load_wavs(paths: List[str]) -> List[np.ndarray]:
+    wavs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            wavs.append((decode_wav(f.read()) * 32767).astype(np.int16))
+    return wavs
+
+
+def fixture_patient_ids(db_path: str, limit: int) -> List[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute('SELECT "Id" FROM patients ORDER BY "Id" LIMIT ?', (limit,))]
+    finally:
+        conn.close()
+
+
+async def wait_for_transcription_workers(client: httpx.AsyncClient, timeout: float = 300.0) -> bool:
+    # Model loading isn't part of what the dictation scenario measures
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        metrics = (await client.get("/transcription/metrics")).json()
+        if not metrics["workers"]:
+            return False
+        if metrics["workers_ready"] >= metrics["workers"]:
+            return True
+        await asyncio.sleep(1.0)
+    return False
+
+
+async def run_scenarios(args, app_url: str, patient_ids: List[str], make_token, wavs: List[np.ndarray]) -> dict:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=app_url, timeout=args.request_timeout, limits=limits) as client:
+        ctx = BenchContext(client, patient_ids, make_token, seed=args.seed)
+        results = []
+        for name in args.scenarios:
+            rec = Recorder(name)
+            if name == "chart_storm":
+                await SCENARIOS[name](ctx, rec, nurses=args.nurses, charts_per_nurse=args.charts_per_nurse)
+            elif name == "summary_burst":
+                await SCENARIOS[name](ctx, rec, requests=args.summaries, duplicate_ratio=args.duplicate_ratio)
+            elif name == "summary_stream":
+                await SCENARIOS[name](ctx, rec, requests=args.summaries)
+            elif name == "dictation":
+                if not await wait_for_transcription_workers(client):
+                    print("Skipping dictation: no transcription workers became ready (is Whisper installed?)")
+                    continue
+                await SCENARIOS[name](ctx, rec, wavs, sessions=args.sessions, realtime=not args.no_realtime)
+            rec.finish()
+            summary = rec.summary()
+            print_summary(summary)
+            results.append(summary)
+
+        stages = {}
+        try:
+            stages = stage_breakdown((await client.get("/metrics")).text)
+        except httpx.HTTPError:
+            pass
+        return {"results": results, "stages": stages}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test the handoff API against local Supabase and HF stand-ins.")
+    parser.add_argument("--scenarios", default="chart_storm,summary_burst,summary_stream,dictation",
+                        type=lambda s: [x.strip() for x in s.split(",") if x.strip()])
+    parser.add_argument("--app-url", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--jwt-secret", default=BENCH_JWT_SECRET, help="HS256 secret the app verifies tokens with")
+    parser.add_argument("--supabase-url", help="issuer base for tokens when using --app-url")
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "bench.db"), help="SQLite fixture (generated if missing)")
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db-latency-ms", type=float, default=15.0)
+    parser.add_argument("--hf-latency-ms", type=float, default=800.0)
+    parser.add_argument("--hf-error-rate", type=float, default=0.0)
+    parser.add_argument("--nurses", type=int, default=40)
+    parser.add_argument("--charts-per-nurse", type=int, default=8)
+    parser.add_argument("--summaries", type=int, default=60)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--wav", nargs="*", default=[], help="16-bit WAV dictations for the dictation scenario")
+    parser.add_argument("--no-realtime", action="store_true", help="upload dictation audio as fast as possible")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    wavs = load_wavs(args.wav) if args.wav else [synthetic_dictation(seed=args.seed)]
+    processes: List[subprocess.Popen] = []
+    workdir = tempfile.mkdtemp(prefix="handoff-bench-")
+    try:
+        if args.app_url:
+            app_url = args.app_url.rstrip("/")
+            supabase_url = (args.supabase_url or "").rstrip("/")
+            make_token = make_token_factory(args.jwt_secret, supabase_url)
+            response = httpx.get(f"{app_url}/patients?limit=200&fields=Id",
+                                 headers={"Authorization": f"Bearer {make_token(0)}"}, timeout=30)
+            response.raise_for_status()
+            patient_ids = [p["Id"] for p in response.json()["patients"]]
+        else:
+            if not os.path.exists(args.db):
+                print(f"Generating {args.patients} Synthea-shaped patients into {args.db}")
+                generate(args.db, patients=args.patients, seed=args.seed)
+            patient_ids = fixture_patient_ids(args.db, 200)
+
+            db_port, hf_port, app_port = free_port(), free_port(), free_port()
+            supabase_url = f"http://127.0.0.1:{db_port}"
+            make_token = make_token_factory(args.jwt_secret, supabase_url)
+            base_env = dict(os.environ)
+
+            processes.append(start_server("bench.fake_supabase:app", db_port, {
+                **base_env, "BENCH_DB": args.db, "BENCH_DB_LATENCY_MS": str(args.db_latency_ms),
+            }, os.path.join(workdir, "fake_supabase.log")))
+            processes.append(start_server("bench.fake_hf:app", hf_port, {
+                **base_env, "BENCH_HF_LATENCY_MS": str(args.hf_latency_ms), "BENCH_HF_ERROR_RATE": str(args.hf_error_rate),
+            }, os.path.join(workdir, "fake_hf.log")))
+            wait_until_up(f"{supabase_url}/__stats", processes[0])
+            wait_until_up(f"http://127.0.0.1:{hf_port}/__stats", processes[1])
+
+            processes.append(start_server("main:app", app_port, {
+                **base_env,
+                "SUPABASE_URL": supabase_url,
+                "SUPABASE_KEY": jwt.encode({"role": "anon", "iss": "supabase"}, args.jwt_secret, algorithm="HS256"),
+                "SUPABASE_JWT_SECRET": args.jwt_secret,
+                "HF_API_TOKEN": "bench",
+                "HF_API_BASE": f"http://127.0.0.1:{hf_port}",
+                "SUMMARY_CACHE_PATH": os.path.join(workdir, "summary_cache.db"),
+                "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+                "AUDIT_SPILL_PATH": os.path.join(workdir, "audit_spill.jsonl"),
+                "PROFILE_DIR": os.path.join(workdir, "profiles"),
+                "WHISPER_MODEL": base_env.get("WHISPER_MODEL", "tiny"),
+            }, os.path.join(workdir, "app.log")))
+            app_url = f"http://127.0.0.1:{app_port}"
+            wait_until_up(f"{app_url}/metrics", processes[2])
+
+        print(f"Benchmarking {app_url} (logs in {workdir})")
+        report = asyncio.run(run_scenarios(args, app_url, patient_ids, make_token, wavs))
+
+        if report["stages"]:
+            print("\n== stage averages (from /metrics) ==")
+            for labels, stage in sorted(report["stages"].items(), key=lambda kv: -kv[1]["avg_ms"] * kv[1]["count"]):
+                print(f"{labels:60} {stage['count']:>7} x {stage['avg_ms']:>8.1f} ms")
+        if not args.app_url:
+            report["db_requests"] = httpx.get(f"{supabase_url}/__stats").json()
+            print(f"\nFake Supabase requests by table: {report['db_requests']}")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"config": {k: v for k, v in vars(args).items() if k != "jwt_secret"}, **report}, f, indent=2)
+        if args.baseline:
+            regressions = compare(report["results"], args.baseline, args.tolerance)
+            if regressions:
+                print("\nRegressions against baseline:")
+                for line in regressions:
+                    print("  " + line)
+                sys.exit(1)
+            print("\nNo regressions against baseline.")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import httpx
+import numpy as np
+
+from bench.report import Recorder
+from transcription import SAMPLE_RATE
+
+
+class BenchContext:
+    """What every scenario needs: the app client, patient ids from the fixture and a token per simulated nurse."""
+
+    def __init__(self, client: httpx.AsyncClient, patient_ids: List[str], make_token: Callable[[int], str], seed: int = 7):
+        self.client = client
+        self.patient_ids = patient_ids
+        self.make_token = make_token
+        self.seed = seed
+        self._tokens: Dict[int, str] = {}
+
+    def headers(self, nurse: int) -> dict:
+        if nurse not in self._tokens:
+            self._tokens[nurse] = self.make_token(nurse)
+        return {"Authorization": f"Bearer {self._tokens[nurse]}"}
+
+
+async def timed(rec: Recorder, op: str, request, ok_statuses=(200,)):
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        rec.add(op, time.perf_counter() - started, ok=False)
+        return None
+    rec.add(op, time.perf_counter() - started, ok=response.status_code in ok_statuses)
+    return response
+
+
+async def chart_storm(ctx: BenchContext, rec: Recorder, nurses: int = 40, charts_per_nurse: int = 8, hot_patients: int = 10):
+    # Shift change: every nurse loads the patient list, then opens their patients' charts back to back.
+    # Half the opens go to a small set of "hot" patients that several nurses share.
+    rng = random.Random(ctx.seed)
+    hot = rng.sample(ctx.patient_ids, min(hot_patients, len(ctx.patient_ids)))
+    opened = set()
+
+    async def nurse(n: int):
+        nurse_rng = random.Random(ctx.seed * 1000 + n)
+        headers = ctx.headers(n)
+        await timed(rec, "patient_list", ctx.client.get("/patients?limit=50", headers=headers))
+        for _ in range(charts_per_nurse):
+            pid = nurse_rng.choice(hot) if nurse_rng.random() < 0.5 else nurse_rng.choice(ctx.patient_ids)
+            op = "chart_warm" if pid in opened else "chart_cold"
+            opened.add(pid)
+            await timed(rec, op, ctx.client.get(f"/patients/{pid}/chart", headers=headers))
+
+    await asyncio.gather(*(nurse(n) for n in range(nurses)))
+
+
+async def summary_burst(ctx: BenchContext, rec: Recorder, requests: int = 60, duplicate_ratio: float = 0.3):
+    # Everyone hits "summarize" within the same second; some notes are identical (re-sent or shared templates)
+    rng = random.Random(ctx.seed)
+    run = uuid.uuid4().hex[:8]  # keeps unique notes from matching summaries cached by an earlier run
+    shared = {
+        "situation": f"Post-op day 1, pain 4/10 ({run})",
+        "background": "Admitted for elective hip replacement.",
+        "assessment": "Vitals stable, incision clean and dry.",
+        "recommendation": "Ambulate twice this shift, continue PRN analgesia.",
+    }
+
+    async def one(i: int):
+        if rng.random() < duplicate_ratio:
+            note = shared
+        else:
+            note = {**shared, "situation": f"Patient {i}: {rng.choice(['stable', 'febrile', 'tachycardic'])} ({run}-{i})"}
+        await timed(rec, "summarize", ctx.client.post("/summarize", json=note, headers=ctx.headers(i)))
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+async def summary_stream(ctx: BenchContext, rec: Recorder, requests: int = 30):
+    # Streamed summaries of unique notes: time to the first token is what the nurse perceives as latency
+    run = uuid.uuid4().hex[:8]
+
+    async def one(i: int):
+        note = {
+            "situation": f"Patient {i}: post-op day 2, pain 3/10 ({run}-{i})",
+            "background": "Admitted for laparoscopic cholecystectomy.",
+            "assessment": "Afebrile, tolerating diet.",
+            "recommendation": "Plan discharge tomorrow if stable.",
+        }
+        started = time.perf_counter()
+        first, ok = None, False
+        try:
+            async with ctx.client.stream("POST", "/summarize/stream", json=note, headers=ctx.headers(i)) as response:
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        if event == "token" and first is None:
+                            first = time.perf_counter() - started
+                        ok = ok or event == "done"
+        except httpx.HTTPError:
+            pass
+        if first is not None:
+            rec.add("first_token", first)
+        rec.add("full_summary", time.perf_counter() - started, ok=ok)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+async def dictation(ctx: BenchContext, rec: Recorder, wavs: List[np.ndarray], sessions: int = 4, chunk_seconds: float = 0.5,
+                    realtime: bool = True, final_timeout: float = 120.0):
+    # Concurrent nurses dictating: audio is posted in chunks (at real-time pace unless disabled) and the
+    # time from stop to the final transcript is what the nurse actually waits for
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+
+    async def session(i: int):
+        headers = ctx.headers(i)
+        response = await timed(rec, "start_session", ctx.client.post("/start-client-recording", headers=headers))
+        if response is None or response.status_code != 200:
+            return
+        session_id = response.json()["session_id"]
+        audio = wavs[i % len(wavs)]
+        started = time.perf_counter()
+        for n, offset in enumerate(range(0, len(audio), chunk)):
+            pcm = audio[offset:offset + chunk].astype("<i2").tobytes()
+            await timed(rec, "upload_chunk", ctx.client.post(
+                f"/upload-audio/{session_id}?sample_rate={SAMPLE_RATE}",
+                content=pcm,
+                headers={**headers, "Content-Type": "audio/pcm"},
+            ))
+            if realtime:
+                await asyncio.sleep(max(0.0, started + (n + 1) * chunk_seconds - time.perf_counter()))
+
+        stopped = time.perf_counter()
+        await ctx.client.post(f"/stop-recording/{session_id}")
+        while time.perf_counter() - stopped < final_timeout:
+            state = await ctx.client.get(f"/read-transcription/{session_id}")
+            if state.status_code == 200 and state.json()["finished"]:
+                rec.add("final_transcript", time.perf_counter() - stopped)
+                return
+            await asyncio.sleep(0.05)
+        rec.add("final_transcript", time.perf_counter() - stopped, ok=False)
+
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+
+
+SCENARIOS = {
+    "chart_storm": chart_storm,
+    "summary_burst": summary_burst,
+    "summary_stream": summary_stream,
+    "dictation": dictation,
+}
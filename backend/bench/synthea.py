@@ -0,0 +1,155 @@
+import argparse
+import random
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+# Column layout of the Synthea CSV export the real tables were loaded from (trimmed to what the API reads),
+# plus the app's own tables. Every column is TEXT except the generated ids.
+TABLES: Dict[str, List[str]] = {
+    "patients": ["Id", "BIRTHDATE", "DEATHDATE", "FIRST", "LAST", "GENDER", "RACE", "CITY", "STATE", "UNIT"],
+    "allergies": ["START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "SYSTEM", "DESCRIPTION", "TYPE", "CATEGORY"],
+    "careplans": ["Id", "START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION"],
+    "conditions": ["START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION"],
+    "devices": ["START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION", "UDI"],
+    "encounters": ["Id", "START", "STOP", "PATIENT", "ENCOUNTERCLASS", "CODE", "DESCRIPTION"],
+    "imaging_studies": ["Id", "DATE", "PATIENT", "ENCOUNTER", "MODALITY_CODE", "BODYSITE_DESCRIPTION"],
+    "immunizations": ["DATE", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION"],
+    "medications": ["START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION"],
+    "observations": ["DATE", "PATIENT", "ENCOUNTER", "CATEGORY", "CODE", "DESCRIPTION", "VALUE", "UNITS", "TYPE"],
+    "procedures": ["START", "STOP", "PATIENT", "ENCOUNTER", "CODE", "DESCRIPTION"],
+    "sbar": ["patient_id", "situation", "background", "assessment", "recommendation", "created_at"],
+    "ai_summaries": ["patient_id", "sbar_id", "summary", "created_at"],
+    "audit_logs": ["user_email", "endpoint", "action", "timestamp"],
+}
+# Tables whose rows get an auto-incrementing integer id, like the Supabase-managed ones
+GENERATED_ID_TABLES = ("sbar", "ai_summaries", "audit_logs")
+INDEXES = {
+    "allergies": ("PATIENT", "START"),
+    "careplans": ("PATIENT", "START"),
+    "conditions": ("PATIENT", "START"),
+    "devices": ("PATIENT", "START"),
+    "encounters": ("PATIENT", "START"),
+    "imaging_studies": ("PATIENT", "DATE"),
+    "immunizations": ("PATIENT", "DATE"),
+    "medications": ("PATIENT", "START"),
+    "observations": ("PATIENT", "DATE"),
+    "procedures": ("PATIENT", "START"),
+    "sbar": ("patient_id", "created_at"),
+    "ai_summaries": ("patient_id", "created_at"),
+    "audit_logs": ("timestamp",),
+}
+
+FIRST_NAMES = ["Annalise", "Marcus", "Priya", "Tomás", "Grace", "Wei", "Fatima", "Jonah", "Lucia", "Kwame", "Hannah", "Diego"]
+LAST_NAMES = ["Glover", "Nguyen", "Okafor", "Schmidt", "Patel", "Rossi", "Kim", "Haddad", "Larsen", "Moreno", "Ito", "Walsh"]
+UNITS = ["ICU", "MED-SURG", "CARDIO", "ONCOLOGY", "PEDS"]
+CONDITIONS = [("44054006", "Diabetes"), ("38341003", "Hypertension"), ("195662009", "Acute viral pharyngitis"),
+              ("10509002", "Acute bronchitis"), ("49436004", "Atrial fibrillation"), ("233604007", "Pneumonia")]
+MEDICATIONS = [("860975", "Metformin 500 MG"), ("314076", "Lisinopril 10 MG"), ("197361", "Amlodipine 5 MG"),
+               ("855332", "Warfarin 5 MG"), ("308136", "Amoxicillin 500 MG")]
+VITALS = [("8867-4", "Heart rate", "/min", 60, 110), ("8480-6", "Systolic Blood Pressure", "mm[Hg]", 95, 170),
+          ("8462-4", "Diastolic Blood Pressure", "mm[Hg]", 55, 100), ("9279-1", "Respiratory rate", "/min", 12, 24),
+          ("8310-5", "Body temperature", "Cel", 36, 39), ("2708-6", "Oxygen saturation", "%", 88, 100)]
+LABS = [("2339-0", "Glucose", "mg/dL", 70, 220), ("2160-0", "Creatinine", "mg/dL", 0.6, 2.4),
+        ("718-7", "Hemoglobin", "g/dL", 9, 17), ("6690-2", "Leukocytes", "10*3/uL", 3.5, 15)]
+ALLERGIES = [("300916003", "Latex allergy", "environment"), ("91936005", "Penicillin allergy", "medication"),
+             ("417532002", "Fish allergy", "food"), ("419474003", "Mold allergy", "environment")]
+ENCOUNTER_CLASSES = ["inpatient", "emergency", "ambulatory", "wellness", "outpatient"]
+MODALITIES = [("CR", "Chest"), ("CT", "Head"), ("US", "Abdomen"), ("DX", "Knee")]
+
+
+def create_schema(conn: sqlite3.Connection):
+    for table, columns in TABLES.items():
+        defs = [f'"{c}" TEXT' for c in columns]
+        if table in GENERATED_ID_TABLES:
+            defs.insert(0, '"id" INTEGER PRIMARY KEY AUTOINCREMENT')
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(defs)})')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS "patients_id" ON "patients" ("Id")')
+    for table, columns in INDEXES.items():
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_lookup" ON "{table}" ({quoted})')
+
+
+def _iso(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def generate(path: str, patients: int = 500, seed: int = 7, readings_per_encounter: int = 2) -> Dict[str, int]:
+    """Writes a deterministic Synthea-shaped dataset to a SQLite file; returns row counts per table."""
+    rng = random.Random(seed)
+    rows: Dict[str, List[Tuple]] = {table: [] for table in TABLES}
+    now = datetime(2025, 10, 1, 7, 0, 0)
+
+    def uid() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    for _ in range(patients):
+        pid = uid()
+        birth = now - timedelta(days=rng.randint(18 * 365, 95 * 365))
+        rows["patients"].append((pid, birth.date().isoformat(), None, rng.choice(FIRST_NAMES) + str(rng.randint(1, 999)),
+                                 rng.choice(LAST_NAMES) + str(rng.randint(1, 999)), rng.choice("MF"), "white", "Boston", "MA",
+                                 rng.choice(UNITS)))
+        for code, desc, category in rng.sample(ALLERGIES, rng.randint(0, 2)):
+            rows["allergies"].append((_iso(birth + timedelta(days=rng.randint(1000, 5000))), None, pid, uid(), code,
+                                      "SNOMED-CT", desc, "allergy", category))
+
+        # A long outpatient history followed by the current inpatient stay, like a typical Synthea record
+        for e in range(rng.randint(8, 30)):
+            start = now - timedelta(days=rng.randint(0, 3650) if e else rng.randint(0, 5), hours=rng.randint(0, 23))
+            eid = uid()
+            rows["encounters"].append((eid, _iso(start), _iso(start + timedelta(hours=rng.randint(1, 72))), pid,
+                                       "inpatient" if e == 0 else rng.choice(ENCOUNTER_CLASSES), "185349003", "Encounter for check up"))
+            for code, desc, units, low, high in VITALS + rng.sample(LABS, 2):
+                for repeat in range(readings_per_encounter):
+                    value = round(rng.uniform(low, high), 1)
+                    category = "laboratory" if (code, desc, units, low, high) in LABS else "vital-signs"
+                    rows["observations"].append((_iso(start + timedelta(minutes=15 * repeat)), pid, eid, category, code, desc,
+                                                 str(value), units, "numeric"))
+            if rng.random() < 0.3:
+                code, desc = rng.choice(CONDITIONS)
+                rows["conditions"].append((_iso(start), None, pid, eid, code, desc))
+            if rng.random() < 0.4:
+                code, desc = rng.choice(MEDICATIONS)
+                rows["medications"].append((_iso(start), None, pid, eid, code, desc))
+            if rng.random() < 0.2:
+                rows["procedures"].append((_iso(start), _iso(start + timedelta(minutes=30)), pid, eid, "430193006",
+                                           "Medication reconciliation"))
+            if rng.random() < 0.25:
+                rows["immunizations"].append((_iso(start), pid, eid, "140", "Influenza, seasonal, injectable"))
+            if rng.random() < 0.05:
+                modality, site = rng.choice(MODALITIES)
+                rows["imaging_studies"].append((uid(), _iso(start), pid, eid, modality, site))
+            if rng.random() < 0.1:
+                rows["careplans"].append((uid(), _iso(start), None, pid, eid, "736353004", "Inpatient care plan"))
+            if rng.random() < 0.02:
+                rows["devices"].append((_iso(start), None, pid, eid, "706180003", "Respiratory humidifier", uid()))
+
+        # Most patients already have a few SBAR notes from earlier shifts
+        for n in range(rng.randint(0, 3)):
+            created = now - timedelta(hours=12 * (n + 1))
+            rows["sbar"].append((pid, "Stable overnight, pain controlled.", "Admitted for " + rng.choice(CONDITIONS)[1] + ".",
+                                 "Vitals within normal limits.", "Continue current plan, reassess at 0800.", _iso(created)))
+
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    for table, table_rows in rows.items():
+        if not table_rows:
+            continue
+        columns = TABLES[table]
+        placeholders = ",".join("?" for _ in columns)
+        names = ",".join(f'"{c}"' for c in columns)
+        conn.executemany(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})', table_rows)
+    conn.commit()
+    conn.close()
+    return {table: len(table_rows) for table, table_rows in rows.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a Synthea-shaped SQLite database for the benchmarks.")
+    parser.add_argument("--out", default="bench.db")
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    for table, count in generate(args.out, args.patients, args.seed).items():
+        print(f"{table:16} {count}")
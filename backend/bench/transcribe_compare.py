@@ -0,0 +1,158 @@
+"""
+Compares transcription backends on this machine: load time, real-time factor and word error rate.
+
+Run from the backend folder with recorded dictations (16-bit WAV). A reference transcript is read from
+a .txt file next to each WAV; without one, WER is measured against the first configuration's output
+(by default the current openai-whisper path), which still shows how much a faster option changes the text.
+
+    python -m bench.transcribe_compare --wav handoff1.wav handoff2.wav
+    python -m bench.transcribe_compare --wav handoff1.wav --configs whisper:base,faster-whisper:base:int8,faster-whisper:small:int8 --threads 4
+
+Each configuration is backend:model[:compute_type] and runs in its own process, so thread settings and
+memory use don't leak between them. RTF is compute time divided by audio duration; below 1 keeps up
+with a live dictation on a single worker.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from audio_decode import decode_wav
+from transcription import SAMPLE_RATE, TRANSCRIBE_BACKENDS
+
+DEFAULT_CONFIGS = "whisper:base,faster-whisper:base:int8,faster-whisper:small:int8"
+
+
+def parse_config(text: str) -> dict:
+    parts = text.split(":")
+    if len(parts) not in (2, 3) or parts[0] not in TRANSCRIBE_BACKENDS:
+        raise argparse.ArgumentTypeError(f"Expected backend:model[:compute_type] with backend in {TRANSCRIBE_BACKENDS}, got {text!r}")
+    return {"backend": parts[0], "model": parts[1], "compute_type": parts[2] if len(parts) == 3 else "int8"}
+
+
+def config_label(config: dict) -> str:
+    if config["backend"] == "faster-whisper":
+        return f"{config['backend']}:{config['model']}:{config['compute_type']}"
+    return f"{config['backend']}:{config['model']}"
+
+
+def normalize_words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    # Word-level Levenshtein distance divided by the reference length
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _run_config(config: dict, threads: int, task: str, audios: List[np.ndarray], repeat: int) -> dict:
+    # Runs in a fresh process: load, warm up, then time every file
+    from transcription import load_transcribe_fn
+
+    started = time.perf_counter()
+    transcribe = load_transcribe_fn(config["backend"], config["model"], task=task, threads=threads,
+                                    compute_type=config["compute_type"])
+    load_seconds = time.perf_counter() - started
+    transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), "")
+
+    texts, seconds = [], []
+    for audio in audios:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            segments = transcribe(audio, "")
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        texts.append(" ".join(s["text"].strip() for s in segments))
+        seconds.append(best)
+    return {"load_seconds": load_seconds, "texts": texts, "compute_seconds": seconds}
+
+
+def read_reference(wav_path: str) -> Optional[str]:
+    path = os.path.splitext(wav_path)[0] + ".txt"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare transcription backends for accuracy and real-time factor.")
+    parser.add_argument("--wav", nargs="+", required=True, help="16-bit WAV dictations (reference text in a sibling .txt)")
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS,
+                        type=lambda s: [parse_config(c.strip()) for c in s.split(",") if c.strip()])
+    parser.add_argument("--threads", type=int, default=1, help="inference threads per worker (TRANSCRIBE_THREADS_PER_WORKER)")
+    parser.add_argument("--task", default="translate", choices=["translate", "transcribe"])
+    parser.add_argument("--repeat", type=int, default=1, help="time each file this many times and keep the fastest")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    audios = []
+    for path in args.wav:
+        with open(path, "rb") as f:
+            audios.append(decode_wav(f.read()))
+    references = [read_reference(path) for path in args.wav]
+    audio_seconds = sum(len(a) for a in audios) / SAMPLE_RATE
+
+    results = []
+    baseline_texts = None
+    for config in args.configs:
+        label = config_label(config)
+        print(f"Running {label} ...", flush=True)
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                run = pool.submit(_run_config, config, args.threads, args.task, audios, args.repeat).result()
+        except Exception as e:
+            print(f"  {label} failed: {e!r}")
+            results.append({"config": label, "error": repr(e)})
+            continue
+
+        if baseline_texts is None:
+            baseline_texts = run["texts"]
+        wers, against = [], "reference"
+        for text, reference, baseline in zip(run["texts"], references, baseline_texts):
+            if reference is None:
+                reference, against = baseline, "baseline"
+            wers.append(word_error_rate(reference, text))
+        compute = sum(run["compute_seconds"])
+        results.append({
+            "config": label,
+            "load_seconds": run["load_seconds"],
+            "compute_seconds": compute,
+            "rtf": compute / audio_seconds if audio_seconds else float("nan"),
+            "wer": sum(wers) / len(wers),
+            "wer_against": against,
+            "texts": run["texts"],
+        })
+
+    print(f"\n{len(audios)} file(s), {audio_seconds:.1f}s of audio, {args.threads} thread(s), task={args.task}")
+    print(f"{'config':34} {'load s':>8} {'compute s':>10} {'RTF':>7} {'WER':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['config']:34} {'failed':>8}")
+            continue
+        marker = "" if r["wer_against"] == "reference" else " (vs first config)"
+        print(f"{r['config']:34} {r['load_seconds']:>8.1f} {r['compute_seconds']:>10.2f} {r['rtf']:>7.3f} {r['wer']:>7.1%}{marker}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"threads": args.threads, "task": args.task, "audio_seconds": audio_seconds, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class TooManyJobs(Exception):
+    """Raised by create when the user, or the manager as a whole, has no room for another running job."""
+
+
+class HandoffBundleJob:
+    """Progress of one precompute run over a list of patients."""
+
+    def __init__(self, patient_ids: List[str], start_at: float, end_at: float, created_by: str):
+        self.job_id = str(uuid.uuid4())
+        self.patient_ids = patient_ids
+        self.start_at = start_at
+        self.end_at = end_at
+        self.created_by = created_by
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = "scheduled"
+        # patient_id -> {"status": pending|running|summarized|up_to_date|no_sbar|failed, ...}
+        self.results: Dict[str, dict] = {pid: {"status": "pending"} for pid in patient_ids}
+        self.task: Optional[asyncio.Task] = None
+
+    def progress(self) -> dict:
+        counts: Dict[str, int] = {}
+        for result in self.results.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        done = sum(n for status, n in counts.items() if status not in ("pending", "running"))
+
+        def iso(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_by": self.created_by,
+            "total": len(self.patient_ids),
+            "completed": done,
+            "percent": round(100.0 * done / len(self.patient_ids), 1) if self.patient_ids else 100.0,
+            "counts": counts,
+            "start_at": iso(self.start_at),
+            "end_at": iso(self.end_at),
+            "finished_at": iso(self.finished_at),
+            "results": self.results,
+        }
+
+
+class HandoffBundleManager:
+    """
+    Precomputes AI summaries for a set of patients ahead of shift change.
+
+    Patients are spread evenly across the [start_at, end_at] window, and at most `concurrency` summaries
+    run at once, so the work is a steady trickle in the minutes before handoff instead of a spike at it.
+    The storage and inference steps are passed in, so the job reuses the same summary cache and tables
+    as the /summarize and save_summary routes.
+
+    Finished jobs are kept for polling up to max_jobs, oldest dropped first. Running jobs are never dropped
+    to make room: a user with max_running_per_user jobs still running, or a manager full of running jobs,
+    gets TooManyJobs instead.
+
+    Jobs (and their progress) live in this process only: with several uvicorn workers, a job is only visible
+    to the worker that created it, so run the API with a single worker (or sticky sessions) when using bundles.
+    The summaries they save are in the database either way.
+    """
+
+    def __init__(
+        self,
+        fetch_latest_sbar: Callable[[str], Awaitable[Optional[dict]]],
+        has_summary: Callable[[str], Awaitable[bool]],
+        summarize_note: Callable[[dict], Awaitable[str]],
+        save_summary: Callable[[str, str, str], Awaitable[None]],
+        concurrency: int = 4,
+        max_jobs: int = 50,
+        max_running_per_user: int = 3,
+    ):
+        self.fetch_latest_sbar = fetch_latest_sbar
+        self.has_summary = has_summary
+        self.summarize_note = summarize_note
+        self.save_summary = save_summary
+        self.concurrency = concurrency
+        self.max_jobs = max_jobs
+        self.max_running_per_user = max_running_per_user
+        self._jobs: "OrderedDict[str, HandoffBundleJob]" = OrderedDict()
+
+    def create(self, patient_ids: List[str], start_at: float, end_at: float, created_by: str) -> HandoffBundleJob:
+        running = [job for job in self._jobs.values() if not job.task.done()]
+        if sum(job.created_by == created_by for job in running) >= self.max_running_per_user:
+            raise TooManyJobs(f"{self.max_running_per_user} handoff bundles are already running for this user")
+        # Make room by dropping the oldest finished jobs only
+        for job_id in [job.job_id for job in self._jobs.values() if job.task.done()]:
+            if len(self._jobs) < self.max_jobs:
+                break
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_jobs:
+            raise TooManyJobs(f"{len(running)} handoff bundles are already running")
+
+        # De-duplicate while keeping the caller's order
+        job = HandoffBundleJob(list(dict.fromkeys(patient_ids)), start_at, end_at, created_by)
+        self._jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str, created_by: Optional[str] = None) -> Optional[HandoffBundleJob]:
+        # With created_by, someone else's job is treated as missing
+        job = self._jobs.get(job_id)
+        if job is None or (created_by is not None and job.created_by != created_by):
+            return None
+        return job
+
+    def list(self, created_by: Optional[str] = None) -> List[HandoffBundleJob]:
+        return [job for job in reversed(self._jobs.values()) if created_by is None or job.created_by == created_by]
+
+    def cancel_all(self):
+        for job in self._jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+
+    async def _run(self, job: HandoffBundleJob):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        count = len(job.patient_ids)
+        step = (job.end_at - job.start_at) / count if count else 0.0
+
+        async def process(index: int, patient_id: str):
+            # Stagger start times across the window
+            delay = job.start_at + index * step - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                job.status = "running"
+                await self._process_patient(job, patient_id)
+
+        try:
+            await asyncio.gather(*(process(i, pid) for i, pid in enumerate(job.patient_ids)))
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    async def _process_patient(self, job: HandoffBundleJob, patient_id: str):
+        result = job.results[patient_id]
+        result["status"] = "running"
+        started = time.perf_counter()
+        try:
+            sbar = await self.fetch_latest_sbar(patient_id)
+            if not sbar:
+                result["status"] = "no_sbar"
+                return
+            result["sbar_id"] = sbar["id"]
+            # Skip notes that already have a saved summary
+            if await self.has_summary(sbar["id"]):
+                result["status"] = "up_to_date"
+                return
+            summary = await self.summarize_note(sbar)
+            await self.save_summary(patient_id, sbar["id"], summary)
+            result["status"] = "summarized"
+        except Exception as e:
+            logging.warning(f"Handoff bundle {job.job_id}: patient {patient_id} failed: {e}")
+            result["status"] = "failed"
+            result["error"] = getattr(e, "detail", None) or str(e)
+        finally:
+            result["seconds"] = round(time.perf_counter() - started, 3)
@@ -0,0 +1,38 @@
+import logging
+import time
+from typing import Callable, Dict, Tuple
+
+
+class HealthChecks:
+    """
+    Named readiness checks for the /readyz endpoint.
+
+    Each check is a cheap callable returning True once its subsystem can serve requests (a model has
+    loaded, signing keys were fetched, ...). Required checks gate readiness; the others are only reported,
+    e.g. a lazily started transcription pool that loads on the first recording session.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._checks: Dict[str, Tuple[Callable[[], bool], bool]] = {}
+
+    def add(self, name: str, check: Callable[[], bool], required: bool = True):
+        self._checks[name] = (check, required)
+
+    def report(self) -> Tuple[bool, dict]:
+        ready = True
+        checks = {}
+        for name, (check, required) in self._checks.items():
+            try:
+                ok = bool(check())
+            except Exception as e:
+                logging.warning(f"Readiness check {name} failed: {e}")
+                ok = False
+            checks[name] = {"ready": ok, "required": required}
+            if required and not ok:
+                ready = False
+        return ready, {
+            "status": "ready" if ready else "starting",
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "checks": checks,
+        }
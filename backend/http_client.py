@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised without calling upstream while a host's circuit breaker is open."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; lets one trial request through after reset_timeout."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial: Optional[object] = None  # token of the half-open trial request, if one is running
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self, host: str) -> Optional[object]:
+        # Returns a token when this request is the half-open trial; pass it to release_trial() when it ends
+        state = self.state
+        if state == "open":
+            raise CircuitOpen(host, self.reset_timeout - (time.monotonic() - self.opened_at))
+        if state == "half_open":
+            if self._trial is not None:
+                raise CircuitOpen(host, 1.0)
+            self._trial = object()
+            return self._trial
+        return None
+
+    def release_trial(self, trial: Optional[object]):
+        # Called however the trial ended (cancelled, an unexpected error, ...), so the breaker can't wedge
+        # half-open with a trial that will never report back
+        if trial is not None and self._trial is trial:
+            self._trial = None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """
+    Shared async HTTP client for all outbound calls: keep-alive pooling, per-host concurrency limits,
+    connect/read timeouts, jittered retries for safe failures and a per-host circuit breaker.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_connections: int = 100,
+        max_per_host: int = 20,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # Full jitter so retries from many requests don't line up
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, *, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        # idempotent defaults from the method; pass True for POSTs that are safe to repeat
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+        host = urlsplit(url).netloc
+        breaker = self._breakers.setdefault(host, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.max_per_host))
+
+        attempt = 0
+        while True:
+            trial = breaker.before_request(host)
+            try:
+                async with limit:
+                    response = await self._client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached the server, so it's always safe to retry
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                logging.info(f"{method} {host} connect failed ({e!r}), retrying")
+            except (httpx.ReadTimeout, httpx.WriteTimeout, httpx.RemoteProtocolError, httpx.ReadError) as e:
+                breaker.record_failure()
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                logging.info(f"{method} {host} failed mid-request ({e!r}), retrying")
+            except httpx.TransportError:
+                # Any other transport failure (WriteError, CloseError, ...) counts against the host but isn't retried
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRY_STATUSES or not idempotent or attempt >= self.max_retries:
+                    return response
+                logging.info(f"{method} {host} returned {response.status_code}, retrying")
+                await asyncio.sleep(self._backoff(attempt, response.headers.get("retry-after")))
+                attempt += 1
+                continue
+            finally:
+                breaker.release_trial(trial)
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        # Streamed responses are never retried: once part of the body has been handed to the caller the
+        # request can't be replayed transparently. The per-host slot is held until the stream closes.
+        host = urlsplit(url).netloc
+        breaker = self._breakers.setdefault(host, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        trial = breaker.before_request(host)
+        try:
+            async with limit:
+                try:
+                    async with self._client.stream(method, url, **kwargs) as response:
+                        if response.status_code >= 500:
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                        yield response
+                except httpx.TransportError:
+                    breaker.record_failure()
+                    raise
+        finally:
+            breaker.release_trial(trial)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def metrics(self) -> dict:
+        return {host: {"state": b.state, "consecutive_failures": b.failures} for host, b in self._breakers.items()}
@@ -1,5 +1,6 @@
 import uuid
-from fastapi import FastAPI, HTTPException, Request, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from supabase import create_client, Client
@@ -8,13 +9,36 @@ from fastapi.middleware.cors import CORSMiddleware #Essential for handling Cross
 import os
 from datetime import datetime, timezone
 import logging
-import jwt
-import pyaudio
-import wave
-import whisper
 import threading
-from typing import Dict
-import requests
+import time
+from typing import Dict, List, Optional
+import asyncio
+import json
+import math
+import anyio
+import httpx
+from contextlib import asynccontextmanager
+from audit import AuditSink
+from auth import InvalidToken, TokenVerifier
+from transcription import SAMPLE_RATE, AudioRingBuffer, StreamingTranscriber
+from audio_decode import InvalidSampleRate, OpusFrameDecoder, UnsupportedAudio, check_sample_rate, decode_chunk
+from http_client import HttpClient
+from handoff import HandoffBundleManager, TooManyJobs
+from health import HealthChecks
+from pagination import TableSpec, parse_date, parse_fields, parse_type
+from patient_cache import PatientDataCache
+from patient_index import PatientSearchIndex, name_tokens
+from postgrest.exceptions import APIError
+from rate_limit import RateLimiter
+from repository import Repository
+from summarizers import HF_API_BASE, create_summarizer
+from telemetry import (REGISTRY, REQUEST_SECONDS, REQUESTS_IN_FLIGHT, SlowRequestProfiler, begin_request_stages,
+                       end_request_stages, observe_stage, server_timing, timed_stage)
+from summary_cache import AISummaryLookup, SQLiteSummaryStore, SummaryCache, summary_cache_key
+from session_store import SessionLimitReached, create_session_store
+from transcript_feed import TranscriptFeed
+from vad import VoiceGate
+from transcription_pool import TranscriptionScheduler, TranscriptionQueueFull, sessions_per_worker
 
 # Reads from .env file
 load_dotenv()
@@ -24,22 +48,131 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 HF_API_TOKEN = os.getenv("HF_API_TOKEN") #DO NOT FORGET!!! You MUST put your Hugging Face Token in the .env file to replace the text that says your_real_token_here, otherwise it will not work.
 
 
-print("DEBUG: SUPABASE_URL =", SUPABASE_URL)
-print("DEBUG: SUPABASE_KEY starts with =", SUPABASE_KEY[:8] if SUPABASE_KEY else None)
-
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("Missing Supabase URL or Key in .env file")
 
-if not HF_API_TOKEN:
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "remote")
+if SUMMARIZER_BACKEND == "remote" and not HF_API_TOKEN:
     raise RuntimeError("Missing HF_API_TOKEN in .env file")
+# SUMMARIZER_PRELOAD=0 loads the local model on the first /summarize instead of at startup
+SUMMARIZER_PRELOAD = os.getenv("SUMMARIZER_PRELOAD", "1") == "1"
+
+
+# The sync client is only used for sign-up/login and by the audit sink's background thread, so it is
+# created on first use rather than by every worker at import
+_supabase: Optional[Client] = None
+_supabase_lock = threading.Lock()
+
+def get_supabase() -> Client:
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+# Data routes go through one pooled async client instead of holding a threadpool thread per Supabase round-trip
+repository = Repository(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    max_connections=int(os.getenv("DB_MAX_CONNECTIONS", "100")),
+    max_keepalive=int(os.getenv("DB_MAX_KEEPALIVE", "20")),
+    timeout=float(os.getenv("DB_TIMEOUT", "10")),
+)
 
+# Audit events are queued and written to audit_logs in bulk by a background thread
+audit_sink = AuditSink(
+    client_factory=get_supabase,
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "50")),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0")),
+    max_queue=int(os.getenv("AUDIT_MAX_QUEUE", "10000")),
+    spill_path=os.getenv("AUDIT_SPILL_PATH", "audit_spill.jsonl"),
+)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-app = FastAPI()
+# Startup only starts things; model loads and the first JWKS fetch run in the background so the worker
+# answers /livez (and cheap routes) right away, and /readyz reports when the heavy subsystems are warm
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync routes and dependencies run on anyio's threadpool; session loops have their own threads
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    audit_sink.start()
+    await repository.connect()
+    if TRANSCRIBE_PRELOAD:
+        transcription_scheduler.start()
+    if SUMMARIZER_PRELOAD:
+        summarizer.start()
+    await token_verifier.start()
+    if PATIENT_SEARCH_ENABLED:
+        patient_index.start()
+    reaper_task = asyncio.create_task(reap_sessions())
+    logging.info(f"API started in {time.monotonic() - health.started_at:.2f}s")
+    yield
+    reaper_task.cancel()
+    # Let live sessions commit their last words while the workers are still up
+    await asyncio.to_thread(stop_live_sessions, SESSION_STOP_TIMEOUT)
+    transcription_scheduler.stop()
+    handoff_bundles.cancel_all()
+    summarizer.stop()
+    token_verifier.stop()
+    patient_index.stop()
+    await http_client.aclose()
+    await repository.close()
+    if _audio is not None:
+        _audio.terminate()
+    # Drain buffered audit events before the process exits
+    audit_sink.stop()
+
+app = FastAPI(lifespan=lifespan)
 security = HTTPBearer()
-audio = pyaudio.PyAudio()
-model = whisper.load_model('base') # AI model used to analyze wave file
-sessions: Dict[str, dict] = {} # Track streams for each client session
+health = HealthChecks()
+
+# PortAudio is only needed by /start-recording (the server's own microphone), so it is opened on first use
+_audio = None
+_audio_lock = threading.Lock()
+
+def get_audio():
+    global _audio
+    with _audio_lock:
+        if _audio is None:
+            import pyaudio
+            _audio = pyaudio.PyAudio()
+    return _audio
+
+# Whisper runs in a pool of worker processes, each with its own model copy, shared by all sessions.
+# The API process never holds the weights. TRANSCRIBE_PRELOAD=0 defers spawning the pool to the first
+# recording session, for API-only workers that shouldn't pay for Whisper at all until it is used.
+TRANSCRIBE_PRELOAD = os.getenv("TRANSCRIBE_PRELOAD", "1") == "1"
+# TRANSCRIBE_BACKEND=faster-whisper runs the model int8-quantized on CTranslate2 (TRANSCRIBE_COMPUTE_TYPE);
+# `python -m bench.transcribe_compare` measures accuracy and real-time factor of each option on this hardware.
+transcription_scheduler = TranscriptionScheduler(
+    num_workers=int(os.getenv("TRANSCRIBE_WORKERS", "2")),
+    backend=os.getenv("TRANSCRIBE_BACKEND", "whisper"),
+    model_name=os.getenv("WHISPER_MODEL", "base"),
+    task="translate",
+    threads_per_worker=int(os.getenv("TRANSCRIBE_THREADS_PER_WORKER", "1")),
+    max_queue=int(os.getenv("TRANSCRIBE_MAX_QUEUE", "32")),
+    warmup=os.getenv("TRANSCRIBE_WARMUP", "1") == "1",
+    compute_type=os.getenv("TRANSCRIBE_COMPUTE_TYPE", "int8"),
+)
+TRANSCRIBE_STEP_SECONDS = float(os.getenv("TRANSCRIBE_STEP_SECONDS", "1.5")) # How often partial text is refreshed
+TRANSCRIBE_BUFFER_SECONDS = float(os.getenv("TRANSCRIBE_BUFFER_SECONDS", "60"))
+FINAL_STEP_ATTEMPTS = int(os.getenv("TRANSCRIBE_FINAL_STEP_ATTEMPTS", "3")) # tries at the last words before a session ends
+# Silence between SBAR sections is dropped before it reaches Whisper (VAD_ENABLED=0 sends everything)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "10")) # speech = this far above the noise floor
+VAD_MIN_LEVEL_DB = float(os.getenv("VAD_MIN_LEVEL_DB", "-50"))
+VAD_HANGOVER_MS = float(os.getenv("VAD_HANGOVER_MS", "600")) # pause length that ends an utterance
+# Session status and transcripts live in a store any worker can read; SESSION_STORE=sqlite shares it across uvicorn workers
+session_store = create_session_store(
+    os.getenv("SESSION_STORE", "memory"),
+    path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "900")),
+    finished_ttl=float(os.getenv("SESSION_FINISHED_TTL", "300")),
+    max_age=float(os.getenv("SESSION_MAX_AGE", "14400")),
+)
+live_sessions: Dict[str, dict] = {} # Streams, buffers and transcribers for sessions running in this process
+opus_decoders: Dict[str, OpusFrameDecoder] = {} # Opus decoders are stateful, so keep one per session
+transcript_feed = TranscriptFeed() # Wakes SSE/WebSocket listeners when a session's transcript changes
 
 app.add_middleware( #CORS configuration
     CORSMiddleware,
@@ -49,155 +182,452 @@ app.add_middleware( #CORS configuration
     expose_headers=["*"],
 )
 
+# ---- Metrics ----
+# Per-route latency histograms and a Server-Timing breakdown (db per table, summarizer, audit) on every response
+request_profiler = SlowRequestProfiler(
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")), # e.g. 0.01 profiles 1% of requests
+    slow_seconds=float(os.getenv("PROFILE_SLOW_SECONDS", "1.0")), # only profiles of requests slower than this are kept
+    output_dir=os.getenv("PROFILE_DIR", "profiles"),
+)
+
+# Responses that keep sending after their headers (SSE, NDJSON export) are timed until the body ends
+STREAMED_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    token = begin_request_stages()
+    profiler = request_profiler.start()
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+
+    def finish(status: int):
+        REQUESTS_IN_FLIGHT.dec()
+        # Label by route template (/patients/{patient_id}) rather than the raw path to keep series bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route, status=status)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        finish(500)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        stages = end_request_stages(token)
+        if profiler is not None:
+            request_profiler.finish(profiler, request.method, request.url.path, elapsed)
+
+    if response.headers.get("content-type", "").split(";")[0] not in STREAMED_MEDIA_TYPES:
+        finish(response.status_code)
+        response.headers["Server-Timing"] = server_timing(stages, elapsed)
+        return response
+
+    # Server-Timing goes out with the headers, so for a stream it can only cover the time until then
+    response.headers["Server-Timing"] = server_timing(stages, elapsed, total_name="headers")
+    body = response.body_iterator
+
+    async def timed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            # Also runs when the client disconnects mid-stream
+            finish(response.status_code)
+
+    response.body_iterator = timed_body()
+    return response
+
+# Queue depths and live sessions are read when /metrics is scraped
+REGISTRY.gauge("transcription_sessions_live", "Recording sessions transcribed by this process.", fn=lambda: len(live_sessions))
+REGISTRY.gauge("transcription_queue_depth", "Whisper jobs waiting for a worker.", fn=lambda: transcription_scheduler.metrics()["queue_depth"])
+REGISTRY.gauge("transcription_jobs_in_flight", "Whisper jobs running on a worker.", fn=lambda: transcription_scheduler.metrics()["in_flight"])
+REGISTRY.gauge("transcription_workers_ready", "Whisper worker processes with a loaded model.", fn=lambda: transcription_scheduler.metrics()["workers_ready"])
+REGISTRY.gauge("audit_queue_pending", "Audit events waiting for the next bulk insert.", fn=lambda: audit_sink.pending())
+REGISTRY.gauge("summaries_in_flight", "Distinct summaries being generated right now.", fn=lambda: summary_cache.metrics()["in_flight"])
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# ---- Health ----
+# /livez: the process is up and its event loop answers. /readyz: 503 until the subsystems this worker preloads
+# are warm, so an orchestrator only routes traffic (and counts a rolling restart as done) after that.
+health.add("database", lambda: repository.connected)
+health.add("auth_keys", lambda: token_verifier.ready)
+health.add("summarizer", lambda: summarizer.ready, required=SUMMARIZER_PRELOAD)
+health.add("transcription", lambda: transcription_scheduler.ready, required=TRANSCRIBE_PRELOAD)
+health.add("patient_index", lambda: patient_index.ready, required=False)  # /patients/search falls back to the database
+
+# async so it answers on the event loop itself, even when every threadpool thread is busy
+@app.get("/livez")
+async def livez():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz(response: Response):
+    ready, report = health.report()
+    if not ready:
+        response.status_code = 503
+    return report
+
 # ---- Model ---- 
 class NoteRequest(BaseModel):
     situation: str
     background: str
     assessment: str
     recommendation: str
-#-------------- Hugging Face Summarizer --------------
-
-HF_MODEL_ID = "Falconsai/medical_summarization"
-
-HF_HEADERS = {
-    "Authorization": f"Bearer {HF_API_TOKEN}",
-    "Content-Type": "application/json"
-}
-
-def huggingface_summarize(prompt: str) -> str: #Sends prompt to Hugging Face Serverless Inference API and returns generated text.
-    url = f"https://router.huggingface.co/hf-inference/models/{HF_MODEL_ID}"
-    
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "temperature": 0.4,
-            "max_new_tokens": 200
-        }
-    }
-
-    response = requests.post(url, headers=HF_HEADERS, json=payload)
-
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=500,
-            detail = f"HF API Error {response.status_code}: {response.text}"
-        )
 
-    data = response.json()
+# One pooled async client (keep-alive, timeouts, retries, circuit breaker) for every outbound HTTP call
+http_client = HttpClient(
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_per_host=int(os.getenv("HTTP_MAX_PER_HOST", "20")),
+    max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+)
 
-    #Handles possible HF API response formats
-    if isinstance(data, list) and "summary_text" in data[0]:
-        summary = data[0]["summary_text"].strip()
-        return summary
+# Access tokens are verified locally against Supabase's signing keys (JWKS), which are cached and refreshed
+# in the background. SUPABASE_JWT_SECRET is only needed for projects still signing with the legacy HS256 secret.
+token_verifier = TokenVerifier(
+    jwks_url=f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+    http=http_client,
+    audience=os.getenv("JWT_AUDIENCE", "authenticated"),
+    issuer=os.getenv("JWT_ISSUER", f"{SUPABASE_URL.rstrip('/')}/auth/v1"),
+    jwt_secret=os.getenv("SUPABASE_JWT_SECRET") or None,
+    refresh_interval=float(os.getenv("JWKS_REFRESH_INTERVAL", "600")),
+    cache_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+)
 
-    if isinstance(data, dict) and "summary_text" in data:
-        return data["summary_text"].strip()
+#-------------- Summarizer --------------
+# SUMMARIZER_BACKEND=remote calls the Hugging Face router; local runs the same model on this machine's CPU
+summarizer = create_summarizer(
+    SUMMARIZER_BACKEND,
+    api_token=HF_API_TOKEN,
+    http=http_client,
+    **({
+        "max_batch_size": int(os.getenv("SUMMARIZER_MAX_BATCH", "8")),
+        "max_wait_ms": float(os.getenv("SUMMARIZER_BATCH_WAIT_MS", "10")),
+        "threads": int(os.getenv("SUMMARIZER_THREADS", "0")) or None,
+        "warmup": os.getenv("SUMMARIZER_WARMUP", "1") == "1",
+    } if SUMMARIZER_BACKEND == "local" else {
+        "base_url": os.getenv("HF_API_BASE", HF_API_BASE), # point at a stand-in server for benchmarks
+    })
+)
 
-    return str(data)
+# Identical (normalized) SBAR notes reuse an earlier summary instead of paying for another inference
+summary_cache = SummaryCache(
+    store=SQLiteSummaryStore(
+        os.getenv("SUMMARY_CACHE_PATH", "summary_cache.db"),
+        ttl=float(os.getenv("SUMMARY_CACHE_STORE_TTL", "604800")),
+        max_rows=int(os.getenv("SUMMARY_CACHE_STORE_MAX", "50000")),
+    ),
+    ai_summaries=AISummaryLookup(repository) if os.getenv("SUMMARY_CACHE_REUSE_AI_SUMMARIES", "1") == "1" else None,
+    max_entries=int(os.getenv("SUMMARY_CACHE_MAX", "1024")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "86400")),
+)
 
-# Gets current user
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# Gets current user; the token's signature, expiry, audience and issuer are checked without a call to Supabase
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
-        payload = jwt.decode(token,options={"verify_signature": False})
-        return payload.get("email")
-    except Exception:
-        return "unknown user"
+        payload = await token_verifier.verify(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}", headers={"WWW-Authenticate": "Bearer"})
+    except Exception as e:
+        # Signing keys couldn't be fetched, so the token can't be checked either way
+        logging.warning(f"Token verification unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Token verification unavailable")
+    return payload.get("email")
+
+# ---- Rate limits and admission control ----
+# Each user gets a token bucket per budget: "inference" for calls that cost model time (summaries, starting a
+# recording, handoff bundles) and a larger "read" one for chart and list reads. Over budget is a 429 for that
+# user only. Separately, new inference work is refused for everyone with a 503 while the transcription queue
+# or the summarizer is saturated, so requests fail fast instead of queueing behind minutes of backlog.
+# Budgets are per API worker. RATE_LIMIT_*_PER_MINUTE=0 turns a budget off.
+rate_limiter = RateLimiter(
+    {
+        "inference": (float(os.getenv("RATE_LIMIT_INFERENCE_PER_MINUTE", "20")) / 60, float(os.getenv("RATE_LIMIT_INFERENCE_BURST", "10"))),
+        "read": (float(os.getenv("RATE_LIMIT_READ_PER_MINUTE", "300")) / 60, float(os.getenv("RATE_LIMIT_READ_BURST", "100"))),
+    },
+    max_keys=int(os.getenv("RATE_LIMIT_MAX_USERS", "10000")),
+)
+SUMMARIZE_MAX_IN_FLIGHT = int(os.getenv("SUMMARIZE_MAX_IN_FLIGHT", "32")) # distinct summaries being generated
+# The live-session cap follows transcription capacity. Each live session sends the pool a pass every
+# TRANSCRIBE_STEP_SECONDS over the audio it hasn't committed yet (typically a few seconds, up to 20), and a pass
+# costs that many seconds times the real-time factor on one worker. The default RTF is deliberately pessimistic
+# (openai-whisper base, fp32, one thread), which allows one session per worker. Measure the configured backend
+# with `python -m bench.transcribe_compare` on the production CPU and set TRANSCRIBE_RTF to its RTF column to
+# raise the cap, or set TRANSCRIBE_SESSIONS_PER_WORKER / TRANSCRIBE_MAX_LIVE_SESSIONS directly.
+TRANSCRIBE_RTF = float(os.getenv("TRANSCRIBE_RTF", "0.5"))
+TRANSCRIBE_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_WINDOW_SECONDS", "6")) # typical audio re-read per pass
+TRANSCRIBE_SESSIONS_PER_WORKER = int(os.getenv("TRANSCRIBE_SESSIONS_PER_WORKER") or
+                                     sessions_per_worker(TRANSCRIBE_STEP_SECONDS, TRANSCRIBE_WINDOW_SECONDS, TRANSCRIBE_RTF))
+TRANSCRIBE_MAX_LIVE_SESSIONS = int(os.getenv("TRANSCRIBE_MAX_LIVE_SESSIONS") or
+                                   max(1, transcription_scheduler.num_workers) * TRANSCRIBE_SESSIONS_PER_WORKER)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40")) # threads for sync routes and dependencies (anyio's default)
+TRANSCRIBE_ADMIT_QUEUE_FRACTION = float(os.getenv("TRANSCRIBE_ADMIT_QUEUE_FRACTION", "0.75")) # of TRANSCRIBE_MAX_QUEUE
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+REQUESTS_REJECTED = REGISTRY.counter("requests_rejected_total", "Requests turned away by rate limits or admission control.", ("reason",))
+
+def rate_limited(budget: str):
+    # Authenticates like get_current_user, then charges the user's bucket for this budget
+    async def dependency(user_email: str = Depends(get_current_user)) -> str:
+        wait = rate_limiter.acquire(budget, user_email or "anonymous")
+        if wait:
+            REQUESTS_REJECTED.inc(reason=f"rate_limit_{budget}")
+            raise HTTPException(status_code=429, detail=f"Too many {budget} requests, slow down",
+                                headers={"Retry-After": str(math.ceil(wait))})
+        return user_email
+    return dependency
+
+inference_user = rate_limited("inference")
+read_user = rate_limited("read")
+
+def reject_overloaded(reason: str, detail: str):
+    REQUESTS_REJECTED.inc(reason=reason)
+    raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+
+def admit_transcription_session():
+    stats = transcription_scheduler.metrics()
+    if len(live_sessions) >= TRANSCRIBE_MAX_LIVE_SESSIONS:
+        reject_overloaded("transcription_sessions", "Too many recordings in progress, try again shortly")
+    if stats["queue_depth"] >= stats["queue_capacity"] * TRANSCRIBE_ADMIT_QUEUE_FRACTION:
+        reject_overloaded("transcription_queue", "Transcription is backed up, try again shortly")
+
+def admit_summary(key: str):
+    # Cached and duplicate-of-running summaries cost nothing, so only new generations are refused
+    if summary_cache.will_generate(key) and summary_cache.metrics()["in_flight"] >= SUMMARIZE_MAX_IN_FLIGHT:
+        reject_overloaded("summarizer", "Summarizer is at capacity, try again shortly")
+
+@app.get("/rate-limits/metrics")
+def rate_limit_metrics():
+    return rate_limiter.metrics()
 
 # Audits
 def log_audit(request: Request, user_email: str, action: str):
     try:
         endpoint = request.url.path
 
-        supabase.table("audit_logs").insert({
-            "user_email": user_email,
-            "endpoint": endpoint,
-            "action": action,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }).execute()
+        # Queued for a bulk insert so the response isn't held up by the audit round-trip
+        with timed_stage("log_audit"):
+            audit_sink.emit({
+                "user_email": user_email,
+                "endpoint": endpoint,
+                "action": action,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
         logging.info(f"{user_email} | {action} | {endpoint}")
     except Exception as e:
         logging.warning(f"Failed to log audit event: {e}")
 
-# Stream and transcribe audio
+# Create a transcription session; audio is written into its ring buffer by whichever capture path feeds it
+def new_session(source: str, owner: Optional[str] = None) -> str:
+    session_id = str(uuid.uuid4()) # Generate a new session id
+    try:
+        session_store.create(session_id, source, owner=owner)
+    except SessionLimitReached:
+        reject_overloaded("session_store", "Too many recordings in progress, try again shortly")
+    transcription_scheduler.start() # no-op once the pool is running (see TRANSCRIBE_PRELOAD)
+
+    # PCM stays in memory; the transcriber re-reads overlapping windows from the ring buffer.
+    # Capture paths write through the gate, which only lets speech into the buffer.
+    buffer = AudioRingBuffer(capacity_seconds=TRANSCRIBE_BUFFER_SECONDS, sample_rate=SAMPLE_RATE)
+    live_sessions[session_id] = {
+        'stream': None,
+        'source': source,
+        'buffer': buffer,
+        'gate': VoiceGate(
+            buffer,
+            threshold_db=VAD_THRESHOLD_DB,
+            min_level_db=VAD_MIN_LEVEL_DB,
+            hangover_ms=VAD_HANGOVER_MS,
+            enabled=VAD_ENABLED,
+        ),
+        'transcriber': StreamingTranscriber(
+            transcription_scheduler.transcribe_fn(session_id), buffer, step_seconds=TRANSCRIBE_STEP_SECONDS
+        ),
+        'partial': '',
+    }
+    return session_id
+
+# Totals over finished sessions, for /transcription/metrics and the transcription_audio_seconds_total counter
+VAD_AUDIO_SECONDS = REGISTRY.counter("transcription_audio_seconds_total", "Captured audio, by whether it was sent to Whisper.", ("kind",))
+vad_totals = {"sessions": 0, "audio_seconds": 0.0, "voiced_seconds": 0.0}
+vad_totals_lock = threading.Lock()
+
+def record_vad_stats(session_id: str, gate: VoiceGate):
+    stats = gate.metrics()
+    VAD_AUDIO_SECONDS.inc(stats["voiced_seconds"], kind="voiced")
+    VAD_AUDIO_SECONDS.inc(stats["audio_seconds"] - stats["voiced_seconds"], kind="skipped")
+    with vad_totals_lock:
+        vad_totals["sessions"] += 1
+        vad_totals["audio_seconds"] += stats["audio_seconds"]
+        vad_totals["voiced_seconds"] += stats["voiced_seconds"]
+    logging.info(f"Session {session_id}: {stats['audio_seconds']:.1f}s captured, {stats['skipped_fraction']:.0%} silence skipped, "
+                 f"{stats['utterances']} utterances")
+
+# Transcribe a session's buffer as audio arrives, until recording is stopped (by any worker, or the reaper)
+def transcription_loop(session_id: str, live: dict):
+    transcriber = live['transcriber']
+    try:
+        while session_store.is_recording(session_id):
+            # Chunks uploaded through other workers are handed over via the store
+            for samples in session_store.pop_audio(session_id):
+                live['gate'].write(samples)
+            # A finished utterance is committed right away instead of waiting for the next one to start
+            boundary = live['gate'].pop_boundary()
+            if boundary is None and not transcriber.ready():
+                time.sleep(0.05)
+                continue
+            try:
+                if boundary is not None:
+                    new_text, partial = transcriber.step(final=True, end=boundary)
+                else:
+                    new_text, partial = transcriber.step()
+            except TranscriptionQueueFull:
+                # Pool is saturated; audio keeps buffering and the same window is retried shortly
+                if boundary is not None:
+                    live['gate'].push_boundary(boundary)
+                time.sleep(0.2)
+                continue
+            except Exception:
+                # A failed chunk (model error, timeout, dead worker) is retried rather than ending the session;
+                # the transcriber didn't move past it and the utterance boundary goes back for the retry
+                logging.exception(f"Transcription step failed for session {session_id}")
+                if boundary is not None:
+                    live['gate'].push_boundary(boundary)
+                time.sleep(0.5)
+                continue
+            if new_text or partial != live['partial']:
+                live['partial'] = partial
+                session_store.append(session_id, new_text, partial)
+                transcript_feed.notify(session_id)
+
+        # Commit whatever was said after the last step
+        for samples in session_store.pop_audio(session_id):
+            live['gate'].write(samples)
+        live['gate'].flush()
+        attempts = 0
+        while True:
+            try:
+                new_text, _ = transcriber.step(final=True)
+                break
+            except TranscriptionQueueFull:
+                time.sleep(0.2)
+            except Exception:
+                attempts += 1
+                if attempts >= FINAL_STEP_ATTEMPTS:
+                    logging.exception(f"Final transcription step failed for session {session_id}")
+                    new_text = []
+                    break
+                logging.warning(f"Final transcription step failed for session {session_id}; retrying", exc_info=True)
+                time.sleep(0.5)
+        session_store.append(session_id, new_text, "")
+    finally:
+        record_vad_stats(session_id, live['gate'])
+        # The transcript stays readable in the store for the grace period; live objects can go
+        session_store.finish(session_id)
+        live_sessions.pop(session_id, None)
+        opus_decoders.pop(session_id, None)
+        # Lets push subscribers know no more segments are coming
+        transcript_feed.notify(session_id)
+
+# Stream and transcribe audio from the server's microphone
 def recording_worker(session_id: str):
     # Get the session ID
-    session = sessions.get(session_id)
+    live = live_sessions.get(session_id)
+
+    import pyaudio
 
     # Stream configuration
     FORMAT = pyaudio.paInt16
     CHANNELS = 1
-    RATE = 16000
+    RATE = SAMPLE_RATE
     CHUNK = 1024
-    RECORD_SECONDS = 10
-    WAVE_OUTPUT_FILENAME = f"{session_id}_output.wav"
+    audio = get_audio()
     DEFAULT_INDEX = audio.get_default_input_device_info() # get the user's default microphone
+    gate = live['gate']
 
-    # Audio frame buffer
-    frames = []
+    # PortAudio calls this from its own thread, so capture keeps going while whisper is busy
+    def on_audio(in_data, frame_count, time_info, status):
+        gate.write_pcm16(in_data)
+        return (None, pyaudio.paContinue)
 
+    stream = None
     try:
-        while (session['is_recording']):
-            # Get the session ID for changes in values
-            session = sessions.get(session_id)
-
-            # Open the stream
-            stream = audio.open(
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=RATE,
-                input=True,
-                frames_per_buffer=CHUNK,
-                input_device_index=DEFAULT_INDEX['index']
-            )
-
-            session['stream'] = stream # Save stream with current session id
-
-            for i in range(0, int(RATE / CHUNK * RECORD_SECONDS)):
-                # Check if stop called before reading next frame
-                if not (session['is_recording']):
-                        break
-                data = stream.read(CHUNK)
-                frames.append(data)
-
-            # Close this session's stream
-            if stream:
-                stream.stop_stream()
-                stream.close()
-                stream = None
-
-            # Only create the audio file and transcibe it if there is anything in the buffer
-            if frames:
-                # Convert to WAV
-                waveFile = wave.open(WAVE_OUTPUT_FILENAME, 'wb')
-                waveFile.setnchannels(CHANNELS)
-                waveFile.setsampwidth(audio.get_sample_size(FORMAT))
-                waveFile.setframerate(RATE)
-                waveFile.writeframes(b''.join(frames))
-                waveFile.close()
-
-                # Transcribe
-                audio_data = whisper.pad_or_trim(whisper.load_audio(WAVE_OUTPUT_FILENAME))
-                result = whisper.transcribe(model, audio_data, task="translate", fp16=False)
-                session['transcription'].append(result["text"])
-                os.remove(WAVE_OUTPUT_FILENAME) # No need to keep the voice file
-     
-    except Exception as e:
-        print(f"Recording error in session {session_id}: {e}")    
+        # Open the stream
+        stream = audio.open(
+            format=FORMAT,
+            channels=CHANNELS,
+            rate=RATE,
+            input=True,
+            frames_per_buffer=CHUNK,
+            input_device_index=DEFAULT_INDEX['index'],
+            stream_callback=on_audio
+        )
+        live['stream'] = stream # Save stream with current session id
+        transcription_loop(session_id, live)
+
+    except Exception:
+        logging.exception(f"Recording error in session {session_id}")
+        session_store.finish(session_id)
+        live_sessions.pop(session_id, None)
+    finally:
+        # Close this session's stream
+        if stream:
+            stream.stop_stream()
+            stream.close()
+
+# Transcribe audio uploaded by a client; capture happens on the client device
+def upload_worker(session_id: str):
+    try:
+        transcription_loop(session_id, live_sessions[session_id])
+    except Exception:
+        logging.exception(f"Transcription error in session {session_id}")
+
+# Session loops last as long as the recording, so each runs on its own thread. As BackgroundTasks they
+# would each hold one of Starlette's shared threadpool threads (40 by default) and starve every sync route.
+SESSION_STOP_TIMEOUT = float(os.getenv("SESSION_STOP_TIMEOUT", "10")) # wait for the last chunk on stop/shutdown
+
+def start_session_thread(session_id: str, target):
+    thread = threading.Thread(target=target, args=(session_id,), name=f"session-{session_id[:8]}", daemon=True)
+    live_sessions[session_id]['thread'] = thread
+    thread.start()
+
+def stop_live_sessions(timeout: float):
+    # Shutdown: stop every session this process runs and give their loops a shared deadline to finish
+    threads = []
+    for session_id, live in list(live_sessions.items()):
+        session_store.stop(session_id)
+        if live.get('thread'):
+            threads.append(live['thread'])
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    if any(thread.is_alive() for thread in threads):
+        logging.warning("Some recording sessions were still finishing at shutdown")
+
+# Periodically stop idle sessions and drop finished ones once their grace period is over
+async def reap_sessions():
+    while True:
+        await asyncio.sleep(float(os.getenv("SESSION_REAP_INTERVAL", "30")))
+        try:
+            removed = await asyncio.to_thread(session_store.reap)
+            for session_id in removed:
+                opus_decoders.pop(session_id, None)
+            if removed:
+                logging.info(f"Reaped {len(removed)} expired recording sessions")
+        except Exception as e:
+            logging.warning(f"Session reaper failed: {e}")
 
 # Gets last 10 audits available
 @app.get("/audits/recent")
-def get_recent_audits():
-    response = (
-        supabase.table("audit_logs")
-        .select("*")
-        .order("timestamp", desc=True)
-        .limit(10)
-        .execute()
-    )
-    if not response.data:
+async def get_recent_audits():
+    recent = await repository.recent_audit_logs(limit=10)
+    if not recent:
         raise HTTPException(status_code=404, detail="No audit records found")
-    return {"recent_audits": response.data}
+    return {"recent_audits": recent}
 
 # Logins
 class UserSignUp(BaseModel):
@@ -211,9 +641,8 @@ class UserLogin(BaseModel):
 
 # --------Auth Routes----------
 
-@app.post("/summarize")
-async def summarize(note: NoteRequest):
-    prompt = f"""
+def build_sbar_prompt(note: NoteRequest) -> str:
+    return f"""
 You are a helpful clinical assistant. You receive a doctor's note written in the SBAR format:
 - Situation
 - Background
@@ -232,13 +661,87 @@ Recommendation: {note.recommendation}
 Summary:
 """
 
-    summary_text = huggingface_summarize(prompt)
-    return {"summary": summary_text.strip()}
+# Summarize through the cache; returns (summary, where it came from)
+def note_cache_key(note: NoteRequest) -> str:
+    return summary_cache_key(note.model_dump(), summarizer.model_id, summarizer.generation_params)
+
+async def summarize_note(note: NoteRequest):
+    prompt = build_sbar_prompt(note)
+    fields = note.model_dump()
+    key = note_cache_key(note)
+
+    # Runs off the event loop (executor / batched local inference) so other requests keep flowing
+    async def compute():
+        with timed_stage("huggingface_summarize", summarizer.name):
+            return await summarizer.summarize(prompt)
+
+    summary_text, source = await summary_cache.get_or_compute(key, fields, compute)
+    return summary_text.strip(), source
+
+@app.post("/summarize")
+async def summarize(note: NoteRequest, user_email: str = Depends(inference_user)):
+    admit_summary(note_cache_key(note))
+    summary_text, source = await summarize_note(note)
+    return {"summary": summary_text, "cached": source != "model"}
+
+# Streaming variant of /summarize, as Server-Sent Events: "token" events carry text to append as it is
+# generated, then one "done" event has the full summary (or an "error" event if generation failed).
+# Cached summaries arrive as a single token event.
+SUMMARY_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "summary_time_to_first_token_seconds", "Time from a streamed summary request to its first text.", ("backend", "source")
+)
+
+@app.post("/summarize/stream")
+async def summarize_stream(note: NoteRequest, user_email: str = Depends(inference_user)):
+    started = time.perf_counter()
+    prompt = build_sbar_prompt(note)
+    fields = note.model_dump()
+    key = note_cache_key(note)
+    admit_summary(key) # before the stream starts, so a refusal is a real 503 rather than an error event
+
+    async def event_stream():
+        parts, source, first_token = [], "model", None
+        try:
+            async for text, source in summary_cache.stream(key, fields, lambda: summarizer.summarize_stream(prompt)):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    SUMMARY_FIRST_TOKEN_SECONDS.observe(first_token, backend=summarizer.name, source=source)
+                parts.append(text)
+                yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+        except HTTPException as e:
+            yield f"event: error\ndata: {json.dumps({'status': e.status_code, 'detail': e.detail})}\n\n"
+            return
+        except Exception as e:
+            logging.warning(f"Streamed summary failed: {e!r}")
+            yield f"event: error\ndata: {json.dumps({'status': 500, 'detail': str(e) or type(e).__name__})}\n\n"
+            return
+        if source == "model":
+            observe_stage("huggingface_summarize", time.perf_counter() - started, summarizer.name)
+        done = {
+            "summary": "".join(parts).strip(),
+            "cached": source != "model",
+            "ttft_ms": round(1000 * first_token, 1) if first_token is not None else None,
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/summary-cache/metrics")
+def summary_cache_metrics():
+    return summary_cache.metrics()
+
+@app.get("/auth/metrics")
+def auth_metrics():
+    return token_verifier.metrics()
 
 @app.post("/signup")
 def signup(user: UserSignUp, request: Request):
     try:
-        response = supabase.auth.sign_up({
+        response = get_supabase().auth.sign_up({
             "email": user.email,
             "password": user.password,
             "options":{
@@ -271,7 +774,7 @@ def signup(user: UserSignUp, request: Request):
 @app.post("/login")
 def login(user: UserLogin, request: Request):
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = get_supabase().auth.sign_in_with_password({
             "email": user.email,
             "password": user.password
         })
@@ -291,12 +794,13 @@ def login(user: UserLogin, request: Request):
     return {"message": "Logged in", "access_token": response.session.access_token}
 
 @app.post("/logout")
-def logout(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def logout(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
 
-    # decode email for audit (no signature verification needed)
+    # Email for the audit entry; only trusted if the token verifies
+    payload = None
     try:
-        payload = jwt.decode(token, options={"verify_signature": False})
+        payload = await token_verifier.verify(token)
         email = payload.get("email", "unknown")
     except Exception:
         email = "unknown"
@@ -308,11 +812,16 @@ def logout(request: Request, credentials: HTTPAuthorizationCredentials = Depends
         "Authorization": f"Bearer {token}"
     }
 
+    # Revoking the same token twice is harmless, so let the client retry transient failures
     try:
-        requests.post(url, headers=headers)
+        await http_client.post(url, headers=headers, idempotent=True)
     except Exception as e:
         logging.warning("Supabase logout failed: " + str(e))
 
+    # Stop accepting this token locally, even though it hasn't expired yet
+    if payload:
+        token_verifier.revoke(token, payload)
+
     # Audit log
     log_audit(request, email, "LOGOUT")
 
@@ -320,130 +829,323 @@ def logout(request: Request, credentials: HTTPAuthorizationCredentials = Depends
 
 
 # ---------Patient Info----------
+# Chart sections: table, patient id column, date column for since/until, keyset columns (newest first)
+# and the column type= filters on. Tables without an Id are keyed by date, encounter and code, which can tie;
+# split_page keeps tied rows on the same page so none are skipped between pages.
+CHART_SECTIONS = {
+    "patient": TableSpec("patients", "Id", None, ("Id",)),
+    "allergies": TableSpec("allergies", "PATIENT", "START", ("START", "ENCOUNTER", "CODE"), "CATEGORY"),
+    "careplans": TableSpec("careplans", "PATIENT", "START", ("START", "Id")),
+    "conditions": TableSpec("conditions", "PATIENT", "START", ("START", "ENCOUNTER", "CODE")),
+    "devices": TableSpec("devices", "PATIENT", "START", ("START", "ENCOUNTER", "CODE")),
+    "encounters": TableSpec("encounters", "PATIENT", "START", ("START", "Id"), "ENCOUNTERCLASS"),
+    "imaging_studies": TableSpec("imaging_studies", "PATIENT", "DATE", ("DATE", "Id"), "MODALITY_CODE"),
+    "immunizations": TableSpec("immunizations", "PATIENT", "DATE", ("DATE", "ENCOUNTER", "CODE")),
+    "medications": TableSpec("medications", "PATIENT", "START", ("START", "ENCOUNTER", "CODE")),
+    "observations": TableSpec("observations", "PATIENT", "DATE", ("DATE", "ENCOUNTER", "CODE"), "CATEGORY"),
+    "procedures": TableSpec("procedures", "PATIENT", "START", ("START", "ENCOUNTER", "CODE")),
+}
+CLINICAL_DEFAULT_LIMIT = int(os.getenv("CLINICAL_DEFAULT_LIMIT", "200"))
+CLINICAL_MAX_LIMIT = int(os.getenv("CLINICAL_MAX_LIMIT", "1000"))
+
+# Clinical tables that rarely change are cached longer than vitals and encounters
+patient_cache = PatientDataCache(
+    max_entries=int(os.getenv("PATIENT_CACHE_MAX", "5000")),
+    default_ttl=float(os.getenv("PATIENT_CACHE_TTL", "120")),
+    table_ttls={
+        "observations": float(os.getenv("PATIENT_CACHE_TTL_OBSERVATIONS", "30")),
+        "encounters": float(os.getenv("PATIENT_CACHE_TTL_ENCOUNTERS", "60")),
+        "immunizations": float(os.getenv("PATIENT_CACHE_TTL_STATIC", "3600")),
+        "imaging_studies": float(os.getenv("PATIENT_CACHE_TTL_STATIC", "3600")),
+        "procedures": float(os.getenv("PATIENT_CACHE_TTL_STATIC", "3600")),
+    },
+)
+CHART_SECTION_TIMEOUT = float(os.getenv("CHART_SECTION_TIMEOUT", "10"))
+
+# Typeahead search runs against an in-process index of the patients table (list-view columns only) instead of
+# a database query per keystroke. It reloads fully every PATIENT_SEARCH_FULL_REFRESH_INTERVAL; set
+# PATIENT_UPDATED_COLUMN to the table's updated-at column to also pick up changes every PATIENT_SEARCH_REFRESH_INTERVAL.
+PATIENT_SEARCH_ENABLED = os.getenv("PATIENT_SEARCH_ENABLED", "1") == "1"
+PATIENT_SEARCH_MAX_LIMIT = int(os.getenv("PATIENT_SEARCH_MAX_LIMIT", "50"))
+PATIENT_LIST_COLUMNS = [c.strip() for c in os.getenv("PATIENT_LIST_COLUMNS", "Id,FIRST,LAST,BIRTHDATE,GENDER").split(",") if c.strip()]
+PATIENT_SEARCH_NAME_COLUMNS = [c.strip() for c in os.getenv("PATIENT_SEARCH_NAME_COLUMNS", "FIRST,LAST").split(",") if c.strip()]
+patient_index = PatientSearchIndex(
+    repository,
+    list_columns=PATIENT_LIST_COLUMNS,
+    name_columns=PATIENT_SEARCH_NAME_COLUMNS,
+    exact_columns=[c.strip() for c in os.getenv("PATIENT_SEARCH_EXACT_COLUMNS", "Id").split(",") if c.strip()],
+    updated_column=os.getenv("PATIENT_UPDATED_COLUMN") or None,
+    refresh_interval=float(os.getenv("PATIENT_SEARCH_REFRESH_INTERVAL", "60")),
+    full_refresh_interval=float(os.getenv("PATIENT_SEARCH_FULL_REFRESH_INTERVAL", "900")),
+    page_size=int(os.getenv("PATIENT_SEARCH_PAGE_SIZE", "1000")),
+)
+REGISTRY.gauge("patient_index_rows", "Patients held in the in-process search index.", fn=lambda: patient_index.metrics()["patients"])
+
+# One page of a chart section, served from the per-patient cache when fresh. Returns (rows, next_cursor).
+async def fetch_chart_section(section: str, patient_id: str, fields: Optional[str] = None, since: Optional[str] = None,
+                        until: Optional[str] = None, type: Optional[str] = None, limit: int = CLINICAL_DEFAULT_LIMIT,
+                        cursor: Optional[str] = None):
+    spec = CHART_SECTIONS[section]
+    select = parse_fields(fields, spec.keys)
+    since, until, type = parse_date(since, "since"), parse_date(until, "until"), parse_type(type)
+    if (since or until) and not spec.date_column:
+        raise HTTPException(status_code=400, detail=f"{section} can't be filtered by date")
+    if type and not spec.type_column:
+        raise HTTPException(status_code=400, detail=f"{section} can't be filtered by type")
+
+    async def load():
+        try:
+            return await repository.clinical_page(spec, patient_id, select, since=since, until=until, type=type, limit=limit, cursor=cursor)
+        except APIError as e:
+            raise database_error(e, section)
+
+    return await patient_cache.get_or_load(spec.table, patient_id, load, variant=(select, since, until, type, limit, cursor))
+
+# PostgREST errors: a value the database couldn't parse or compare (22xxx) or a filter it couldn't read (PGRST1xx)
+# is the caller's mistake; anything else is an upstream failure
+def database_error(e: APIError, what: str) -> HTTPException:
+    code = str(e.code or "")
+    if code.startswith("22") or code.startswith("PGRST1"):
+        return HTTPException(status_code=400, detail=f"Invalid request for {what}: {e.message}")
+    logging.warning(f"Database error fetching {what}: {e!r}")
+    return HTTPException(status_code=502, detail=f"Database error fetching {what}")
+
+# Shared query parameters for the clinical table routes
+def clinical_query(
+    fields: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = Query(CLINICAL_DEFAULT_LIMIT, ge=1, le=CLINICAL_MAX_LIMIT),
+    cursor: Optional[str] = None,
+):
+    return {"fields": fields, "since": since, "until": until, "type": type, "limit": limit, "cursor": cursor}
+
 #Get all patients (optional pagination)
 @app.get("/patients")
-def get_all_patients(request: Request, user_email:str = Depends(get_current_user), limit: int = 50, offset: int = 0):
-    response = (
-        supabase.table("patients")
-        .select("*")
-        .range(offset, offset + limit - 1)
-        .execute()
-    )
+async def get_all_patients(request: Request, user_email:str = Depends(read_user), limit: int = Query(50, ge=1, le=CLINICAL_MAX_LIMIT),
+                     offset: int = 0, cursor: Optional[str] = None, fields: Optional[str] = None):
+    # Keyset pagination on Id: pass next_cursor back as ?cursor= for the next page. offset is still
+    # accepted for old clients but gets slower the deeper it goes.
     # If the table is empty return an empty list instead of 404 so the UI
     # can render an empty state. Audit as usual (log_audit already handles
     # its own errors).
-    patients = response.data or []
+    patients, next_cursor = await repository.list_patients(parse_fields(fields, ("Id",)), limit, cursor=cursor, offset=offset)
     log_audit(request, user_email, "VIEW_ALL_PATIENTS")
-    return {"patients": patients}
+    return {"patients": patients, "next_cursor": next_cursor}
+
+# Typeahead: exact id, then name prefixes ("ann gl"), then close misspellings. Declared before /patients/{patient_id}
+# so "search" isn't taken for an id. Results carry names and birthdates, so every search is audited with its query
+# and result count; the audit sink batches the writes, so typeahead keystrokes don't each cost a round-trip.
+@app.get("/patients/search")
+async def search_patients(request: Request, q: str = "", limit: int = Query(20, ge=1, le=PATIENT_SEARCH_MAX_LIMIT),
+                          user_email: str = Depends(read_user)):
+    started = time.perf_counter()
+    if patient_index.ready:
+        patients, source = patient_index.search(q, limit), "index"
+    else:
+        # Index still loading (or disabled): a plain prefix match on the first word of the name, on the columns
+        # the index found in the table
+        words = name_tokens(q)
+        patients = []
+        if words and patient_index.name_columns:
+            try:
+                patients = await repository.search_patients(words[0], patient_index.name_columns, ",".join(patient_index.list_columns), limit)
+            except (APIError, httpx.HTTPError) as e:
+                logging.warning(f"Patient search fallback query failed: {e!r}")
+                raise HTTPException(status_code=503, detail="Patient search is unavailable, try again shortly",
+                                    headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+        source = "database"
+    observe_stage("patient_search", time.perf_counter() - started, source)
+    log_audit(request, user_email, f"SEARCH_PATIENTS q={q[:100]!r} results={len(patients)}")
+    return {"patients": patients, "source": source}
+
+@app.get("/patient-index/metrics")
+def patient_index_metrics():
+    return patient_index.metrics()
+
+# Continuation token for the next page of a clinical table goes in a header so the body stays a plain list
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
 # Get a patient
 @app.get("/patients/{patient_id}")
-def get_patient(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("patients").select("*").eq("Id", patient_id).execute()
-    if not response.data:
+async def get_patient(patient_id: str, request: Request, user_email: str = Depends(read_user)):
+    data, _ = await fetch_chart_section("patient", patient_id)
+    if not data:
         raise HTTPException(status_code=404, detail="Patient not found")
     log_audit(request, user_email, f"VIEW_PATIENT_{patient_id}")
-    return response.data
+    return data
 
 # Get patients allergies
 @app.get("/patients/{patient_id}/allergies")
-def get_patient_allergies(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("allergies").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_allergies(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("allergies", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No allergies found")
     log_audit(request, user_email, f"VIEW_ALLERGIES_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients careplans
 @app.get("/patients/{patient_id}/careplans")
-def get_patient_careplans(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("careplans").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_careplans(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("careplans", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No careplan found")
     log_audit(request, user_email, f"VIEW_CAREPLANS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients conditions
 @app.get("/patients/{patient_id}/conditions")
-def get_patient_conditions(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("conditions").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_conditions(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("conditions", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No conditions found")
     log_audit(request, user_email, f"VIEW_CONDITIONS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients devices
 @app.get("/patients/{patient_id}/devices")
-def get_patient_devices(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("devices").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_devices(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("devices", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No devices found")
     log_audit(request, user_email, f"VIEW_DEVICES_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients encounters
 @app.get("/patients/{patient_id}/encounters")
-def get_patient_encounters(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("encounters").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_encounters(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("encounters", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No encounters found")
     log_audit(request, user_email, f"VIEW_ENCOUNTERS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients imaging studies
 @app.get("/patients/{patient_id}/imaging_studies")
-def get_patient_imaging_studies(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("imaging_studies").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_imaging_studies(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("imaging_studies", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No imaging studies found")
     log_audit(request, user_email, f"VIEW_IMAGING_STUDIES_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients immunizations
 @app.get("/patients/{patient_id}/immunizations")
-def get_patient_immunizations(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("immunizations").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_immunizations(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("immunizations", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No immunizations found")
     log_audit(request, user_email, f"VIEW_IMMUNIZATIONS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients medications
 @app.get("/patients/{patient_id}/medications")
-def get_patient_medications(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("medications").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_medications(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("medications", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No medications found")
     log_audit(request, user_email, f"VIEW_MEDICATIONS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients observations
 @app.get("/patients/{patient_id}/observations")
-def get_patient_observations(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("observations").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_observations(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("observations", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No observations found")
     log_audit(request, user_email, f"VIEW_OBSERVATIONS_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
 
 # Get patients procedures
 @app.get("/patients/{patient_id}/procedures")
-def get_patient_procedures(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
-    response = supabase.table("procedures").select("*").eq("PATIENT", patient_id).execute()
-    if not response.data:
+async def get_patient_procedures(patient_id: str, request: Request, response: Response, query: dict = Depends(clinical_query), user_email: str = Depends(read_user)):
+    data, next_cursor = await fetch_chart_section("procedures", patient_id, **query)
+    if not data and not query["cursor"]:
         raise HTTPException(status_code=404, detail="No procedures found")
     log_audit(request, user_email, f"VIEW_PROCEDURES_{patient_id}")
-    return response.data
+    set_next_cursor(response, next_cursor)
+    return data
+
+# Drop cached chart data for a patient after it was changed outside this API (optionally one table only)
+@app.post("/patients/{patient_id}/cache/invalidate")
+def invalidate_patient_cache(patient_id: str, request: Request, table: Optional[str] = None, user_email: str = Depends(get_current_user)):
+    removed = patient_cache.invalidate(patient_id, table)
+    log_audit(request, user_email, f"INVALIDATE_CACHE_{patient_id}")
+    return {"patient_id": patient_id, "invalidated": removed}
+
+@app.get("/patient-cache/metrics")
+def patient_cache_metrics():
+    return patient_cache.metrics()
+
+# Full chart for handoff: every section is fetched concurrently and audited once
+@app.get("/patients/{patient_id}/chart")
+async def get_patient_chart(patient_id: str, request: Request, user_email: str = Depends(read_user), sections: Optional[str] = None,
+                            since: Optional[str] = None, limit: int = Query(CLINICAL_DEFAULT_LIMIT, ge=1, le=CLINICAL_MAX_LIMIT)):
+    # sections is a comma separated list, e.g. ?sections=patient,allergies,medications
+    if sections:
+        requested = [s.strip() for s in sections.split(",") if s.strip()]
+        unknown = [s for s in requested if s not in CHART_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown chart sections: {', '.join(unknown)}")
+    else:
+        requested = list(CHART_SECTIONS)
+    # Checked once here; a bad date would otherwise come back as the same error in every section
+    since = parse_date(since, "since")
+
+    # since= only applies to dated sections; the patient row is always returned whole
+    def fetch(section: str):
+        dated = CHART_SECTIONS[section].date_column is not None
+        return fetch_chart_section(section, patient_id, since=since if dated else None, limit=limit)
+
+    # Sections are awaited together on the shared connection pool, so no thread is held per section
+    tasks = [asyncio.wait_for(fetch(section), timeout=CHART_SECTION_TIMEOUT) for section in requested]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # One failing or slow table shouldn't sink the whole chart; report it per section instead
+    chart = {}
+    errors = {}
+    next_cursors = {}
+    for section, result in zip(requested, results):
+        if isinstance(result, asyncio.TimeoutError):
+            chart[section] = None
+            errors[section] = f"Timed out after {CHART_SECTION_TIMEOUT}s"
+        elif isinstance(result, Exception):
+            logging.warning(f"Chart section {section} failed for {patient_id}: {result!r}")
+            chart[section] = None
+            errors[section] = str(result) or type(result).__name__
+        else:
+            chart[section], next_cursor = result
+            if next_cursor:
+                next_cursors[section] = next_cursor
+
+    if "patient" in requested and "patient" not in errors and not chart["patient"]:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    log_audit(request, user_email, f"VIEW_CHART_{patient_id}")
+    # Sections cut off at limit carry a cursor for the matching per-table route
+    return {"patient_id": patient_id, "chart": chart, "errors": errors, "next_cursors": next_cursors}
 
 # Save SBAR Note
 @app.post("/patients/{patient_id}/sbar")
-def save_sbar(patient_id: str, note:NoteRequest, request: Request, user_email: str = Depends(get_current_user)):
+async def save_sbar(patient_id: str, note:NoteRequest, request: Request, user_email: str = Depends(get_current_user)):
     try:
-        response = supabase.table("patients").select("*").eq("Id", patient_id).execute()
+        exists = await repository.patient_exists(patient_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase query failed: {e}")
     
-    if not response.data:
+    if not exists:
         raise HTTPException(status_code=404, detail="Patient not found")
     data = {
         "patient_id": patient_id,
@@ -454,11 +1156,12 @@ def save_sbar(patient_id: str, note:NoteRequest, request: Request, user_email: s
     }
 
     try:
-        response = supabase.table("sbar").insert(data).execute()
+        row = await repository.insert_sbar(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save SBAR: {e}")
     
-    sbar_id = response.data[0]["id"]
+    sbar_id = row["id"]
+    patient_cache.invalidate(patient_id)
     log_audit(request, user_email, f"Save_SBAR_{patient_id}")
     return {
         "message": "SBAR note saved",
@@ -467,40 +1170,34 @@ def save_sbar(patient_id: str, note:NoteRequest, request: Request, user_email: s
 
 # Get SBAR note
 @app.get("/patients/{patient_id}/sbar_notes")
-def read_sbar(patient_id: str, request: Request, user_email: str = Depends(get_current_user)):
+async def read_sbar(patient_id: str, request: Request, user_email: str = Depends(read_user)):
     try:
-        response = supabase.table("patients").select("*").eq("Id", patient_id).execute()
+        exists = await repository.patient_exists(patient_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase query failed: {e}")
     
-    if not response.data:
+    if not exists:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     try:
-        response = supabase.table("sbar").select("situation, background, assessment, recommendation").eq("patient_id", patient_id).order("created_at", desc=True).execute()
+        notes = await repository.sbar_notes(patient_id, select="situation, background, assessment, recommendation", limit=1)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch SBAR notes: {e}")
-    if not response.data:
+    if not notes:
         return {"sbar": []}
     
     log_audit(request, user_email, f"VIEW_SBAR_{patient_id}")
-    return {"sbar": response.data[0]}
+    return {"sbar": notes[0]}
 
 # -------Voice-To-Text-------
 #Start Recording
 @app.post("/start-recording")
-def start_recording(background_tasks: BackgroundTasks):
-    session_id = str(uuid.uuid4()) # Generate a new session id
+def start_recording(user_email: str = Depends(inference_user)):
+    admit_transcription_session()
+    session_id = new_session(source="server_mic", owner=user_email)
 
-    # Initialize session details
-    sessions[session_id] = {
-        'is_recording': True,
-        'transcription': [],
-        'stream': None
-    }
-    
-     # Start recording in background
-    background_tasks.add_task(recording_worker, session_id)
+    # Start recording in background
+    start_session_thread(session_id, recording_worker)
 
     return {
         "session_id": session_id, 
@@ -508,57 +1205,289 @@ def start_recording(background_tasks: BackgroundTasks):
         "message": "Recording started in background."
     }
 
+#Start a session fed with audio captured on the client (chunked POSTs or a WebSocket)
+@app.post("/start-client-recording")
+def start_client_recording(user_email: str = Depends(inference_user)):
+    admit_transcription_session()
+    session_id = new_session(source="client", owner=user_email)
+    start_session_thread(session_id, upload_worker)
+
+    return {
+        "session_id": session_id,
+        "recording_started": True,
+        "sample_rate": SAMPLE_RATE,
+        "message": "Send audio to /upload-audio/{session_id} or /ws/upload-audio/{session_id}."
+    }
+
+# Largest chunk accepted per POST or WebSocket frame (default 4 MiB, about two minutes of 16 kHz PCM)
+UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(4 * 1024 * 1024)))
+
+def chunk_too_large():
+    return HTTPException(status_code=413, detail=f"Audio chunk larger than {UPLOAD_MAX_CHUNK_BYTES} bytes")
+
+# Reads a request body, stopping with a 413 as soon as it passes UPLOAD_MAX_CHUNK_BYTES
+async def read_limited_body(request: Request) -> bytes:
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if declared > UPLOAD_MAX_CHUNK_BYTES:
+        raise chunk_too_large()
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > UPLOAD_MAX_CHUNK_BYTES:
+            raise chunk_too_large()
+    return bytes(body)
+
+# Decode a client chunk in memory and hand it to the session's buffer. If another worker runs the
+# session, the samples are queued in the session store for it to pick up.
+def ingest_audio(session_id: str, data: bytes, content_type: str, sample_rate: int) -> int:
+    opus = None
+    if (content_type or "").split(";")[0].strip().lower() == "audio/opus":
+        if session_id not in opus_decoders:
+            opus_decoders[session_id] = OpusFrameDecoder()
+        opus = opus_decoders[session_id]
+    samples = decode_chunk(data, content_type, sample_rate=sample_rate, opus=opus)
+
+    live = live_sessions.get(session_id)
+    if live:
+        live['gate'].write(samples)
+        session_store.touch(session_id)
+    else:
+        session_store.push_audio(session_id, samples)
+    return len(samples)
+
+#Upload a chunk of client-captured audio (16-bit PCM, WAV or Opus, picked by Content-Type; audio/pcm is little endian, audio/L16 big endian)
+@app.post('/upload-audio/{session_id}')
+async def upload_audio(session_id: str, request: Request, sample_rate: int = SAMPLE_RATE, user_email: str = Depends(get_current_user)):
+    session = await asyncio.to_thread(session_store.get, session_id)
+    # Someone else's session gets the same 404 as a missing one, so ids can't be probed
+    if not session or session['source'] != "client" or session.get('owner') != user_email:
+        raise HTTPException(status_code=404, detail="Recording session not found")
+    if not session['is_recording']:
+        raise HTTPException(status_code=409, detail="Recording session already stopped")
+
+    data = await read_limited_body(request)
+    try:
+        received = await asyncio.to_thread(ingest_audio, session_id, data, request.headers.get("content-type"), sample_rate)
+    except InvalidSampleRate as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedAudio as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    return {
+        "session_id": session_id,
+        "received_seconds": received / SAMPLE_RATE
+    }
+
+# Browsers can't set headers on a WebSocket, so the access token may also come as ?token=
+async def websocket_user(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    header = websocket.headers.get("authorization", "")
+    token = token or (header[7:] if header.lower().startswith("bearer ") else None)
+    if not token:
+        return None
+    try:
+        payload = await token_verifier.verify(token)
+    except Exception as e:
+        logging.warning(f"WebSocket token rejected: {e!r}")
+        return None
+    return payload.get("email")
+
+#Stream client-captured audio as binary WebSocket frames; send the text "stop" to finish
+@app.websocket('/ws/upload-audio/{session_id}')
+async def upload_audio_ws(websocket: WebSocket, session_id: str, sample_rate: int = SAMPLE_RATE, codec: str = "pcm16",
+                          token: Optional[str] = None):
+    user_email = await websocket_user(websocket, token)
+    if user_email is None:
+        await websocket.close(code=4401)
+        return
+    session = await asyncio.to_thread(session_store.get, session_id)
+    if not session or session['source'] != "client" or session.get('owner') != user_email:
+        await websocket.close(code=4404)
+        return
+    try:
+        check_sample_rate(sample_rate)
+    except InvalidSampleRate as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+    content_type = "audio/opus" if codec == "opus" else "audio/pcm" # pcm16 frames are little endian
+
+    await websocket.accept()
+    try:
+        while await asyncio.to_thread(session_store.is_recording, session_id):
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                if len(message["bytes"]) > UPLOAD_MAX_CHUNK_BYTES:
+                    await websocket.close(code=1009, reason=f"Audio frame larger than {UPLOAD_MAX_CHUNK_BYTES} bytes")
+                    return
+                try:
+                    await asyncio.to_thread(ingest_audio, session_id, message["bytes"], content_type, sample_rate)
+                except UnsupportedAudio as e:
+                    await websocket.close(code=1003, reason=str(e))
+                    return
+            elif message.get("text") == "stop":
+                await asyncio.to_thread(session_store.stop, session_id)
+    except WebSocketDisconnect:
+        pass
+
 #Read Transcription
 @app.get('/read-transcription/{session_id}')
 def read_transcription(session_id: str):
-    session = sessions.get(session_id)
+    session = session_store.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Recording session not found")
 
     return {
         "session_id": session_id, 
-        "transcription": session["transcription"]
+        "transcription": session["transcription"],
+        "partial": session["partial"],
+        "finished": session["finished"]
     }
 
+# Yields transcript changes for a session as they happen. Committed segments carry a sequence
+# number (their 1-based position in the transcript) so a reconnecting client can resume after the last one it saw.
+async def transcript_updates(session_id: str, after: int = 0):
+    event = transcript_feed.subscribe(session_id)
+    sent = max(0, after)
+    last_partial = ""
+    idle = 0.0
+    try:
+        while True:
+            event.clear()
+            session = await asyncio.to_thread(session_store.get, session_id)
+            if session is None:
+                # Reaped while we were waiting
+                yield {"type": "done", "seq": sent}
+                return
+            segments = session['transcription']
+            while sent < len(segments):
+                sent += 1
+                yield {"type": "segment", "seq": sent, "text": segments[sent - 1]}
+            if session['partial'] != last_partial:
+                last_partial = session['partial']
+                yield {"type": "partial", "seq": sent, "text": last_partial}
+            if session['finished']:
+                yield {"type": "done", "seq": sent}
+                return
+            # Updates from this process wake us right away; sessions run by another worker are polled
+            wait = 15.0 if session_id in live_sessions else 0.5
+            try:
+                await asyncio.wait_for(event.wait(), timeout=wait)
+                idle = 0.0
+            except asyncio.TimeoutError:
+                idle += wait
+                if idle >= 15.0:
+                    idle = 0.0
+                    yield {"type": "keepalive", "seq": sent}
+    finally:
+        transcript_feed.unsubscribe(session_id, event)
+
+#Push transcription updates as Server-Sent Events; resumes from Last-Event-ID or ?after=
+@app.get('/transcription-events/{session_id}')
+async def transcription_events(session_id: str, request: Request, after: int = 0):
+    if not await asyncio.to_thread(session_store.get, session_id):
+        raise HTTPException(status_code=404, detail="Recording session not found")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    async def event_stream():
+        async for update in transcript_updates(session_id, after):
+            if update["type"] == "keepalive":
+                yield ": keepalive\n\n"
+                continue
+            # Only committed segments get an id, so Last-Event-ID always points at a segment
+            event_id = f"id: {update['seq']}\n" if update["type"] == "segment" else ""
+            yield f"{event_id}event: {update['type']}\ndata: {json.dumps(update)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+#Push transcription updates over a WebSocket; reconnect with ?after=<last seq> to resume
+@app.websocket('/ws/transcription/{session_id}')
+async def transcription_ws(websocket: WebSocket, session_id: str, after: int = 0):
+    if not await asyncio.to_thread(session_store.get, session_id):
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    try:
+        async for update in transcript_updates(session_id, after):
+            await websocket.send_json(update)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+def vad_summary(stats: List[dict]) -> dict:
+    totals = {
+        "sessions": len(stats),
+        "audio_seconds": sum(s["audio_seconds"] for s in stats),
+        "voiced_seconds": sum(s["voiced_seconds"] for s in stats),
+        "utterances": sum(s["utterances"] for s in stats),
+    }
+    totals["skipped_fraction"] = 1 - totals["voiced_seconds"] / totals["audio_seconds"] if totals["audio_seconds"] else 0.0
+    return totals
+
+#Transcription pool metrics (queue depth, in-flight jobs, per-job latency). Unauthenticated, so only aggregates:
+#session ids are what guards a transcript, and must never be listed here.
+@app.get('/transcription/metrics')
+def transcription_metrics():
+    data = transcription_scheduler.metrics()
+    with vad_totals_lock:
+        totals = dict(vad_totals)
+    totals["skipped_fraction"] = 1 - totals["voiced_seconds"] / totals["audio_seconds"] if totals["audio_seconds"] else 0.0
+    data["vad"] = {"enabled": VAD_ENABLED, "finished_sessions": totals,
+                   "live_sessions": vad_summary([live['gate'].metrics() for live in list(live_sessions.values())])}
+    return data
+
 #Stop Recording
 @app.post('/stop-recording/{session_id}')
-def stop_recording(session_id: str):
-    session = sessions.get(session_id)
-    session['is_recording'] = False
-    sessions.pop(session_id) # No need to keep the session information
+async def stop_recording(session_id: str):
+    # The worker commits the last chunk and the transcript stays readable for SESSION_FINISHED_TTL seconds
+    if not await asyncio.to_thread(session_store.stop, session_id):
+        raise HTTPException(status_code=404, detail="Recording session not found")
+
+    # When this process runs the session, wait (without holding a thread) for its loop to commit the last chunk
+    live = live_sessions.get(session_id)
+    thread = live.get('thread') if live else None
+    deadline = time.monotonic() + SESSION_STOP_TIMEOUT
+    while thread is not None and thread.is_alive() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    session = await asyncio.to_thread(session_store.get, session_id)
 
     return {
         "session_id": session_id,
-        "recording_stopped": True, 
+        "recording_stopped": True,
+        "finished": bool(session and session["finished"]),
         "message": "Recording stopped.",
     }
 
 # Save AI Summary
 @app.post("/patients/{patient_id}/save_summary")
-def save_ai_summary(patient_id: str, summary_text: str, request: Request, user_email: str = Depends(get_current_user)):
+async def save_ai_summary(patient_id: str, summary_text: str, request: Request, user_email: str = Depends(get_current_user)):
     try:
-        patient_response = supabase.table("patients").select("*").eq("Id", patient_id).execute()
+        exists = await repository.patient_exists(patient_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase query failed: {e}")
         
-    if not patient_response.data:
+    if not exists:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     try:
-        sbar_response = (
-            supabase
-            .table("sbar")
-            .select("*")
-            .eq("patient_id", patient_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
-        )
+        sbar = await repository.latest_sbar(patient_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch SBAR notes: {e}")
 
-    if not sbar_response.data:
+    if not sbar:
         raise HTTPException(status_code=404, detail="No SBAR notes found for this patient")
 
-    sbar_id = sbar_response.data[0]["id"]
+    sbar_id = sbar["id"]
     
     data = {
         "patient_id": patient_id,
@@ -566,44 +1495,198 @@ def save_ai_summary(patient_id: str, summary_text: str, request: Request, user_e
         "summary": summary_text
     }
     try:
-        response = supabase.table("ai_summaries").insert(data).execute()
+        saved = await repository.insert_ai_summary(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save summary: {e}")
+    patient_cache.invalidate(patient_id)
     log_audit(request, user_email, f"Save_AI_SUMMARY_{patient_id}")
-    return {"message": "AI summary saved successfully", "data": response.data}
+    return {"message": "AI summary saved successfully", "data": saved}
 
 # Get AI Summary
 @app.get("/patients/{patient_id}/ai_summaries")
-def read_ai_summaries(patient_id: str, request:Request, user_email: str = Depends(get_current_user)):
+async def read_ai_summaries(patient_id: str, request:Request, user_email: str = Depends(read_user)):
     try:
-        response = supabase.table("ai_summaries").select("summary").eq("patient_id", patient_id).order("created_at", desc=True).execute()
+        summaries = await repository.ai_summaries(patient_id, select="summary", limit=1)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch AI summaries: {e}")
-    if not response.data:
+    if not summaries:
         raise HTTPException(status_code=404, detail="No AI summaries found for this patient")
     log_audit(request, user_email, f"VIEW_AI_SUMMARIES_{patient_id}")
-    return {"summary": response.data[0]["summary"]}
+    return {"summary": summaries[0]["summary"]}
+
+# -------SBAR / Summary History-------
+# Newest first, keyed by (created_at, id) so notes saved in the same instant still page deterministically
+HISTORY_TABLES = {
+    "sbar": TableSpec("sbar", "patient_id", "created_at", ("created_at", "id")),
+    "ai_summaries": TableSpec("ai_summaries", "patient_id", "created_at", ("created_at", "id")),
+}
+
+# One page of a patient's history. latest_only skips the keyset query for a plain limit(1) lookup.
+async def read_history(table: str, patient_id: str, fields: Optional[str], since: Optional[str], until: Optional[str],
+                       limit: int, cursor: Optional[str], latest_only: bool):
+    spec = HISTORY_TABLES[table]
+    select = parse_fields(fields, spec.keys)
+    since, until = parse_date(since, "since"), parse_date(until, "until")
+    try:
+        if latest_only:
+            load = repository.sbar_notes if table == "sbar" else repository.ai_summaries
+            return await load(patient_id, select=select, limit=1), None
+        return await repository.clinical_page(spec, patient_id, select, since=since, until=until, limit=limit, cursor=cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch {table} history: {e}")
+
+# SBAR notes for a patient, newest first; pass next_cursor back as ?cursor= for older notes
+@app.get("/patients/{patient_id}/sbar_notes/history")
+async def read_sbar_history(patient_id: str, request: Request, user_email: str = Depends(read_user), fields: Optional[str] = None,
+                            since: Optional[str] = None, until: Optional[str] = None, limit: int = Query(20, ge=1, le=CLINICAL_MAX_LIMIT),
+                            cursor: Optional[str] = None, latest_only: bool = False):
+    notes, next_cursor = await read_history("sbar", patient_id, fields, since, until, limit, cursor, latest_only)
+    log_audit(request, user_email, f"VIEW_SBAR_HISTORY_{patient_id}")
+    return {"sbar": notes, "next_cursor": next_cursor}
+
+# AI summaries for a patient, newest first
+@app.get("/patients/{patient_id}/ai_summaries/history")
+async def read_ai_summary_history(patient_id: str, request: Request, user_email: str = Depends(read_user), fields: Optional[str] = None,
+                                  since: Optional[str] = None, until: Optional[str] = None, limit: int = Query(20, ge=1, le=CLINICAL_MAX_LIMIT),
+                                  cursor: Optional[str] = None, latest_only: bool = False):
+    summaries, next_cursor = await read_history("ai_summaries", patient_id, fields, since, until, limit, cursor, latest_only)
+    log_audit(request, user_email, f"VIEW_AI_SUMMARY_HISTORY_{patient_id}")
+    return {"ai_summaries": summaries, "next_cursor": next_cursor}
+
+
+# Precompute summaries for every assigned patient in the minutes before shift change
+class HandoffBundleRequest(BaseModel):
+    patient_ids: Optional[List[str]] = None
+    unit: Optional[str] = None # matched against HANDOFF_UNIT_COLUMN in the patients table
+    handoff_at: Optional[datetime] = None # finish by this time; defaults to now + spread_minutes
+    spread_minutes: float = 0
+
+HANDOFF_UNIT_COLUMN = os.getenv("HANDOFF_UNIT_COLUMN", "UNIT")
+
+async def summarize_sbar_row(sbar: dict) -> str:
+    note = NoteRequest(**{field: sbar.get(field) or "" for field in NoteRequest.model_fields})
+    summary_text, _ = await summarize_note(note)
+    return summary_text
+
+async def store_ai_summary(patient_id: str, sbar_id, summary: str):
+    await repository.insert_ai_summary({
+        "patient_id": patient_id,
+        "sbar_id": sbar_id,
+        "summary": summary
+    })
+    patient_cache.invalidate(patient_id)
+
+handoff_bundles = HandoffBundleManager(
+    fetch_latest_sbar=repository.latest_sbar,
+    has_summary=repository.sbar_has_summary,
+    summarize_note=summarize_sbar_row,
+    save_summary=store_ai_summary,
+    concurrency=int(os.getenv("HANDOFF_CONCURRENCY", "4")),
+    max_jobs=int(os.getenv("HANDOFF_MAX_JOBS", "50")),
+    max_running_per_user=int(os.getenv("HANDOFF_MAX_RUNNING_PER_USER", "3")),
+)
+
+# Start a bundle job; poll /handoff-bundles/{job_id} for progress. Users only see the jobs they started, and jobs
+# are kept in the worker that created them (see HandoffBundleManager), so this needs a single worker or sticky sessions.
+@app.post("/handoff-bundles", status_code=202)
+async def create_handoff_bundle(bundle: HandoffBundleRequest, request: Request, user_email: str = Depends(inference_user)):
+    patient_ids = list(bundle.patient_ids or [])
+    if bundle.unit:
+        try:
+            patient_ids += await repository.patient_ids_where(HANDOFF_UNIT_COLUMN, bundle.unit)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch patients for unit: {e}")
+    if not patient_ids:
+        raise HTTPException(status_code=400, detail="Provide patient_ids or a unit with patients")
+
+    spread = max(0.0, bundle.spread_minutes) * 60
+    now = time.time()
+    end_at = bundle.handoff_at.timestamp() if bundle.handoff_at else now + spread
+    start_at = max(now, end_at - spread)
+    try:
+        job = handoff_bundles.create(patient_ids, start_at, max(start_at, end_at), user_email)
+    except TooManyJobs as e:
+        raise HTTPException(status_code=429, detail=f"{e}; wait for one to finish", headers={"Retry-After": "60"})
+
+    log_audit(request, user_email, f"CREATE_HANDOFF_BUNDLE_{job.job_id}")
+    return job.progress()
+
+@app.get("/handoff-bundles")
+async def list_handoff_bundles(user_email: str = Depends(read_user)):
+    return {"bundles": [{k: v for k, v in job.progress().items() if k != "results"} for job in handoff_bundles.list(user_email)]}
+
+# Bundle progress with a per-patient status
+@app.get("/handoff-bundles/{job_id}")
+async def get_handoff_bundle(job_id: str, user_email: str = Depends(read_user)):
+    job = handoff_bundles.get(job_id, created_by=user_email)
+    if not job:
+        raise HTTPException(status_code=404, detail="Handoff bundle not found")
+    return job.progress()
+
+# -------QA Export-------
+# Streams SBAR notes and AI summaries for many patients as NDJSON (one JSON object per line, tagged with its
+# table), a page at a time, so neither the server nor the client holds the whole export in memory. The last
+# line is {"type": "end", ...} with row counts; a failure midway ends the stream with {"type": "error", ...}.
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+@app.get("/exports/handoff-notes")
+async def export_handoff_notes(request: Request, user_email: str = Depends(read_user), patient_ids: Optional[str] = None,
+                               unit: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                               include: str = "sbar,ai_summaries", fields: Optional[str] = None):
+    tables = [t.strip() for t in include.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in HISTORY_TABLES]
+    if unknown or not tables:
+        raise HTTPException(status_code=400, detail=f"include must list tables from: {', '.join(HISTORY_TABLES)}")
+
+    since, until = parse_date(since, "since"), parse_date(until, "until")
+    ids = [p.strip() for p in patient_ids.split(",") if p.strip()] if patient_ids else None
+    if unit:
+        try:
+            ids = (ids or []) + await repository.patient_ids_where(HANDOFF_UNIT_COLUMN, unit)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch patients for unit: {e}")
+    selects = {table: parse_fields(fields, HISTORY_TABLES[table].keys + ("patient_id",)) if fields else "*" for table in tables}
+
+    async def lines():
+        counts = {table: 0 for table in tables}
+        try:
+            for table in tables:
+                async for page in repository.iter_pages(HISTORY_TABLES[table], selects[table], patient_ids=ids,
+                                                        since=since, until=until, page_size=EXPORT_PAGE_SIZE):
+                    counts[table] += len(page)
+                    yield "".join(json.dumps({"type": table, **row}, default=str) + "\n" for row in page)
+        except Exception as e:
+            logging.warning(f"Export for {user_email} failed after {counts}: {e!r}")
+            yield json.dumps({"type": "error", "detail": str(e) or type(e).__name__, "counts": counts}) + "\n"
+            return
+        yield json.dumps({"type": "end", "counts": counts}) + "\n"
+
+    log_audit(request, user_email, "EXPORT_HANDOFF_NOTES")
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="handoff-notes.ndjson"'})
 
 # -------Database Connection Testing-------
 # To test database, run this, http://127.0.0.1:8000/test-db, in a browswer and it will pull patient info for an "Annalise Glover"
 @app.get("/test-db")
-def test_db():
+async def test_db():
     try:
-        result = supabase.table("patients").select("*").limit(1).execute()
-        return {"success": True, "data": result.data}
+        patients, _ = await repository.list_patients("*", 1)
+        return {"success": True, "data": patients}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 # Testing for inserting audit_logs into table
 @app.get("/test-insert-audit")
-def test_insert_audit():
+async def test_insert_audit():
     try:
-        result = supabase.table("audit_logs").insert({
+        data = await repository.insert_audit_logs([{
             "user_email": "test@example.com",
             "endpoint": "/test-insert-audit",
             "action": "TEST_INSERT",
             "timestamp": datetime.now(timezone.utc).isoformat()
-        }).execute()
-        return {"success": True, "data": result.data}
+        }])
+        return {"success": True, "data": data}
     except Exception as e:
         return {"success": False, "error": str(e)}
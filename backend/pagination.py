@@ -0,0 +1,133 @@
+import base64
+import json
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+COLUMN_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Codes and categories as they appear in the clinical tables ("vital-signs", "ambulatory", "DX", "food")
+TYPE_RE = re.compile(r"^[\w .:/-]{1,100}$")
+
+
+class TableSpec(NamedTuple):
+    table: str
+    patient_column: str
+    date_column: Optional[str]  # used by since= / until=
+    keys: Tuple[str, ...]  # keyset order (newest first); ties are kept on one page by split_page
+    type_column: Optional[str] = None  # used by type=
+
+
+def encode_cursor(row: dict, keys: Sequence[str]) -> str:
+    # Opaque continuation token: the last row's key values
+    raw = json.dumps([row.get(k) for k in keys], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, keys: Sequence[str]) -> List:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_fields(fields: Optional[str], required: Sequence[str] = ()) -> str:
+    # fields=a,b,c -> PostgREST select clause; key columns are always included so cursors still work
+    if not fields:
+        return "*"
+    columns = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [c for c in columns if not COLUMN_RE.match(c)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+    for column in required:
+        if column not in columns:
+            columns.append(column)
+    return ",".join(columns)
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    # since= / until= must be an ISO date or timestamp; anything else is a 400 rather than a database error
+    if not value:
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO date or timestamp")
+    return value
+
+
+def parse_type(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    if not TYPE_RE.match(value):
+        raise HTTPException(status_code=400, detail="Invalid type")
+    return value
+
+
+def _quote(value) -> str:
+    # Double quotes keep commas, dots and parentheses in values from breaking the PostgREST filter
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _equal(key: str, value) -> str:
+    return f"{key}.is.null" if value is None else f"{key}.eq.{_quote(value)}"
+
+
+def _after(key: str, value, descending: bool) -> Optional[str]:
+    # Postgres puts NULLs first in a descending sort and last in an ascending one. None: nothing comes after.
+    if value is None:
+        return f"{key}.not.is.null" if descending else None
+    if descending:
+        return f"{key}.lt.{_quote(value)}"
+    return f"or({key}.gt.{_quote(value)},{key}.is.null)"
+
+
+def keyset_filter(keys: Sequence[str], values: Sequence, descending: bool = True) -> str:
+    """
+    PostgREST or= expression for rows strictly after the cursor in (keys) order, i.e.
+    k1 < v1 OR (k1 = v1 AND k2 < v2) OR ... for a descending sort. NULL key values compare with is.null.
+    """
+    clauses = []
+    for i, key in enumerate(keys):
+        step = _after(key, values[i], descending)
+        if step is None:
+            continue
+        equal = [_equal(keys[j], values[j]) for j in range(i)]
+        clauses.append(f"and({','.join(equal + [step])})" if equal else step)
+    if not clauses:
+        # The cursor row sorts last on every key, so no row is after it
+        return f"and({keys[0]}.is.null,{keys[0]}.not.is.null)"
+    return ",".join(clauses)
+
+
+def apply_keyset(query, keys: Sequence[str], cursor: Optional[str], limit: int, descending: bool = True):
+    # Filter past the cursor, sort by the keys and fetch one extra row to know whether there's a next page
+    if cursor:
+        query = query.or_(keyset_filter(keys, decode_cursor(cursor, keys), descending))
+    for key in keys:
+        query = query.order(key, desc=descending)
+    return query.limit(limit + 1)
+
+
+def split_page(rows: List[dict], keys: Sequence[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    Cuts the limit + 1 rows apply_keyset fetched into a page and the cursor for the next one.
+
+    Some tables have no unique column, so their keys (e.g. date, encounter, code) can tie. A cursor between two
+    tied rows would skip the second, so rows tying with the first row of the next page are moved to it.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    boundary = [rows[limit].get(k) for k in keys]
+    end = limit
+    while end > 0 and [rows[end - 1].get(k) for k in keys] == boundary:
+        end -= 1
+    if end == 0:
+        raise HTTPException(status_code=400, detail=f"More than {limit} rows share the same {', '.join(keys)}; use a larger limit")
+    rows = rows[:end]
+    return rows, encode_cursor(rows[-1], keys)
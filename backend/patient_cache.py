@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+CacheKey = Tuple[str, str, Hashable]  # (table, patient_id, query variant)
+
+
+class PatientDataCache:
+    """
+    Read-through cache of per-patient clinical table rows.
+
+    Entries are keyed by table, patient and query variant (so different projections or filters don't
+    collide), expire after a per-table TTL and are evicted LRU once max_entries is reached. All entries
+    for a patient can be dropped at once when a write for that patient goes through the API.
+    """
+
+    def __init__(self, max_entries: int = 5000, default_ttl: float = 120.0, table_ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.table_ttls = table_ttls or {}
+        self._entries: "OrderedDict[CacheKey, Tuple[object, float]]" = OrderedDict()
+        self._by_patient: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, table: str, patient_id: str, loader: Callable[[], Awaitable[object]], variant: Hashable = ""):
+        key = (table, patient_id, variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Load outside the lock so one slow query doesn't stall every other lookup
+        value = await loader()
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.table_ttls.get(table, self.default_ttl))
+            self._entries.move_to_end(key)
+            self._by_patient.setdefault(patient_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self.evictions += 1
+        return value
+
+    def _forget(self, key: CacheKey):
+        keys = self._by_patient.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_patient[key[1]]
+
+    def invalidate(self, patient_id: str, table: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [k for k in self._by_patient.get(patient_id, ()) if table is None or k[0] == table]
+            for key in keys:
+                self._entries.pop(key, None)
+                self._forget(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_patient.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "patients": len(self._by_patient),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
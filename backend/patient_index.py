@@ -0,0 +1,309 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from pagination import TableSpec
+
+LETTERS_RE = re.compile(r"[^\W\d_]+")
+
+
+def fold(text) -> str:
+    # Case- and accent-insensitive form used for both indexing and queries
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+
+def name_tokens(text) -> List[str]:
+    # Runs of letters only, so Synthea-style "Annalise683" indexes as "annalise"
+    return LETTERS_RE.findall(fold(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _IndexData:
+    """The searchable structures for one set of patient rows. Built off the event loop, then swapped in."""
+
+    def __init__(self, name_columns: Sequence[str], exact_columns: Sequence[str]):
+        self.name_columns = name_columns
+        self.exact_columns = exact_columns
+        self.rows: Dict[str, dict] = {}
+        self.sort_keys: Dict[str, Tuple[str, str]] = {}
+        self.tokens_by_id: Dict[str, Tuple[str, ...]] = {}
+        self.exact_by_id: Dict[str, Tuple[str, ...]] = {}
+        self.ids_by_token: Dict[str, Set[str]] = {}
+        self.ids_by_exact: Dict[str, Set[str]] = {}
+        self.sorted_tokens: List[str] = []  # distinct name tokens, for prefix ranges
+        self.tokens_by_trigram: Dict[str, Set[str]] = {}
+
+    def upsert(self, patient_id: str, row: dict):
+        self.remove(patient_id)
+        tokens = tuple(dict.fromkeys(t for column in self.name_columns for t in name_tokens(row.get(column))))
+        exact = tuple(dict.fromkeys(fold(row.get(c)) for c in self.exact_columns if row.get(c) not in (None, "")))
+        self.rows[patient_id] = row
+        self.sort_keys[patient_id] = (fold(row.get("LAST")), fold(row.get("FIRST")))
+        self.tokens_by_id[patient_id] = tokens
+        self.exact_by_id[patient_id] = exact
+        for token in tokens:
+            ids = self.ids_by_token.get(token)
+            if ids is None:
+                ids = self.ids_by_token[token] = set()
+                insort(self.sorted_tokens, token)
+                for gram in trigrams(token):
+                    self.tokens_by_trigram.setdefault(gram, set()).add(token)
+            ids.add(patient_id)
+        for value in exact:
+            self.ids_by_exact.setdefault(value, set()).add(patient_id)
+
+    def remove(self, patient_id: str):
+        if patient_id not in self.rows:
+            return
+        del self.rows[patient_id]
+        del self.sort_keys[patient_id]
+        for token in self.tokens_by_id.pop(patient_id):
+            ids = self.ids_by_token[token]
+            ids.discard(patient_id)
+            if not ids:
+                # Last patient with this token: drop it from the prefix list and trigram postings
+                del self.ids_by_token[token]
+                del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+                for gram in trigrams(token):
+                    self.tokens_by_trigram[gram].discard(token)
+        for value in self.exact_by_id.pop(patient_id):
+            self.ids_by_exact[value].discard(patient_id)
+
+    def prefix_ids(self, prefix: str) -> Set[str]:
+        ids: Set[str] = set()
+        i = bisect_left(self.sorted_tokens, prefix)
+        while i < len(self.sorted_tokens) and self.sorted_tokens[i].startswith(prefix):
+            ids |= self.ids_by_token[self.sorted_tokens[i]]
+            i += 1
+        return ids
+
+    def fuzzy_ids(self, token: str, threshold: float) -> Dict[str, float]:
+        # Patients with a name token whose trigram similarity (Jaccard) to token is at least threshold
+        grams = trigrams(token)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.tokens_by_trigram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        scores: Dict[str, float] = {}
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(candidate)) - count)
+            if similarity >= threshold:
+                for patient_id in self.ids_by_token[candidate]:
+                    scores[patient_id] = max(scores.get(patient_id, 0.0), similarity)
+        return scores
+
+
+class PatientSearchIndex:
+    """
+    In-process typeahead index over the patients table.
+
+    Matches an exact identifier (Id, and e.g. MRN or room when configured), prefixes of name tokens
+    ("ann gl" finds Annalise Glover) and, when that finds too little, misspellings via trigram
+    similarity. Only list-view columns are kept. The whole table is reloaded in keyset pages every
+    full_refresh_interval; in between, if the table has an updated-at column, only rows changed since
+    the last refresh are fetched and patched in. Configured columns the table doesn't have are dropped
+    (with an error in the log) on the first load, rather than failing every refresh.
+    """
+
+    def __init__(
+        self,
+        repository,
+        list_columns: Sequence[str],
+        name_columns: Sequence[str] = ("FIRST", "LAST"),
+        exact_columns: Sequence[str] = ("Id",),
+        updated_column: Optional[str] = None,
+        refresh_interval: float = 60.0,
+        full_refresh_interval: float = 900.0,
+        page_size: int = 1000,
+        fuzzy_threshold: float = 0.35,
+    ):
+        self.repository = repository
+        self.list_columns = list(dict.fromkeys(["Id", *list_columns]))
+        self.name_columns = list(name_columns)
+        self.exact_columns = list(exact_columns)
+        self.updated_column = updated_column
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.page_size = page_size
+        self.fuzzy_threshold = fuzzy_threshold
+        self._keep = self._columns_to_keep()
+        self._validated = False
+        self._data: Optional[_IndexData] = None
+        self._watermark = None
+        self._last_full = 0.0
+        self._last_refresh = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failures_in_a_row = 0
+        self.stats = {"full_refreshes": 0, "delta_refreshes": 0, "delta_rows": 0, "refresh_failures": 0, "searches": 0}
+
+    def _columns_to_keep(self) -> List[str]:
+        return list(dict.fromkeys(self.list_columns + self.name_columns + self.exact_columns +
+                                  ([self.updated_column] if self.updated_column else [])))
+
+    def start(self):
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    def _project(self, row: dict) -> dict:
+        return {c: row.get(c) for c in self._keep if c in row}
+
+    async def _refresh_loop(self):
+        while True:
+            full = self._data is None or not self.updated_column or \
+                time.monotonic() - self._last_full >= self.full_refresh_interval
+            try:
+                await self.refresh(full=full)
+                self._failures_in_a_row = 0
+            except Exception as e:
+                self.stats["refresh_failures"] += 1
+                self._failures_in_a_row += 1
+                logging.warning(f"Patient search index {'full' if full else 'delta'} refresh failed: {e!r}")
+            if self._data is not None:
+                delay = self.refresh_interval
+            else:
+                # Not loaded yet: retry soon, backing off while the load keeps failing
+                delay = min(self.refresh_interval, 5.0 * 2 ** min(self._failures_in_a_row, 6))
+            await asyncio.sleep(delay)
+
+    async def refresh(self, full: bool = False):
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            if full or self._data is None:
+                await self._full_refresh()
+            else:
+                await self._delta_refresh()
+            self._last_refresh = time.monotonic()
+
+    async def _validate_columns(self) -> bool:
+        # Compares the configured columns with one row of the table; False while the table is empty
+        sample, _ = await self.repository.list_patients("*", 1)
+        if not sample:
+            return False
+        present = set(sample[0])
+        if "Id" not in present:
+            raise RuntimeError("patients table has no Id column")
+        missing = [c for c in self._keep if c not in present]
+        if missing:
+            logging.error(
+                f"Patient search index: columns missing from the patients table, indexing without them: {', '.join(missing)}. "
+                f"Check PATIENT_LIST_COLUMNS, PATIENT_SEARCH_NAME_COLUMNS, PATIENT_SEARCH_EXACT_COLUMNS and "
+                f"PATIENT_UPDATED_COLUMN (available: {', '.join(sorted(present))})"
+            )
+            self.list_columns = [c for c in self.list_columns if c in present]
+            self.name_columns = [c for c in self.name_columns if c in present]
+            self.exact_columns = [c for c in self.exact_columns if c in present]
+            if self.updated_column not in present:
+                self.updated_column = None
+            self._keep = self._columns_to_keep()
+        return True
+
+    async def _full_refresh(self):
+        started = time.monotonic()
+        if not self._validated:
+            self._validated = await self._validate_columns()
+        rows: List[dict] = []
+        spec = TableSpec("patients", "Id", None, ("Id",))
+        async for page in self.repository.iter_pages(spec, ",".join(self._keep), page_size=self.page_size):
+            rows.extend(self._project(row) for row in page)
+        # Building is plain Python over every row, so keep it off the event loop
+        data = await asyncio.to_thread(self._build, rows)
+        self._data = data
+        if self.updated_column:
+            values = [row.get(self.updated_column) for row in rows if row.get(self.updated_column) is not None]
+            self._watermark = max(values, default=None)
+        self._last_full = time.monotonic()
+        self.stats["full_refreshes"] += 1
+        logging.info(f"Patient search index loaded {len(rows)} patients in {time.monotonic() - started:.2f}s")
+
+    def _build(self, rows: Iterable[dict]) -> _IndexData:
+        data = _IndexData(self.name_columns, self.exact_columns)
+        for row in rows:
+            if row.get("Id") is not None:
+                data.upsert(str(row["Id"]), row)
+        return data
+
+    async def _delta_refresh(self):
+        # Rows changed at or after the watermark; re-applying the boundary rows is harmless
+        spec = TableSpec("patients", "Id", self.updated_column, (self.updated_column, "Id"))
+        async for page in self.repository.iter_pages(spec, ",".join(self._keep), since=self._watermark, page_size=self.page_size):
+            for row in page:
+                row = self._project(row)
+                if row.get("Id") is not None:
+                    self._data.upsert(str(row["Id"]), row)
+                if row.get(self.updated_column) is not None:
+                    self._watermark = max(self._watermark, row[self.updated_column]) if self._watermark else row[self.updated_column]
+            self.stats["delta_rows"] += len(page)
+        self.stats["delta_refreshes"] += 1
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        data = self._data
+        if data is None:
+            return []
+        self.stats["searches"] += 1
+        folded = fold(query)
+        if not folded:
+            return []
+        # Lower rank sorts first: exact identifier, then every word a name prefix, then fuzzy matches
+        ranked: Dict[str, Tuple] = {}
+        for patient_id in data.ids_by_exact.get(folded, ()):
+            ranked[patient_id] = (0, 0.0)
+
+        # A pasted id or MRN that matched is the answer; its letters aren't worth name-matching
+        words = [] if ranked else name_tokens(folded)
+        if words:
+            candidates = None
+            for word in sorted(words, key=len, reverse=True):  # longest (most selective) word first
+                ids = data.prefix_ids(word)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            for patient_id in candidates or ():
+                if patient_id not in ranked:
+                    # Whole-word matches rank above partial ones
+                    exact_words = sum(1 for w in words if w in data.tokens_by_id[patient_id])
+                    ranked[patient_id] = (1, -exact_words)
+
+            if len(ranked) < limit:
+                fuzzy = None
+                for word in words:
+                    scores = data.fuzzy_ids(word, self.fuzzy_threshold) if len(word) >= 3 else \
+                        {pid: 1.0 for pid in data.prefix_ids(word)}
+                    fuzzy = scores if fuzzy is None else {pid: min(s, fuzzy[pid]) for pid, s in scores.items() if pid in fuzzy}
+                    if not fuzzy:
+                        break
+                for patient_id, score in (fuzzy or {}).items():
+                    if patient_id not in ranked:
+                        ranked[patient_id] = (2, -score)
+
+        best = heapq.nsmallest(limit, ranked, key=lambda pid: (ranked[pid], data.sort_keys[pid]))
+        return [{c: data.rows[pid].get(c) for c in self.list_columns if c in data.rows[pid]} for pid in best]
+
+    def metrics(self) -> dict:
+        data = self._data
+        return {
+            **self.stats,
+            "ready": data is not None,
+            "patients": len(data.rows) if data else 0,
+            "distinct_name_tokens": len(data.sorted_tokens) if data else 0,
+            "seconds_since_refresh": round(time.monotonic() - self._last_refresh, 1) if self._last_refresh else None,
+            "incremental": bool(self.updated_column),
+        }
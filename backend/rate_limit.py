@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limits per user, with one independent budget per class of endpoint.
+
+    Each budget is (tokens per second, burst). A user's bucket starts full, refills continuously and each
+    request takes one token; when it is empty, acquire() returns how long until the next token. A rate of 0
+    turns the budget off. Buckets live in this process only (each uvicorn worker counts separately) and the
+    least recently used are dropped past max_keys; an idle bucket is full anyway, so dropping it changes nothing.
+    """
+
+    def __init__(self, budgets: Dict[str, Tuple[float, float]], max_keys: int = 10000):
+        self.budgets = budgets
+        self.max_keys = max_keys
+        self._buckets: Dict[str, "OrderedDict[str, Tuple[float, float]]"] = {name: OrderedDict() for name in budgets}
+        self._lock = threading.Lock()  # sync routes resolve their dependencies on threadpool threads
+        self.stats = {name: {"allowed": 0, "limited": 0} for name in budgets}
+
+    def acquire(self, budget: str, key: str, cost: float = 1.0) -> float:
+        # 0 when the request may go ahead, otherwise seconds to wait before retrying
+        rate, burst = self.budgets[budget]
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._buckets[budget]
+            tokens, updated = buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+                self.stats[budget]["allowed"] += 1
+            else:
+                wait = (cost - tokens) / rate
+                self.stats[budget]["limited"] += 1
+            buckets[key] = (tokens, now)
+            while len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+        return wait
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **self.stats[name],
+                    "per_minute": rate * 60,
+                    "burst": burst,
+                    "tracked_users": len(self._buckets[name]),
+                }
+                for name, (rate, burst) in self.budgets.items()
+            }
@@ -0,0 +1,196 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
+
+from pagination import TableSpec, apply_keyset, split_page
+from telemetry import timed_stage
+
+
+class Repository:
+    """
+    Async access to the tables the API reads and writes: patients, the clinical tables, sbar,
+    ai_summaries and audit_logs.
+
+    Every query goes through one Supabase AsyncClient backed by a pooled HTTP/2 httpx client, so a
+    single worker can keep hundreds of queries in flight without holding a thread for each one. The
+    pool size caps how many connections a burst of chart views can open.
+    """
+
+    def __init__(self, url: str, key: str, max_connections: int = 100, max_keepalive: int = 20, timeout: float = 10.0):
+        self.url = url
+        self.key = key
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncClient] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    async def connect(self) -> AsyncClient:
+        if self._client is not None:
+            return self._client
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._client is None:
+                self._http = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive),
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    http2=True,
+                )
+                # Only PostgREST uses this client; sign-up/login stay on the sync client in main.py
+                options = AsyncClientOptions(httpx_client=self._http, auto_refresh_token=False, persist_session=False)
+                self._client = await acreate_client(self.url, self.key, options=options)
+        return self._client
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._client = None
+
+    async def _table(self, name: str):
+        client = await self.connect()
+        return client.table(name)
+
+    async def _execute(self, table: str, query):
+        # Every round-trip is timed per table, so /metrics shows which table a slow request waited on
+        with timed_stage("db", table):
+            return await query.execute()
+
+    # ---- patients ----
+    async def list_patients(self, select: str, limit: int, cursor: Optional[str] = None, offset: int = 0) -> Tuple[List[dict], Optional[str]]:
+        query = (await self._table("patients")).select(select)
+        if offset and not cursor:
+            response = await self._execute("patients", query.order("Id").range(offset, offset + limit))
+        else:
+            response = await self._execute("patients", apply_keyset(query, ("Id",), cursor, limit, descending=False))
+        return split_page(response.data or [], ("Id",), limit)
+
+    async def search_patients(self, term: str, columns: Sequence[str], select: str, limit: int) -> List[dict]:
+        # Prefix match on the given columns; only used while the in-process search index is loading.
+        # term must already be stripped to letters/digits, since it is spliced into an or=() filter.
+        query = (await self._table("patients")).select(select).or_(",".join(f"{c}.ilike.{term}*" for c in columns))
+        response = await self._execute("patients", query.order("Id").limit(limit))
+        return response.data or []
+
+    async def patient_exists(self, patient_id: str) -> bool:
+        query = (await self._table("patients")).select("Id").eq("Id", patient_id).limit(1)
+        response = await self._execute("patients", query)
+        return bool(response.data)
+
+    async def patient_ids_where(self, column: str, value: str, page_size: int = 500) -> List[str]:
+        ids: List[str] = []
+        cursor = None
+        while True:
+            query = (await self._table("patients")).select("Id").eq(column, value)
+            response = await self._execute("patients", apply_keyset(query, ("Id",), cursor, page_size, descending=False))
+            page, cursor = split_page(response.data or [], ("Id",), page_size)
+            ids.extend(row["Id"] for row in page)
+            if not cursor:
+                return ids
+
+    # ---- clinical tables ----
+    async def clinical_page(self, spec: TableSpec, patient_id: str, select: str = "*", since: Optional[str] = None,
+                            until: Optional[str] = None, type: Optional[str] = None, limit: int = 200,
+                            cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        query = (await self._table(spec.table)).select(select).eq(spec.patient_column, patient_id)
+        if since:
+            query = query.gte(spec.date_column, since)
+        if until:
+            query = query.lt(spec.date_column, until)
+        if type:
+            query = query.eq(spec.type_column, type)
+        response = await self._execute(spec.table, apply_keyset(query, spec.keys, cursor, limit))
+        return split_page(response.data or [], spec.keys, limit)
+
+    async def iter_pages(self, spec: TableSpec, select: str = "*", patient_ids: Optional[Sequence[str]] = None,
+                         since: Optional[str] = None, until: Optional[str] = None,
+                         page_size: int = 500) -> AsyncIterator[List[dict]]:
+        # Walks a table oldest first in keyset pages, so an export holds one page in memory at a time.
+        # Patient ids are sent in batches to keep the in.() filter (and the URL) short.
+        batches = [None] if patient_ids is None else [patient_ids[i:i + 100] for i in range(0, len(patient_ids), 100)]
+        for batch in batches:
+            cursor = None
+            while True:
+                query = (await self._table(spec.table)).select(select)
+                if batch is not None:
+                    query = query.in_(spec.patient_column, list(batch))
+                if since:
+                    query = query.gte(spec.date_column, since)
+                if until:
+                    query = query.lt(spec.date_column, until)
+                response = await self._execute(spec.table, apply_keyset(query, spec.keys, cursor, page_size, descending=False))
+                page, cursor = split_page(response.data or [], spec.keys, page_size)
+                if page:
+                    yield page
+                if not cursor:
+                    break
+
+    # ---- sbar ----
+    async def insert_sbar(self, row: dict) -> dict:
+        response = await self._execute("sbar", (await self._table("sbar")).insert(row))
+        return response.data[0]
+
+    async def sbar_notes(self, patient_id: str, select: str = "*", limit: Optional[int] = None) -> List[dict]:
+        query = (await self._table("sbar")).select(select).eq("patient_id", patient_id).order("created_at", desc=True)
+        if limit:
+            query = query.limit(limit)
+        response = await self._execute("sbar", query)
+        return response.data or []
+
+    async def latest_sbar(self, patient_id: str) -> Optional[dict]:
+        rows = await self.sbar_notes(patient_id, limit=1)
+        return rows[0] if rows else None
+
+    async def sbar_ids_matching(self, fields: Dict[str, str], limit: int = 5) -> List:
+        query = (await self._table("sbar")).select("id")
+        for name, value in fields.items():
+            query = query.eq(name, value)
+        response = await self._execute("sbar", query.order("created_at", desc=True).limit(limit))
+        return [row["id"] for row in response.data or []]
+
+    # ---- ai_summaries ----
+    async def insert_ai_summary(self, row: dict) -> List[dict]:
+        response = await self._execute("ai_summaries", (await self._table("ai_summaries")).insert(row))
+        return response.data
+
+    async def ai_summaries(self, patient_id: str, select: str = "*", limit: Optional[int] = None) -> List[dict]:
+        query = (await self._table("ai_summaries")).select(select).eq("patient_id", patient_id).order("created_at", desc=True)
+        if limit:
+            query = query.limit(limit)
+        response = await self._execute("ai_summaries", query)
+        return response.data or []
+
+    async def latest_summary_for_sbars(self, sbar_ids: Sequence) -> Optional[str]:
+        query = (
+            (await self._table("ai_summaries"))
+            .select("summary")
+            .in_("sbar_id", list(sbar_ids))
+            .order("created_at", desc=True)
+            .limit(1)
+        )
+        response = await self._execute("ai_summaries", query)
+        return response.data[0]["summary"] if response.data else None
+
+    async def sbar_has_summary(self, sbar_id) -> bool:
+        query = (await self._table("ai_summaries")).select("sbar_id").eq("sbar_id", sbar_id).limit(1)
+        response = await self._execute("ai_summaries", query)
+        return bool(response.data)
+
+    # ---- audit_logs ----
+    async def insert_audit_logs(self, rows: List[dict]) -> List[dict]:
+        response = await self._execute("audit_logs", (await self._table("audit_logs")).insert(rows))
+        return response.data
+
+    async def recent_audit_logs(self, limit: int = 10) -> List[dict]:
+        query = (await self._table("audit_logs")).select("*").order("timestamp", desc=True).limit(limit)
+        response = await self._execute("audit_logs", query)
+        return response.data or []
@@ -0,0 +1,335 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+class SessionLimitReached(RuntimeError):
+    """The store is full of sessions that are still recording, so a new one can't be made room for."""
+
+
+class SessionStore(ABC):
+    """
+    Shared state of recording sessions: status, committed transcript and partial text.
+
+    Live objects (PyAudio stream, ring buffer, transcriber) stay in the process that runs the session;
+    only plain data goes through the store, so any worker can read, stop or feed audio to a session.
+    Sessions with no activity for idle_ttl seconds, or recording for longer than max_age seconds, are
+    stopped. Stopped sessions stay readable for finished_ttl seconds so the last chunk's text isn't lost
+    when /stop-recording is called.
+    """
+
+    def __init__(self, idle_ttl: float = 900.0, finished_ttl: float = 300.0, max_age: float = 4 * 3600.0):
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.max_age = max_age
+
+    @abstractmethod
+    def create(self, session_id: str, source: str, owner: Optional[str] = None):
+        # owner is the user who started the session; only they may feed it audio
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def is_recording(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def touch(self, session_id: str):
+        # Marks client activity so the session isn't reaped as idle
+        ...
+
+    @abstractmethod
+    def append(self, session_id: str, segments: List[str], partial: str):
+        ...
+
+    @abstractmethod
+    def stop(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def finish(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def push_audio(self, session_id: str, samples: np.ndarray):
+        # Audio received by a worker that doesn't own the session, waiting for the owner to pick it up
+        ...
+
+    @abstractmethod
+    def pop_audio(self, session_id: str) -> List[np.ndarray]:
+        ...
+
+    @abstractmethod
+    def reap(self) -> List[str]:
+        # Stops idle sessions and deletes expired finished ones; returns the deleted ids
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store: LRU bounded to max_sessions with TTL reaping."""
+
+    def __init__(self, max_sessions: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str, source: str, owner: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            if session_id not in self._sessions and len(self._sessions) >= self.max_sessions:
+                # Make room by dropping the least recently used stopped session; never one still recording
+                oldest = next((sid for sid, session in self._sessions.items() if not session["is_recording"]), None)
+                if oldest is None:
+                    raise SessionLimitReached(f"All {self.max_sessions} sessions are still recording")
+                del self._sessions[oldest]
+            self._sessions[session_id] = {
+                "session_id": session_id,
+                "source": source,
+                "owner": owner,
+                "is_recording": True,
+                "finished": False,
+                "transcription": [],
+                "partial": "",
+                "created_at": now,
+                "updated_at": now,
+                "stopped_at": None,
+                "audio": [],
+            }
+
+    def _touch(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            session["updated_at"] = time.time()
+        return session
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            data = {k: v for k, v in session.items() if k != "audio"}
+            data["transcription"] = list(session["transcription"])
+            return data
+
+    def is_recording(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return bool(session and session["is_recording"])
+
+    def touch(self, session_id: str):
+        with self._lock:
+            self._touch(session_id)
+
+    def append(self, session_id: str, segments: List[str], partial: str):
+        with self._lock:
+            session = self._touch(session_id)
+            if session is not None:
+                session["transcription"].extend(segments)
+                session["partial"] = partial
+
+    def stop(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._touch(session_id)
+            if session is None:
+                return False
+            if session["is_recording"]:
+                session["is_recording"] = False
+                session["stopped_at"] = time.time()
+            return True
+
+    def finish(self, session_id: str):
+        with self._lock:
+            session = self._touch(session_id)
+            if session is not None:
+                session["is_recording"] = False
+                session["finished"] = True
+                session["stopped_at"] = session["stopped_at"] or time.time()
+
+    def push_audio(self, session_id: str, samples: np.ndarray):
+        with self._lock:
+            session = self._touch(session_id)
+            if session is not None:
+                session["audio"].append(samples)
+
+    def pop_audio(self, session_id: str) -> List[np.ndarray]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not session["audio"]:
+                return []
+            audio, session["audio"] = session["audio"], []
+            return audio
+
+    def reap(self) -> List[str]:
+        now = time.time()
+        removed = []
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                if session["is_recording"] and (
+                    now - session["updated_at"] > self.idle_ttl or now - session["created_at"] > self.max_age
+                ):
+                    session["is_recording"] = False
+                    session["stopped_at"] = now
+                elif session["stopped_at"] and now - session["stopped_at"] > self.finished_ttl:
+                    del self._sessions[session_id]
+                    removed.append(session_id)
+        return removed
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store in a local SQLite file (WAL mode), shared by all uvicorn workers on the host."""
+
+    def __init__(self, path: str = "sessions.db", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    is_recording INTEGER NOT NULL,
+                    finished INTEGER NOT NULL,
+                    transcription TEXT NOT NULL,
+                    partial TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    stopped_at REAL,
+                    owner TEXT
+                )""")
+            # Files created before sessions had an owner
+            if "owner" not in [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]:
+                conn.execute("ALTER TABLE sessions ADD COLUMN owner TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_audio (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    samples BLOB NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS session_audio_session ON session_audio(session_id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, session_id: str, source: str, owner: Optional[str] = None):
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO sessions (session_id, source, owner, is_recording, finished, transcription, partial, created_at, updated_at) "
+            "VALUES (?, ?, ?, 1, 0, '[]', '', ?, ?)",
+            (session_id, source, owner, now, now),
+        )
+
+    def get(self, session_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        data = dict(row)
+        data["is_recording"] = bool(data["is_recording"])
+        data["finished"] = bool(data["finished"])
+        data["transcription"] = json.loads(data["transcription"])
+        return data
+
+    def is_recording(self, session_id: str) -> bool:
+        row = self._conn().execute("SELECT is_recording FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return bool(row and row[0])
+
+    def touch(self, session_id: str):
+        self._conn().execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (time.time(), session_id))
+
+    def append(self, session_id: str, segments: List[str], partial: str):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT transcription FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                transcription = json.loads(row[0]) + list(segments)
+                conn.execute(
+                    "UPDATE sessions SET transcription = ?, partial = ?, updated_at = ? WHERE session_id = ?",
+                    (json.dumps(transcription), partial, time.time(), session_id),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stop(self, session_id: str) -> bool:
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE sessions SET is_recording = 0, stopped_at = COALESCE(stopped_at, ?), updated_at = ? WHERE session_id = ?",
+            (now, now, session_id),
+        )
+        return cursor.rowcount > 0
+
+    def finish(self, session_id: str):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE sessions SET is_recording = 0, finished = 1, stopped_at = COALESCE(stopped_at, ?), updated_at = ? WHERE session_id = ?",
+            (now, now, session_id),
+        )
+        conn.execute("DELETE FROM session_audio WHERE session_id = ?", (session_id,))
+
+    def push_audio(self, session_id: str, samples: np.ndarray):
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO session_audio (session_id, samples) VALUES (?, ?)",
+            (session_id, np.asarray(samples, dtype=np.float32).tobytes()),
+        )
+        conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (time.time(), session_id))
+
+    def pop_audio(self, session_id: str) -> List[np.ndarray]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, samples FROM session_audio WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM session_audio WHERE session_id = ? AND id <= ?", (session_id, rows[-1][0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+
+    def reap(self) -> List[str]:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE sessions SET is_recording = 0, stopped_at = ? WHERE is_recording = 1 AND (updated_at < ? OR created_at < ?)",
+            (now, now - self.idle_ttl, now - self.max_age),
+        )
+        expired = [row[0] for row in conn.execute(
+            "SELECT session_id FROM sessions WHERE stopped_at IS NOT NULL AND stopped_at < ?",
+            (now - self.finished_ttl,),
+        )]
+        for session_id in expired:
+            conn.execute("DELETE FROM session_audio WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return expired
+
+
+def create_session_store(kind: str = "memory", **kwargs) -> SessionStore:
+    if kind == "memory":
+        return MemorySessionStore(**{k: v for k, v in kwargs.items() if k != "path"})
+    if kind == "sqlite":
+        return SQLiteSessionStore(**{k: v for k, v in kwargs.items() if k != "max_sessions"})
+    raise ValueError(f"Unknown session store: {kind}")
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from http_client import CircuitOpen, HttpClient
+
+HF_MODEL_ID = "Falconsai/medical_summarization"
+HF_API_BASE = "https://router.huggingface.co"
+
+# Generation settings sent to the remote API; each backend reports what it actually uses in generation_params
+GENERATION_PARAMS = {
+    "temperature": 0.4,
+    "max_new_tokens": 200
+}
+
+
+class SummarizerBackend:
+    """Turns an SBAR prompt into a summary. Implementations must not block the event loop."""
+
+    name = "base"
+    model_id = HF_MODEL_ID
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    @property
+    def ready(self) -> bool:
+        # Whether a request would be served without first waiting on a model load
+        return True
+
+    @property
+    def generation_params(self) -> dict:
+        # The settings that shape this backend's output; part of the summary cache key
+        return GENERATION_PARAMS
+
+    async def summarize(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def summarize_stream(self, prompt: str) -> AsyncIterator[str]:
+        # Pieces of the summary as they are generated; backends that can't stream yield it whole
+        yield await self.summarize(prompt)
+
+
+def parse_summary(data) -> str:
+    #Handles possible HF API response formats
+    if isinstance(data, list) and data and "summary_text" in data[0]:
+        return data[0]["summary_text"].strip()
+    if isinstance(data, dict) and "summary_text" in data:
+        return data["summary_text"].strip()
+    return str(data)
+
+
+class HuggingFaceRemoteSummarizer(SummarizerBackend):
+    """Hugging Face serverless inference through router.huggingface.co, over the shared async HTTP client."""
+
+    name = "remote"
+
+    def __init__(self, api_token: str, http: HttpClient, model_id: str = HF_MODEL_ID, base_url: str = HF_API_BASE):
+        self.model_id = model_id
+        self.base_url = base_url.rstrip("/")
+        self.http = http
+        self.headers = {
+            "Authorization": f"Bearer {api_token}",
+            "Content-Type": "application/json"
+        }
+
+    async def summarize(self, prompt: str) -> str: #Sends prompt to Hugging Face Serverless Inference API and returns generated text.
+        url = f"{self.base_url}/hf-inference/models/{self.model_id}"
+
+        payload = {
+            "inputs": prompt,
+            "parameters": GENERATION_PARAMS
+        }
+
+        # Summarizing the same prompt twice is harmless, so transient failures can be retried
+        try:
+            response = await self.http.post(url, headers=self.headers, json=payload, idempotent=True)
+        except CircuitOpen as e:
+            raise HTTPException(status_code=503, detail=f"HF API unavailable: {e}", headers={"Retry-After": str(int(e.retry_after) + 1)})
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=503, detail=f"HF API unavailable: {e!r}")
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=500,
+                detail = f"HF API Error {response.status_code}: {response.text}"
+            )
+
+        return parse_summary(response.json())
+
+    async def summarize_stream(self, prompt: str) -> AsyncIterator[str]:
+        # Models served by text-generation-inference stream tokens as SSE when asked to; the hf-inference
+        # summarization task ignores "stream" and answers with one JSON body, which is passed on whole
+        url = f"{self.base_url}/hf-inference/models/{self.model_id}"
+        payload = {
+            "inputs": prompt,
+            "parameters": GENERATION_PARAMS,
+            "stream": True
+        }
+        try:
+            async with self.http.stream("POST", url, headers=self.headers, json=payload) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise HTTPException(status_code=500, detail=f"HF API Error {response.status_code}: {body}")
+                if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                    yield parse_summary(json.loads(await response.aread()))
+                    return
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    token = json.loads(data).get("token") or {}
+                    if token.get("text") and not token.get("special"):
+                        yield token["text"]
+        except CircuitOpen as e:
+            raise HTTPException(status_code=503, detail=f"HF API unavailable: {e}", headers={"Retry-After": str(int(e.retry_after) + 1)})
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=503, detail=f"HF API unavailable: {e!r}")
+
+
+class LocalSummarizer(SummarizerBackend):
+    """
+    Runs the summarization model on the local CPU with dynamic micro-batching.
+
+    Requests that arrive within max_wait_ms of each other (up to max_batch_size) are padded into one
+    batch and generated in a single forward pass on a dedicated thread, so the event loop stays free and
+    concurrent handoffs share the model's cost instead of queueing behind each other.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_id: str = HF_MODEL_ID,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_input_tokens: int = 512,
+        threads: Optional[int] = None,
+        warmup: bool = True,
+    ):
+        self.model_id = model_id
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_input_tokens = max_input_tokens
+        self.threads = threads
+        self.warmup = warmup
+        self._model = None
+        self._tokenizer = None
+        # One inference thread: batching, not parallel generate calls, is what buys throughput on CPU
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._loading: Optional[Future] = None
+        self._ready = False
+
+    def load(self):
+        # Optional dependencies, only needed when the local backend is selected
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        started = time.perf_counter()
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self._model = AutoModelForSeq2SeqLM.from_pretrained(self.model_id)
+        self._model.eval()
+        if self.warmup:
+            # A throwaway generate call so the first real request doesn't pay for torch's lazy initialization
+            self.generate_batch(["Situation: warm-up. Background: none. Assessment: stable. Recommendation: none."])
+        self._ready = True
+        logging.info(f"Loaded local summarizer {self.model_id} in {time.perf_counter() - started:.1f}s")
+
+    def _load(self):
+        try:
+            self.load()
+        except BaseException:
+            logging.exception(f"Loading local summarizer {self.model_id} failed")
+            self._ready = False
+            raise
+
+    def _load_failed(self) -> bool:
+        loading = self._loading
+        return loading is not None and loading.done() and (loading.cancelled() or loading.exception() is not None)
+
+    def start(self):
+        # Load the weights off the event loop; the first request waits for it if it isn't done yet.
+        # A failed load isn't kept: the next call starts another attempt.
+        if self._loading is None or self._load_failed():
+            self._loading = self._executor.submit(self._load)
+
+    async def _wait_loaded(self):
+        self.start()
+        try:
+            # Shielded so a caller that gives up doesn't cancel the load for everyone else
+            await asyncio.shield(asyncio.wrap_future(self._loading))
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Local summarizer failed to load: {e!r}")
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    @property
+    def generation_params(self) -> dict:
+        # Greedy decoding: summaries are repeatable, so temperature doesn't apply
+        return {"max_new_tokens": GENERATION_PARAMS["max_new_tokens"], "do_sample": False}
+
+    def stop(self):
+        if self._batcher:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=False)
+
+    def generate_batch(self, prompts: List[str], streamer=None) -> List[str]:
+        import torch
+
+        inputs = self._tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_input_tokens,
+        )
+        with torch.inference_mode():
+            outputs = self._model.generate(
+                **inputs,
+                **self.generation_params,
+                streamer=streamer,
+            )
+        return [text.strip() for text in self._tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+    async def summarize(self, prompt: str) -> str:
+        # If start() wasn't called at startup, the first request loads the model
+        await self._wait_loaded()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def summarize_stream(self, prompt: str) -> AsyncIterator[str]:
+        # Streamed requests run on their own rather than in a micro-batch (a streamer follows one sequence);
+        # they share the inference thread, so they queue behind a batch that is already generating
+        await self._wait_loaded()
+        from transformers import TextStreamer
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        class QueueStreamer(TextStreamer):
+            # Called on the inference thread with each decoded run of whole words
+            def on_finalized_text(self, text: str, stream_end: bool = False):
+                loop.call_soon_threadsafe(queue.put_nowait, (text, stream_end))
+
+        def run():
+            try:
+                self.generate_batch([prompt], streamer=QueueStreamer(self._tokenizer, skip_prompt=True, skip_special_tokens=True))
+            finally:
+                # Unblocks the reader if generate() failed before the streamer saw the end
+                loop.call_soon_threadsafe(queue.put_nowait, ("", True))
+
+        generation = loop.run_in_executor(self._executor, run)
+        while True:
+            text, stream_end = await queue.get()
+            if text:
+                yield text
+            if stream_end:
+                break
+        try:
+            await generation
+        except Exception as e:
+            logging.warning(f"Local streamed summarization failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Local summarizer error: {e}")
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            # Give concurrent requests a few milliseconds to join this batch
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                summaries = await loop.run_in_executor(self._executor, self.generate_batch, prompts)
+            except Exception as e:
+                logging.warning(f"Local summarization batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(HTTPException(status_code=500, detail=f"Local summarizer error: {e}"))
+                continue
+            for (_, future), summary in zip(batch, summaries):
+                if not future.done():
+                    future.set_result(summary)
+
+
+def create_summarizer(kind: str, api_token: Optional[str] = None, http: Optional[HttpClient] = None, **kwargs) -> SummarizerBackend:
+    if kind == "remote":
+        return HuggingFaceRemoteSummarizer(api_token, http, **kwargs)
+    if kind == "local":
+        return LocalSummarizer(**kwargs)
+    raise ValueError(f"Unknown summarizer backend: {kind}")
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    # Differences in whitespace, case or unicode form shouldn't produce a different summary
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def summary_cache_key(fields: dict, model_id: str, params: dict) -> str:
+    payload = {
+        "fields": {name: normalize_text(value) for name, value in sorted(fields.items())},
+        "model": model_id,
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SQLiteSummaryStore:
+    """Persistent cache tier in a local SQLite file, with TTL and a row cap."""
+
+    def __init__(self, path: str = "summary_cache.db", ttl: float = 7 * 86400.0, max_rows: int = 50000):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._conn().execute("PRAGMA journal_mode=WAL")
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS summary_cache_created ON summary_cache(created_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT summary FROM summary_cache WHERE key = ? AND created_at >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, summary: str):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO summary_cache VALUES (?, ?, ?)", (key, summary, time.time()))
+        # Evict expired rows, then the oldest ones beyond the cap
+        conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        conn.execute(
+            "DELETE FROM summary_cache WHERE key IN ("
+            "SELECT key FROM summary_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+
+class AISummaryLookup:
+    """
+    Reuses a summary already saved in ai_summaries for an SBAR note with exactly the same fields.
+
+    Rows don't record which model wrote them (or whether a user typed them through /save-summary), so a
+    reused summary is only passed through: it is never promoted into the model-keyed memory or store tiers.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    async def get(self, fields: dict) -> Optional[str]:
+        sbar_ids = await self.repository.sbar_ids_matching(fields, limit=5)
+        if not sbar_ids:
+            return None
+        return await self.repository.latest_summary_for_sbars(sbar_ids)
+
+
+class _LeaderGone(Exception):
+    """Set on an in-flight entry whose leading request was cancelled; its waiters retry rather than fail."""
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: an in-memory LRU in front of an optional persistent store, with a final
+    fallback to summaries already saved in ai_summaries. Concurrent requests for the same key share a
+    single inference call.
+    """
+
+    def __init__(
+        self,
+        store: Optional[SQLiteSummaryStore] = None,
+        ai_summaries: Optional[AISummaryLookup] = None,
+        max_entries: int = 1024,
+        ttl: float = 86400.0,
+    ):
+        self.store = store
+        self.ai_summaries = ai_summaries
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"memory_hits": 0, "store_hits": 0, "ai_summaries_hits": 0, "misses": 0, "coalesced": 0}
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        summary, expires = entry
+        if expires < time.monotonic():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return summary
+
+    def will_generate(self, key: str) -> bool:
+        # False when the key is answered from memory or joins a generation already running.
+        # Only checks memory, so a request that would hit the SQLite store or ai_summaries still counts.
+        return key not in self._in_flight and self._memory_get(key) is None
+
+    def _memory_put(self, key: str, summary: str):
+        self._memory[key] = (summary, time.monotonic() + self.ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _memory_or_joined(self, key: str) -> Optional[Tuple[str, str]]:
+        # A summary from memory or from a generation another request is running; None means go generate it
+        while True:
+            summary = self._memory_get(key)
+            if summary is not None:
+                self.stats["memory_hits"] += 1
+                return summary, "memory"
+
+            # Someone is already working on this key; wait for their result instead of paying again
+            pending = self._in_flight.get(key)
+            if pending is None:
+                return None
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending), "coalesced"
+            except _LeaderGone:
+                # Its request was cancelled before finishing; look again, and take over if nobody else has
+                continue
+
+    @staticmethod
+    def _fail(future: asyncio.Future, e: BaseException):
+        if future.done():
+            return
+        # A leader cancelled or closed by its own client says nothing about the summary, so waiters retry
+        future.set_exception(_LeaderGone() if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else e)
+        # Mark the exception as retrieved when nobody else was waiting on it
+        future.exception()
+
+    async def get_or_compute(self, key: str, fields: dict, compute: Callable[[], Awaitable[str]]) -> Tuple[str, str]:
+        # Returns (summary, where it came from)
+        found = await self._memory_or_joined(key)
+        if found:
+            return found
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            summary, source = await self._lookup_or_compute(key, fields, compute)
+            self._finish(key, future, summary, source)
+            return summary, source
+        except BaseException as e:
+            self._fail(future, e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def stream(self, key: str, fields: dict, generate: Callable[[], AsyncIterator[str]]) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Streaming counterpart of get_or_compute: yields (text, source) pieces. Cache hits arrive as a single
+        piece; on a miss the model's output is passed through as it is generated, then cached. Requests for
+        the same key that arrive meanwhile wait for the finished summary as they would for get_or_compute.
+        """
+        found = await self._memory_or_joined(key)
+        if found:
+            yield found
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            found = await self._lookup(key, fields)
+            if found:
+                summary, source = found
+                self._finish(key, future, summary, source)
+                yield summary, source
+                return
+            self.stats["misses"] += 1
+            parts = []
+            async for piece in generate():
+                parts.append(piece)
+                yield piece, "model"
+            summary = "".join(parts).strip()
+            await self._store_put(key, summary)
+            self._finish(key, future, summary, "model")
+        except BaseException as e:
+            # A client that disconnects mid-stream closes this generator; waiters then take over
+            self._fail(future, e)
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _finish(self, key: str, future: asyncio.Future, summary: str, source: str):
+        # Waiters get the summary either way; only ones this model produced are cached under its key
+        if source != "ai_summaries":
+            self._memory_put(key, summary)
+        future.set_result(summary)
+
+    async def _lookup(self, key: str, fields: dict) -> Optional[Tuple[str, str]]:
+        # Persistent store, then summaries already saved in ai_summaries; None if neither has it
+        if self.store:
+            try:
+                summary = await asyncio.to_thread(self.store.get, key)
+                if summary is not None:
+                    self.stats["store_hits"] += 1
+                    return summary, "store"
+            except Exception as e:
+                logging.warning(f"Summary cache store lookup failed: {e}")
+
+        if self.ai_summaries:
+            try:
+                summary = await self.ai_summaries.get(fields)
+                if summary is not None:
+                    self.stats["ai_summaries_hits"] += 1
+                    return summary, "ai_summaries"
+            except Exception as e:
+                logging.warning(f"ai_summaries lookup failed: {e!r}")
+        return None
+
+    async def _lookup_or_compute(self, key: str, fields: dict, compute) -> Tuple[str, str]:
+        found = await self._lookup(key, fields)
+        if found:
+            return found
+
+        self.stats["misses"] += 1
+        summary = await compute()
+        await self._store_put(key, summary)
+        return summary, "model"
+
+    async def _store_put(self, key: str, summary: str):
+        if not self.store:
+            return
+        try:
+            await asyncio.to_thread(self.store.put, key, summary)
+        except Exception as e:
+            logging.warning(f"Summary cache store write failed: {e}")
+
+    def metrics(self) -> dict:
+        return {**self.stats, "memory_entries": len(self._memory), "in_flight": len(self._in_flight)}
@@ -0,0 +1,297 @@
+import bisect
+import contextvars
+import logging
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from `fn` every time /metrics is scraped."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self.fn is not None:
+            try:
+                return [f"{self.name} {_number(self.fn())}"]
+            except Exception as e:
+                logging.warning(f"Gauge {self.name} callback failed: {e}")
+                return []
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric the process exports and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Request latency by route template; streamed responses until their last byte.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled.")
+STAGE_SECONDS = REGISTRY.histogram(
+    "handoff_stage_duration_seconds",
+    "Time spent in one stage of a request or background job (database table, summarizer, whisper chunk, audit).",
+    ("stage", "detail"),
+)
+
+# Stage timings of the request currently being handled, for the Server-Timing header
+_request_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("request_stages", default=None)
+
+
+def observe_stage(stage: str, seconds: float, detail: str = ""):
+    STAGE_SECONDS.observe(seconds, stage=stage, detail=detail)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((f"{stage}.{detail}" if detail else stage, seconds))
+
+
+@contextmanager
+def timed_stage(stage: str, detail: str = ""):
+    # Works around both sync code and awaits, since only wall-clock time is measured
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, detail)
+
+
+def begin_request_stages() -> contextvars.Token:
+    return _request_stages.set([])
+
+
+def end_request_stages(token: contextvars.Token) -> List[Tuple[str, float]]:
+    stages = _request_stages.get() or []
+    _request_stages.reset(token)
+    return stages
+
+
+def server_timing(stages: List[Tuple[str, float]], total: float, total_name: str = "total") -> str:
+    # Stages that ran more than once (e.g. one query per chart section) are summed
+    totals: Dict[str, Tuple[float, int]] = {}
+    for name, seconds in stages:
+        spent, count = totals.get(name, (0.0, 0))
+        totals[name] = (spent + seconds, count + 1)
+    parts = [f"{total_name};dur={total * 1000:.1f}"]
+    for name, (spent, count) in totals.items():
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        parts.append(f'{safe};dur={spent * 1000:.1f};desc="x{count}"')
+    return ", ".join(parts)
+
+
+class SlowRequestProfiler:
+    """
+    Profiles a random sample of requests and keeps the profile only when the request turned out slow.
+
+    Uses pyinstrument (which follows awaits) when it is installed, otherwise cProfile. cProfile sees the
+    whole event-loop thread, so its output also includes whatever other requests ran concurrently.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, slow_seconds: float = 1.0, output_dir: str = "profiles", max_files: int = 100):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._active = False
+        self._lock = threading.Lock()
+        self.saved = 0
+        try:
+            import pyinstrument  # noqa: F401
+            self.backend = "pyinstrument"
+        except ImportError:
+            self.backend = "cprofile"
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            # cProfile can only run one profile per thread at a time
+            if self._active:
+                return None
+            self._active = True
+        try:
+            if self.backend == "pyinstrument":
+                from pyinstrument import Profiler
+
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+            else:
+                import cProfile
+
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except Exception as e:
+            logging.warning(f"Could not start request profiler: {e}")
+            with self._lock:
+                self._active = False
+            return None
+        return profiler
+
+    def finish(self, profiler, method: str, path: str, seconds: float):
+        try:
+            if self.backend == "pyinstrument":
+                profiler.stop()
+            else:
+                profiler.disable()
+            if seconds < self.slow_seconds or self.saved >= self.max_files:
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            slug = "".join(c if c.isalnum() else "_" for c in path.strip("/"))[:60] or "root"
+            base = os.path.join(self.output_dir, f"{int(time.time() * 1000)}_{method}_{slug}_{int(seconds * 1000)}ms")
+            if self.backend == "pyinstrument":
+                with open(base + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.dump_stats(base + ".prof")
+            self.saved += 1
+            logging.warning(f"Slow request {method} {path} took {seconds:.2f}s, profile saved to {base}")
+        except Exception as e:
+            logging.warning(f"Could not save request profile: {e}")
+        finally:
+            with self._lock:
+                self._active = False
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend is a flat set of modules run from this folder (uvicorn main:app), so tests import them the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,114 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+import audio_decode
+from audio_decode import (InvalidSampleRate, OpusFrameDecoder, UnsupportedAudio, decode_chunk, decode_pcm16, decode_wav,
+                          resample)
+
+
+def pcm(values):
+    return np.asarray(values, dtype="<i2").tobytes()
+
+
+def wav_bytes(samples, rate, channels=1, width=2):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(samples)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("rate", [0, -16000, 7999, 192001, 10**9, 16000.5, True])
+def test_bad_sample_rates_are_rejected(rate):
+    with pytest.raises(InvalidSampleRate):
+        decode_pcm16(pcm([0, 1, 2, 3]), rate)
+
+
+def test_invalid_sample_rate_is_unsupported_audio():
+    # Callers that only know UnsupportedAudio still get a client error, never a ZeroDivisionError
+    with pytest.raises(UnsupportedAudio):
+        decode_chunk(pcm([0, 0]), "audio/l16", sample_rate=0)
+
+
+def test_resample_changes_length_by_rate():
+    samples = np.linspace(-1, 1, 8000, dtype=np.float32)
+    out = resample(samples, 8000)
+    assert out.dtype == np.float32 and len(out) == 16000
+    assert resample(samples, 16000) is samples
+
+
+def test_pcm16_stereo_is_mixed_down():
+    out = decode_pcm16(pcm([16384, 0, 16384, 0]), 16000, channels=2)
+    assert out.tolist() == [0.25, 0.25]
+
+
+def test_l16_is_big_endian_and_honours_its_rate():
+    data = np.asarray([8192] * 8000, dtype=">i2").tobytes()
+    out = decode_chunk(data, "audio/L16; rate=8000")
+    assert len(out) == 16000 and abs(out[100] - 0.25) < 1e-6
+    # Little endian PCM keeps its own type
+    assert decode_chunk(pcm([8192]), "audio/pcm").tolist() == [0.25]
+
+
+def test_l16_channels_and_bad_parameters():
+    data = np.asarray([16384, 0], dtype=">i2").tobytes()
+    assert decode_chunk(data, "audio/L16; rate=16000; channels=2").tolist() == [0.25]
+    with pytest.raises(UnsupportedAudio):
+        decode_chunk(data, "audio/L16; rate=fast")
+    with pytest.raises(InvalidSampleRate):
+        decode_chunk(data, "audio/L16; rate=0")
+
+
+def test_odd_length_pcm_is_rejected():
+    with pytest.raises(UnsupportedAudio):
+        decode_pcm16(b"\x00\x01\x02")
+
+
+def test_wav_is_decoded_and_resampled():
+    data = wav_bytes(pcm([8192] * 8000), 8000)
+    out = decode_chunk(data, "audio/wav")
+    assert len(out) == 16000 and abs(out[100] - 0.25) < 1e-6
+
+
+def test_wav_with_zero_rate_header_is_rejected():
+    data = bytearray(wav_bytes(pcm([0] * 10), 16000))
+    data[24:28] = (0).to_bytes(4, "little")  # fmt chunk sample rate
+    with pytest.raises(UnsupportedAudio):
+        decode_wav(bytes(data))
+
+
+def test_garbage_wav_and_unknown_type_are_rejected():
+    with pytest.raises(UnsupportedAudio):
+        decode_wav(b"not a wav")
+    with pytest.raises(UnsupportedAudio):
+        decode_chunk(b"", "audio/mpeg")
+
+
+class FakeOpus:
+    class Decoder:
+        def __init__(self, rate, channels):
+            pass
+
+        def decode(self, packet, frame_size):
+            if packet == b"bad":
+                raise RuntimeError("corrupted stream")
+            return pcm([16384] * 4)
+
+
+def test_opus_decode_errors_become_unsupported_audio(monkeypatch):
+    monkeypatch.setattr(audio_decode, "opuslib", FakeOpus)
+    decoder = OpusFrameDecoder()
+    assert decoder.decode(b"ok").tolist() == [0.5] * 4
+    with pytest.raises(UnsupportedAudio):
+        decoder.decode(b"bad")
+
+
+def test_opus_without_opuslib_is_unsupported(monkeypatch):
+    monkeypatch.setattr(audio_decode, "opuslib", None)
+    with pytest.raises(UnsupportedAudio):
+        decode_chunk(b"\x00", "audio/opus")
@@ -0,0 +1,105 @@
+import json
+import time
+
+from audit import AuditSink
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.client.failures:
+            self.client.failures -= 1
+            raise RuntimeError("supabase down")
+        self.client.inserted.extend(self.rows)
+
+
+class FakeClient:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.inserted = []
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def make_sink(tmp_path, client, **kwargs):
+    return AuditSink(client=client, spill_path=str(tmp_path / "spill.jsonl"), max_retries=1, flush_interval=0.05, **kwargs)
+
+
+def test_events_are_flushed_in_batches(tmp_path):
+    client = FakeClient()
+    sink = make_sink(tmp_path, client, batch_size=2)
+    sink.start()
+    for i in range(5):
+        sink.emit({"action": f"A{i}"})
+    sink.stop()
+    assert [e["action"] for e in client.inserted] == [f"A{i}" for i in range(5)]
+
+
+def test_failed_flush_spills_to_disk(tmp_path):
+    client = FakeClient(failures=1)
+    sink = make_sink(tmp_path, client)
+    assert sink._flush([{"action": "A"}]) is False
+    assert [json.loads(line) for line in (tmp_path / "spill.jsonl").read_text().splitlines()] == [{"action": "A"}]
+
+
+def test_replay_skips_partial_line(tmp_path):
+    client = FakeClient()
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text('{"action": "A"}\n{"action": "B"}\n{"action": "C", "us')
+    sink = make_sink(tmp_path, client)
+    sink._replay_spill()
+    assert [e["action"] for e in client.inserted] == ["A", "B"]
+    assert not spill.exists() and not (tmp_path / "spill.jsonl.replay").exists()
+    assert (tmp_path / "spill.jsonl.corrupt").read_text() == '{"action": "C", "us\n'
+
+
+def test_replay_failure_keeps_events_on_disk(tmp_path, caplog):
+    client = FakeClient(failures=1)
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text('{"action": "A"}\n{"action": "B"}\n')
+    sink = make_sink(tmp_path, client)
+    with caplog.at_level("INFO"):
+        sink._replay_spill()
+    assert client.inserted == []
+    assert [json.loads(line)["action"] for line in spill.read_text().splitlines()] == ["A", "B"]
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+    assert "Replayed" not in caplog.text
+
+
+def test_writer_survives_an_unexpected_error(tmp_path):
+    client = FakeClient()
+    sink = make_sink(tmp_path, client)
+    calls = {"n": 0}
+    original = sink._replay_spill
+
+    def flaky_replay():
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise OSError("disk hiccup")
+        original()
+
+    sink._replay_spill = flaky_replay
+    sink.start()
+    sink.emit({"action": "A"})
+    deadline = time.monotonic() + 2
+    while calls["n"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sink.emit({"action": "B"})
+    sink.stop()
+    assert sink._thread is not None
+    assert [e["action"] for e in client.inserted] == ["A", "B"]
+    assert calls["n"] == 2
+
+
+def test_unserializable_event_is_spilled_as_text(tmp_path):
+    sink = make_sink(tmp_path, FakeClient())
+    assert sink._spill([{"at": object}])
+    assert "class 'object'" in (tmp_path / "spill.jsonl").read_text()
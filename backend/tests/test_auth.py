@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from auth import InvalidToken, TokenVerifier
+from http_client import HttpClient
+
+ISSUER = "http://supabase.test/auth/v1"
+JWKS_URL = f"{ISSUER}/.well-known/jwks.json"
+SECRET = "legacy-shared-secret-at-least-32-bytes"
+
+RSA_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+EC_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def public_jwk(private_key, kid, algorithm):
+    jwk = json.loads(algorithm.to_jwk(private_key.public_key()))
+    return {**jwk, "kid": kid, "alg": "RS256" if kid == "rsa" else "ES256", "use": "sig"}
+
+
+JWKS = {"keys": [public_jwk(RSA_KEY, "rsa", jwt.algorithms.RSAAlgorithm),
+                 public_jwk(EC_KEY, "ec", jwt.algorithms.ECAlgorithm)]}
+
+
+def make_verifier(jwks_requests=None, **kwargs):
+    def handler(request):
+        if jwks_requests is not None:
+            jwks_requests.append(request)
+        return httpx.Response(200, json=JWKS)
+
+    http = HttpClient()
+    http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    kwargs.setdefault("leeway", 0)
+    return TokenVerifier(JWKS_URL, http, issuer=ISSUER, **kwargs)
+
+
+def claims(**overrides):
+    now = int(time.time())
+    payload = {"sub": "user-1", "email": "nurse@example.com", "aud": "authenticated", "iss": ISSUER,
+               "iat": now, "exp": now + 3600}
+    payload.update(overrides)
+    return {k: v for k, v in payload.items() if v is not None}
+
+
+def rs256(**overrides):
+    return jwt.encode(claims(**overrides), RSA_KEY, algorithm="RS256", headers={"kid": "rsa"})
+
+
+def verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+
+def test_jwks_tokens_verify_and_are_cached():
+    requests = []
+    verifier = make_verifier(requests)
+    token = rs256()
+    assert verify(verifier, token)["email"] == "nurse@example.com"
+    assert verify(verifier, token)["sub"] == "user-1"
+    es256 = jwt.encode(claims(), EC_KEY, algorithm="ES256", headers={"kid": "ec"})
+    assert verify(verifier, es256)["sub"] == "user-1"
+    metrics = verifier.metrics()
+    assert metrics["verifications"] == 2 and metrics["cache_hits"] == 1
+    assert len(requests) == 1  # one JWKS fetch serves both keys
+
+
+@pytest.mark.parametrize("overrides, reason", [
+    ({"exp": int(time.time()) - 60}, "expired"),
+    ({"iss": "https://attacker.example/auth/v1"}, "issuer"),
+    ({"aud": "anon"}, "(?i)audience"),
+    ({"sub": None}, "sub"),
+    ({"exp": None}, "exp"),
+], ids=["expired", "wrong-issuer", "wrong-audience", "no-sub", "no-exp"])
+def test_bad_claims_are_rejected(overrides, reason):
+    verifier = make_verifier()
+    with pytest.raises(InvalidToken, match=reason):
+        verify(verifier, rs256(**overrides))
+    assert verifier.metrics()["failures"] == 1
+
+
+def test_unsigned_token_is_rejected():
+    token = jwt.encode(claims(), None, algorithm="none")
+    with pytest.raises(InvalidToken, match="Unsupported token algorithm"):
+        verify(make_verifier(jwt_secret=SECRET), token)
+
+
+def test_tampered_signature_is_rejected():
+    header, payload, signature = rs256().split(".")
+    forged = jwt.encode(claims(sub="someone-else"), RSA_KEY, algorithm="RS256", headers={"kid": "rsa"}).split(".")[1]
+    with pytest.raises(InvalidToken):
+        verify(make_verifier(), ".".join([header, forged, signature]))
+
+
+def test_hs256_only_with_the_shared_secret():
+    token = jwt.encode(claims(), SECRET, algorithm="HS256")
+    with pytest.raises(InvalidToken, match="Unsupported token algorithm"):
+        verify(make_verifier(), token)
+    assert verify(make_verifier(jwt_secret=SECRET), token)["sub"] == "user-1"
+    # A token signed with the wrong secret fails
+    with pytest.raises(InvalidToken):
+        verify(make_verifier(jwt_secret=SECRET), jwt.encode(claims(), "another-secret-of-at-least-32-bytes", algorithm="HS256"))
+
+
+def test_unknown_kid_refreshes_at_most_once_per_interval():
+    requests = []
+    verifier = make_verifier(requests, min_refresh_interval=60)
+    token = jwt.encode(claims(), RSA_KEY, algorithm="RS256", headers={"kid": "rotated"})
+    for _ in range(3):
+        with pytest.raises(InvalidToken, match="Unknown signing key"):
+            verify(verifier, token)
+    assert len(requests) == 1
+
+
+def test_revoked_token_is_rejected_even_when_cached():
+    verifier = make_verifier()
+    token = rs256()
+    payload = verify(verifier, token)
+    verifier.revoke(token, payload)
+    with pytest.raises(InvalidToken, match="revoked"):
+        verify(verifier, token)
+    assert verifier.metrics()["cached_tokens"] == 0
+    # Other tokens for the same user are unaffected
+    assert verify(verifier, rs256(iat=int(time.time()) - 1))["sub"] == "user-1"
+
+
+def test_cached_token_is_not_served_after_it_expires():
+    verifier = make_verifier()
+    token = rs256(exp=int(time.time()) + 1)
+    verify(verifier, token)
+    time.sleep(1.5)
+    with pytest.raises(InvalidToken, match="expired"):
+        verify(verifier, token)
+    assert verifier.metrics()["cache_hits"] == 0
+
+
+def test_cache_is_bounded():
+    verifier = make_verifier(cache_size=2)
+    for i in range(3):
+        verify(verifier, rs256(sub=f"user-{i}"))
+    assert verifier.metrics()["cached_tokens"] == 2
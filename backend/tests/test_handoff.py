@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from handoff import HandoffBundleManager, TooManyJobs
+
+
+def make_manager(saved):
+    async def fetch_latest_sbar(patient_id):
+        return None if patient_id == "no-notes" else {"id": f"sbar-{patient_id}"}
+
+    async def has_summary(sbar_id):
+        return sbar_id == "sbar-done"
+
+    async def summarize_note(sbar):
+        return f"summary of {sbar['id']}"
+
+    async def save_summary(patient_id, sbar_id, summary):
+        saved.append((patient_id, sbar_id, summary))
+
+    return HandoffBundleManager(fetch_latest_sbar, has_summary, summarize_note, save_summary)
+
+
+def test_job_summarizes_each_patient_once():
+    saved = []
+
+    async def scenario():
+        manager = make_manager(saved)
+        now = time.time()
+        job = manager.create(["p1", "no-notes", "done", "p1"], now, now, "nurse@example.com")
+        await job.task
+        return job.progress()
+
+    progress = asyncio.run(scenario())
+    assert progress["status"] == "completed"
+    assert progress["counts"] == {"summarized": 1, "no_sbar": 1, "up_to_date": 1}
+    assert saved == [("p1", "sbar-p1", "summary of sbar-p1")]
+
+
+def test_jobs_are_scoped_to_their_creator():
+    async def scenario():
+        manager = make_manager([])
+        now = time.time()
+        mine = manager.create(["p1"], now, now, "a@example.com")
+        theirs = manager.create(["p2"], now, now, "b@example.com")
+        await asyncio.gather(mine.task, theirs.task)
+        return manager, mine, theirs
+
+    manager, mine, theirs = asyncio.run(scenario())
+    assert manager.list("a@example.com") == [mine]
+    assert manager.get(mine.job_id, created_by="a@example.com") is mine
+    assert manager.get(theirs.job_id, created_by="a@example.com") is None
+    assert manager.list() == [theirs, mine]
+
+
+def test_running_jobs_are_never_evicted():
+    async def scenario():
+        manager = make_manager([])
+        manager.max_jobs, manager.max_running_per_user = 2, 1
+        later = time.time() + 3600  # scheduled an hour out, so still running
+        first = manager.create(["p1"], later, later, "a@example.com")
+        with pytest.raises(TooManyJobs):
+            manager.create(["p2"], later, later, "a@example.com")  # per-user limit
+        second = manager.create(["p2"], later, later, "b@example.com")
+        with pytest.raises(TooManyJobs):
+            manager.create(["p3"], later, later, "c@example.com")  # full of running jobs
+        assert not first.task.done() and not second.task.done()
+
+        # A finished job makes room and is the one dropped
+        first.task.cancel()
+        await asyncio.gather(first.task, return_exceptions=True)
+        third = manager.create(["p3"], later, later, "c@example.com")
+        assert manager.list() == [third, second]
+        manager.cancel_all()
+        await asyncio.gather(second.task, third.task, return_exceptions=True)
+
+    asyncio.run(scenario())
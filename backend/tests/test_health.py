@@ -0,0 +1,29 @@
+from health import HealthChecks
+
+
+def test_required_checks_gate_readiness():
+    health = HealthChecks()
+    state = {"model": False}
+    health.add("database", lambda: True)
+    health.add("model", lambda: state["model"])
+    health.add("index", lambda: False, required=False)
+
+    ready, report = health.report()
+    assert not ready and report["status"] == "starting"
+    assert report["checks"]["index"] == {"ready": False, "required": False}
+
+    state["model"] = True
+    ready, report = health.report()
+    assert ready and report["status"] == "ready"
+
+
+def test_failing_check_counts_as_not_ready():
+    health = HealthChecks()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    health.add("broken", broken)
+    ready, report = health.report()
+    assert not ready
+    assert report["checks"]["broken"]["ready"] is False
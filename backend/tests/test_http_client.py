@@ -0,0 +1,166 @@
+import asyncio
+
+import httpx
+import pytest
+
+from http_client import CircuitBreaker, CircuitOpen, HttpClient
+
+URL = "http://upstream.test/models"
+
+
+def make_client(handler, **kwargs):
+    client = HttpClient(backoff_base=0, backoff_max=0, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def open_breaker(client: HttpClient) -> CircuitBreaker:
+    # A breaker whose reset timeout has already passed, so the next request is the half-open trial
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    client._breakers["upstream.test"] = breaker
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_request("upstream.test")
+
+
+def test_only_one_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    trial = breaker.before_request("upstream.test")
+    assert trial is not None
+    with pytest.raises(CircuitOpen):
+        breaker.before_request("upstream.test")
+    breaker.release_trial(trial)
+    assert breaker.before_request("upstream.test") is not None
+
+
+def test_stale_trial_token_does_not_release_a_newer_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    first = breaker.before_request("upstream.test")
+    breaker.record_failure()  # the first trial failed; the circuit reopens and a second trial starts
+    second = breaker.before_request("upstream.test")
+    breaker.release_trial(first)
+    with pytest.raises(CircuitOpen):
+        breaker.before_request("upstream.test")
+    breaker.release_trial(second)
+
+
+def test_retries_connect_errors_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        client = make_client(handler)
+        response = await client.get(URL)
+        await client.aclose()
+        return response
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("error", [httpx.WriteError, httpx.CloseError, httpx.ProxyError])
+def test_half_open_trial_with_other_transport_error_counts_as_failure(error):
+    def handler(request):
+        raise error("boom", request=request)
+
+    async def scenario():
+        client = make_client(handler)
+        breaker = open_breaker(client)
+        failures = breaker.failures
+        with pytest.raises(error):
+            await client.post(URL)
+        await client.aclose()
+        return breaker, failures
+
+    breaker, failures = asyncio.run(scenario())
+    assert breaker.failures == failures + 1
+    assert breaker._trial is None
+
+
+def test_cancelled_half_open_trial_is_released():
+    async def scenario():
+        entered = asyncio.Event()
+
+        async def handler(request):
+            entered.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200)
+
+        client = make_client(handler)
+        breaker = open_breaker(client)
+        task = asyncio.create_task(client.get(URL))
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The trial never reported back, yet the next request may try again instead of getting CircuitOpen
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        response = await client.get(URL)
+        await client.aclose()
+        return breaker, response
+
+    breaker, response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_stream_releases_trial_on_transport_error():
+    def handler(request):
+        raise httpx.WriteError("boom", request=request)
+
+    async def scenario():
+        client = make_client(handler)
+        breaker = open_breaker(client)
+        with pytest.raises(httpx.WriteError):
+            async with client.stream("POST", URL):
+                pass
+        await client.aclose()
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker._trial is None
+
+
+def test_stream_releases_trial_when_cancelled():
+    async def scenario():
+        entered = asyncio.Event()
+
+        async def handler(request):
+            entered.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200)
+
+        client = make_client(handler)
+        breaker = open_breaker(client)
+
+        async def consume():
+            async with client.stream("GET", URL):
+                pass
+
+        task = asyncio.create_task(consume())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.aclose()
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker._trial is None
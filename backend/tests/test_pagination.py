@@ -0,0 +1,98 @@
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, keyset_filter, parse_date, parse_fields, parse_type, split_page
+
+KEYS = ("DATE", "ENCOUNTER", "CODE")
+
+
+def row(date, encounter="e1", code="c1", **extra):
+    return {"DATE": date, "ENCOUNTER": encounter, "CODE": code, **extra}
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(row("2020-01-01", code='8302-2,"x"'), KEYS)
+    assert decode_cursor(cursor, KEYS) == ["2020-01-01", "e1", '8302-2,"x"']
+
+
+@pytest.mark.parametrize("token", ["not base64!", encode_cursor({"a": 1}, ("a",)), "e30"])
+def test_bad_cursor_is_400(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, KEYS)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_filter_descending():
+    assert keyset_filter(("START", "Id"), ["2020-01-01", "a,b"]) == \
+        'START.lt."2020-01-01",and(START.eq."2020-01-01",Id.lt."a,b")'
+
+
+def test_keyset_filter_ascending_includes_trailing_nulls():
+    assert keyset_filter(("START", "Id"), ["2020-01-01", "x"], descending=False) == \
+        'or(START.gt."2020-01-01",START.is.null),and(START.eq."2020-01-01",or(Id.gt."x",Id.is.null))'
+
+
+def test_keyset_filter_null_values_use_is_null():
+    # A NULL code is matched with is.null, never compared with the string "null"
+    assert keyset_filter(KEYS, ["2020-01-01", "e1", None]) == \
+        'DATE.lt."2020-01-01",and(DATE.eq."2020-01-01",ENCOUNTER.lt."e1"),' \
+        'and(DATE.eq."2020-01-01",ENCOUNTER.eq."e1",CODE.not.is.null)'
+    # Ascending, NULLs sort last, so nothing follows a NULL on that key
+    assert keyset_filter(("DATE", "Id"), [None, "x"], descending=False) == \
+        'and(DATE.is.null,or(Id.gt."x",Id.is.null))'
+    assert keyset_filter(("Id",), [None], descending=False) == "and(Id.is.null,Id.not.is.null)"
+
+
+def test_split_page_last_page():
+    rows = [row("2020-01-03"), row("2020-01-02")]
+    assert split_page(rows, KEYS, 2) == (rows, None)
+
+
+def test_split_page_cursor_is_last_row():
+    rows = [row("2020-01-03"), row("2020-01-02"), row("2020-01-01")]
+    page, cursor = split_page(rows, KEYS, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor, KEYS) == ["2020-01-02", "e1", "c1"]
+
+
+def test_split_page_keeps_tied_rows_together():
+    # Two observations with the same date, encounter and code straddle the page boundary
+    rows = [row("2020-01-03"), row("2020-01-02", value=1), row("2020-01-02", value=2)]
+    page, cursor = split_page(rows, KEYS, 2)
+    assert page == rows[:1]
+    assert decode_cursor(cursor, KEYS) == ["2020-01-03", "e1", "c1"]
+
+
+def test_split_page_tie_larger_than_limit_is_rejected():
+    rows = [row("2020-01-02", value=i) for i in range(3)]
+    with pytest.raises(HTTPException) as exc:
+        split_page(rows, KEYS, 2)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("value", ["2020-01-01", "2020-01-01T10:30:00Z", "2020-01-01T10:30:00+02:00"])
+def test_parse_date_accepts_iso(value):
+    assert parse_date(value, "since") == value
+
+
+@pytest.mark.parametrize("value", ["yesterday", "2020-13-01", "01/02/2020", "2020-01-01,x"])
+def test_parse_date_rejects_garbage(value):
+    with pytest.raises(HTTPException) as exc:
+        parse_date(value, "since")
+    assert exc.value.status_code == 400
+
+
+def test_parse_type():
+    assert parse_type("vital-signs") == "vital-signs"
+    assert parse_type(None) is None
+    with pytest.raises(HTTPException):
+        parse_type("a" * 101)
+    with pytest.raises(HTTPException):
+        parse_type("x\ny")
+
+
+def test_parse_fields_adds_keys():
+    assert parse_fields(None) == "*"
+    assert parse_fields("DESCRIPTION", KEYS) == "DESCRIPTION,DATE,ENCOUNTER,CODE"
+    with pytest.raises(HTTPException):
+        parse_fields("DESCRIPTION,count(*)")
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+from patient_index import PatientSearchIndex, fold, name_tokens, trigrams
+
+PATIENTS = [
+    {"Id": "a1", "FIRST": "Annalise683", "LAST": "Glover", "BIRTHDATE": "1950-01-01", "GENDER": "F", "UPDATED": "1"},
+    {"Id": "b2", "FIRST": "Anna", "LAST": "Smith", "BIRTHDATE": "1960-01-01", "GENDER": "F", "UPDATED": "1"},
+    {"Id": "c3", "FIRST": "Bob", "LAST": "Annan", "BIRTHDATE": "1970-01-01", "GENDER": "M", "UPDATED": "1"},
+    {"Id": "d4", "FIRST": "José", "LAST": "Müller", "BIRTHDATE": "1980-01-01", "GENDER": "M", "UPDATED": "1"},
+]
+
+
+class FakeRepository:
+    """The two Repository calls the index makes, over an in-memory patients table."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def list_patients(self, select, limit, cursor=None, offset=0):
+        return self.rows[:limit], None
+
+    async def iter_pages(self, spec, select, since=None, page_size=500, **kwargs):
+        columns = select.split(",")
+        for column in columns:
+            if self.rows and column not in self.rows[0]:
+                raise RuntimeError(f"column patients.{column} does not exist")
+        rows = [r for r in self.rows if since is None or r[spec.date_column] >= since]
+        for start in range(0, len(rows), page_size):
+            yield [{c: r.get(c) for c in columns} for r in rows[start:start + page_size]]
+
+
+def loaded_index(rows=PATIENTS, **kwargs):
+    kwargs.setdefault("list_columns", ["Id", "FIRST", "LAST", "BIRTHDATE", "GENDER"])
+    index = PatientSearchIndex(FakeRepository(rows), page_size=2, **kwargs)
+    asyncio.run(index.refresh(full=True))
+    return index
+
+
+def ids(results):
+    return [row["Id"] for row in results]
+
+
+def test_text_helpers():
+    assert fold("  José ") == "jose"
+    assert name_tokens("Annalise683 O'Neil") == ["annalise", "o", "neil"]
+    assert "ann" in trigrams("anna")
+
+
+def test_exact_id_wins():
+    assert ids(loaded_index().search("c3")) == ["c3"]
+
+
+def test_prefix_match_on_every_word():
+    index = loaded_index()
+    assert ids(index.search("ann gl")) == ["a1"]
+    # Whole-word matches rank first, then by last name
+    assert ids(index.search("anna")) == ["b2", "c3", "a1"]
+    assert ids(index.search("mull")) == ["d4"]
+
+
+def test_misspelling_falls_back_to_trigrams():
+    assert "a1" in ids(loaded_index().search("glovr"))
+
+
+def test_results_only_carry_list_columns():
+    result = loaded_index().search("bob")[0]
+    assert set(result) == {"Id", "FIRST", "LAST", "BIRTHDATE", "GENDER"}
+
+
+def test_missing_columns_are_dropped_with_a_clear_error(caplog):
+    # Synthea has no PREFIX / MIDDLE / SUFFIX; the index still loads instead of failing every refresh
+    with caplog.at_level(logging.ERROR):
+        index = loaded_index(list_columns=["Id", "PREFIX", "FIRST", "MIDDLE", "LAST", "SUFFIX"],
+                             name_columns=["FIRST", "MIDDLE", "LAST"], updated_column="MODIFIED")
+    assert index.ready
+    assert index.list_columns == ["Id", "FIRST", "LAST"]
+    assert index.name_columns == ["FIRST", "LAST"]
+    assert index.updated_column is None
+    assert "PREFIX" in caplog.text and "PATIENT_LIST_COLUMNS" in caplog.text
+    assert ids(index.search("glover")) == ["a1"]
+
+
+def test_delta_refresh_patches_changed_rows():
+    rows = [dict(r) for r in PATIENTS]
+    index = loaded_index(rows, updated_column="UPDATED")
+    rows[1] = {**rows[1], "LAST": "Jones", "UPDATED": "2"}
+
+    asyncio.run(index.refresh())
+    assert index.metrics()["delta_refreshes"] == 1
+    assert ids(index.search("jones")) == ["b2"]
+    assert ids(index.search("smith")) == []
+
+
+def test_not_ready_until_loaded():
+    index = PatientSearchIndex(FakeRepository(PATIENTS), list_columns=["Id"])
+    assert not index.ready
+    assert index.search("anna") == []
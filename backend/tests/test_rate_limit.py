@@ -0,0 +1,50 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_wait(clock):
+    limiter = RateLimiter({"inference": (1.0, 3)})
+    assert [limiter.acquire("inference", "a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("inference", "a") == pytest.approx(1.0)
+    clock[0] += 1.0
+    assert limiter.acquire("inference", "a") == 0.0
+
+
+def test_users_and_budgets_are_independent(clock):
+    limiter = RateLimiter({"inference": (1.0, 1), "read": (1.0, 1)})
+    assert limiter.acquire("inference", "a") == 0.0
+    assert limiter.acquire("inference", "a") > 0
+    assert limiter.acquire("inference", "b") == 0.0
+    assert limiter.acquire("read", "a") == 0.0
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = RateLimiter({"read": (10.0, 2)})
+    limiter.acquire("read", "a")
+    clock[0] += 3600
+    assert [limiter.acquire("read", "a") for _ in range(3)][-1] > 0
+
+
+def test_zero_rate_disables_budget(clock):
+    limiter = RateLimiter({"inference": (0.0, 1)})
+    assert all(limiter.acquire("inference", "a") == 0.0 for _ in range(100))
+
+
+def test_idle_buckets_are_dropped_past_max_keys(clock):
+    limiter = RateLimiter({"read": (1.0, 1)}, max_keys=2)
+    for user in ["a", "b", "c"]:
+        limiter.acquire("read", user)
+    metrics = limiter.metrics()["read"]
+    assert metrics["tracked_users"] == 2
+    assert metrics["allowed"] == 3 and metrics["limited"] == 0
+    # "a" was dropped, so it starts again with a full bucket
+    assert limiter.acquire("read", "a") == 0.0
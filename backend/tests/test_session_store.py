@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from session_store import MemorySessionStore, SessionLimitReached, SessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(idle_ttl=60, finished_ttl=60)
+    return SQLiteSessionStore(path=str(tmp_path / "sessions.db"), idle_ttl=60, finished_ttl=60)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_session_lifecycle(store):
+    store.create("s1", "client", owner="nurse@example.com")
+    session = store.get("s1")
+    assert session["owner"] == "nurse@example.com"
+    assert session["is_recording"] and not session["finished"]
+
+    store.append("s1", ["hello", "world"], "partial")
+    assert store.get("s1")["transcription"] == ["hello", "world"]
+    assert store.get("s1")["partial"] == "partial"
+
+    assert store.stop("s1")
+    assert not store.is_recording("s1")
+    store.finish("s1")
+    assert store.get("s1")["finished"]
+
+
+def test_unknown_session(store):
+    assert store.get("missing") is None
+    assert not store.is_recording("missing")
+    assert not store.stop("missing")
+    assert store.pop_audio("missing") == []
+
+
+def test_audio_handoff(store):
+    store.create("s1", "client")
+    store.push_audio("s1", np.arange(4, dtype=np.float32))
+    store.push_audio("s1", np.arange(2, dtype=np.float32))
+    audio = store.pop_audio("s1")
+    assert [len(a) for a in audio] == [4, 2]
+    assert store.pop_audio("s1") == []
+
+
+def test_reap_stops_idle_then_deletes(store, monkeypatch):
+    import session_store
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store.create("s1", "client")
+    now[0] += 61
+    assert store.reap() == []
+    assert not store.is_recording("s1")
+    now[0] += 61
+    assert store.reap() == ["s1"]
+    assert store.get("s1") is None
+
+
+def test_memory_eviction_skips_recording_sessions():
+    store = MemorySessionStore(max_sessions=2)
+    store.create("recording", "client")
+    store.create("stopped", "client")
+    store.stop("stopped")
+    store.create("new", "client")
+    # The stopped session made room; the older one still recording was kept
+    assert store.get("recording") is not None
+    assert store.get("stopped") is None
+    assert store.get("new") is not None
+
+
+def test_memory_create_rejected_when_all_recording():
+    store = MemorySessionStore(max_sessions=2)
+    store.create("a", "client")
+    store.create("b", "client")
+    with pytest.raises(SessionLimitReached):
+        store.create("c", "client")
+    assert store.is_recording("a") and store.is_recording("b")
+    assert store.get("c") is None
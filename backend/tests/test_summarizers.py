@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from summarizers import GENERATION_PARAMS, HuggingFaceRemoteSummarizer, LocalSummarizer
+
+
+class FlakyLocalSummarizer(LocalSummarizer):
+    # Stands in for the model: the first load fails, later ones succeed, and "generation" upper-cases the prompt
+    def __init__(self, failures=1):
+        super().__init__(max_wait_ms=1)
+        self.failures = failures
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        if self.loads <= self.failures:
+            raise OSError("model weights not found")
+        self._ready = True
+
+    def generate_batch(self, prompts, streamer=None):
+        return [prompt.upper() for prompt in prompts]
+
+
+def test_failed_load_is_reported_and_retried():
+    summarizer = FlakyLocalSummarizer(failures=1)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as exc:
+            await summarizer.summarize("first")
+        assert exc.value.status_code == 503
+        assert not summarizer.ready
+        # The failed attempt was dropped, so this call loads again and succeeds
+        assert await summarizer.summarize("second") == "SECOND"
+        assert summarizer.ready
+        summarizer.stop()
+
+    asyncio.run(scenario())
+    assert summarizer.loads == 2
+
+
+def test_failed_preload_is_retried_by_first_request():
+    summarizer = FlakyLocalSummarizer(failures=1)
+    summarizer.start()
+    summarizer._loading.exception(timeout=5)  # the startup load has failed
+    assert not summarizer.ready
+
+    async def scenario():
+        assert await summarizer.summarize("note") == "NOTE"
+        summarizer.stop()
+
+    asyncio.run(scenario())
+    assert summarizer.loads == 2
+
+
+def test_concurrent_callers_share_one_load():
+    summarizer = FlakyLocalSummarizer(failures=0)
+
+    async def scenario():
+        results = await asyncio.gather(*(summarizer.summarize(f"n{i}") for i in range(5)))
+        summarizer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [f"N{i}" for i in range(5)]
+    assert summarizer.loads == 1
+
+
+def test_cache_key_params_are_what_each_backend_uses():
+    # The local backend decodes greedily, so the remote temperature must not end up in its cache key
+    assert LocalSummarizer().generation_params == {"max_new_tokens": GENERATION_PARAMS["max_new_tokens"], "do_sample": False}
+    assert HuggingFaceRemoteSummarizer("token", None).generation_params == GENERATION_PARAMS
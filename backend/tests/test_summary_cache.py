@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import pytest
+
+from summary_cache import SQLiteSummaryStore, SummaryCache, normalize_text, summary_cache_key
+
+FIELDS = {"situation": "s", "background": "b", "assessment": "a", "recommendation": "r"}
+
+
+def test_key_ignores_case_and_whitespace():
+    a = summary_cache_key({"situation": "Chest  pain"}, "m", {})
+    b = summary_cache_key({"situation": " chest pain "}, "m", {})
+    assert a == b
+    assert a != summary_cache_key({"situation": "chest pain"}, "other-model", {})
+    assert normalize_text(None) == ""
+
+
+def test_memory_hit_after_compute():
+    cache = SummaryCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "summary"
+
+    async def scenario():
+        assert await cache.get_or_compute("k", FIELDS, compute) == ("summary", "model")
+        assert await cache.get_or_compute("k", FIELDS, compute) == ("summary", "memory")
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_share_one_compute():
+    cache = SummaryCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "summary"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", FIELDS, compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["coalesced"] * 4 + ["model"]
+    assert cache.metrics()["in_flight"] == 0
+
+
+def test_compute_error_reaches_waiters():
+    cache = SummaryCache()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        raise ValueError("model failed")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", FIELDS, compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    cache = SummaryCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "summary"
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute("k", FIELDS, compute))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_compute("k", FIELDS, compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The waiters never see the leader's cancellation: one of them computes, the rest join it
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(scenario())
+    assert [summary for summary, _ in results] == ["summary"] * 3
+    assert len(calls) == 2
+    assert cache.metrics()["in_flight"] == 0
+
+
+def test_closed_stream_hands_over_to_a_waiter():
+    cache = SummaryCache()
+
+    async def generate():
+        for piece in ["one ", "two"]:
+            await asyncio.sleep(0.02)
+            yield piece
+
+    async def scenario():
+        leader = cache.stream("k", FIELDS, generate)
+        assert await leader.__anext__() == ("one ", "model")
+        waiter = asyncio.create_task(cache.get_or_compute("k", FIELDS, lambda: asyncio.sleep(0, result="computed")))
+        await asyncio.sleep(0.01)
+        await leader.aclose()  # the client disconnected mid-stream
+        return await waiter
+
+    assert asyncio.run(scenario()) == ("computed", "model")
+
+
+def test_stream_caches_the_whole_summary():
+    cache = SummaryCache()
+
+    async def generate():
+        yield "one "
+        yield "two "
+
+    async def scenario():
+        pieces = [piece async for piece in cache.stream("k", FIELDS, generate)]
+        assert pieces == [("one ", "model"), ("two ", "model")]
+        return [piece async for piece in cache.stream("k", FIELDS, generate)]
+
+    assert asyncio.run(scenario()) == [("one two", "memory")]
+
+
+def test_persistent_store_tier(tmp_path):
+    store = SQLiteSummaryStore(path=str(tmp_path / "cache.db"), max_rows=2)
+
+    async def scenario():
+        first = SummaryCache(store=store)
+        await first.get_or_compute("k", FIELDS, lambda: asyncio.sleep(0, result="stored"))
+        # A fresh process (empty memory tier) finds it in the store
+        second = SummaryCache(store=store)
+        return await second.get_or_compute("k", FIELDS, lambda: asyncio.sleep(0, result="recomputed"))
+
+    assert asyncio.run(scenario()) == ("stored", "store")
+    for key in ["a", "b", "c"]:
+        time.sleep(0.01)  # distinct created_at values
+        store.put(key, key)
+    assert store.get("k") is None  # beyond max_rows, oldest first
+    assert store.get("c") == "c"
+
+
+def test_reused_ai_summary_is_not_cached_under_the_model_key(tmp_path):
+    store = SQLiteSummaryStore(path=str(tmp_path / "cache.db"))
+
+    class SavedSummaries:
+        # A saved row for the same note, written by an unknown model or typed by a user
+        async def get(self, fields):
+            return "saved elsewhere"
+
+    async def scenario():
+        cache = SummaryCache(store=store, ai_summaries=SavedSummaries())
+        first = await cache.get_or_compute("k", FIELDS, lambda: asyncio.sleep(0, result="model"))
+        second = [piece async for piece in cache.stream("k", FIELDS, lambda: None)]
+        return first, second, cache
+
+    first, second, cache = asyncio.run(scenario())
+    assert first == ("saved elsewhere", "ai_summaries")
+    assert second == [("saved elsewhere", "ai_summaries")]
+    assert cache.metrics()["memory_entries"] == 0
+    assert store.get("k") is None
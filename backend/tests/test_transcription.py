@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from transcription import AudioRingBuffer, StreamingTranscriber
+
+RATE = 100  # small sample rate keeps the arrays tiny
+
+
+def word_audio(*words):
+    # One second per word; the word number is encoded in the sample value
+    return np.concatenate([np.full(RATE, w / 1000, dtype=np.float32) for w in words])
+
+
+def fake_transcribe(calls=None):
+    # A "model" that reads the words back, one segment per full second of audio
+    def transcribe(audio, prompt):
+        if calls is not None:
+            calls.append((len(audio), prompt))
+        segments = []
+        for i in range(len(audio) // RATE):
+            value = int(round(float(audio[i * RATE]) * 1000))
+            segments.append({"start": float(i), "end": float(i + 1), "text": f" w{value}" if value else " "})
+        return segments
+    return transcribe
+
+
+def test_ring_buffer_wraps_and_clips_overwritten_samples():
+    buffer = AudioRingBuffer(capacity_seconds=1, sample_rate=10)
+    buffer.write(np.arange(7, dtype=np.float32))
+    buffer.write(np.arange(7, 14, dtype=np.float32))
+    assert buffer.written == 14 and buffer.oldest == 4
+    assert buffer.read(0, 14).tolist() == list(range(4, 14))
+    assert buffer.read(8, 12).tolist() == [8, 9, 10, 11]
+    assert len(buffer.read(14, 20)) == 0
+
+
+def test_ring_buffer_keeps_tail_of_oversized_write():
+    buffer = AudioRingBuffer(capacity_seconds=1, sample_rate=4)
+    buffer.write(np.arange(10, dtype=np.float32))
+    assert buffer.written == 4
+    assert buffer.read(0, 4).tolist() == [6, 7, 8, 9]
+
+
+def test_pcm16_is_scaled_to_float():
+    buffer = AudioRingBuffer(capacity_seconds=1, sample_rate=4)
+    buffer.write_pcm16(np.array([0, 16384, -32768], dtype=np.int16).tobytes())
+    assert buffer.read(0, 3).tolist() == [0.0, 0.5, -1.0]
+
+
+def test_trailing_segment_stays_partial_until_final():
+    buffer = AudioRingBuffer(capacity_seconds=30, sample_rate=RATE)
+    calls = []
+    transcriber = StreamingTranscriber(fake_transcribe(calls), buffer, step_seconds=1, commit_margin_seconds=1)
+    buffer.write(word_audio(1, 2, 3))
+    new, partial = transcriber.step()
+    assert new == ["w1", "w2"] and partial == "w3"
+
+    buffer.write(word_audio(4))
+    new, partial = transcriber.step()
+    # The open word is transcribed again with the new audio, never duplicated
+    assert new == ["w3"] and partial == "w4"
+    assert calls[-1] == (2 * RATE, "w1 w2")
+
+    new, partial = transcriber.step(final=True)
+    assert new == ["w4"] and partial == ""
+    assert transcriber.committed == ["w1", "w2", "w3", "w4"]
+
+
+def test_final_step_at_boundary_leaves_later_audio():
+    buffer = AudioRingBuffer(capacity_seconds=30, sample_rate=RATE)
+    transcriber = StreamingTranscriber(fake_transcribe(), buffer, step_seconds=1)
+    buffer.write(word_audio(1, 2, 3))
+    assert transcriber.step(final=True, end=2 * RATE) == (["w1", "w2"], "")
+    assert transcriber.step(final=True) == (["w3"], "")
+
+
+def test_silent_full_window_is_dropped():
+    buffer = AudioRingBuffer(capacity_seconds=30, sample_rate=RATE)
+    transcriber = StreamingTranscriber(fake_transcribe(), buffer, step_seconds=1, max_window_seconds=3)
+    buffer.write(np.zeros(4 * RATE, dtype=np.float32))
+    assert transcriber.step() == ([], "")
+    assert transcriber._window_start == 3 * RATE
+    assert not transcriber.ready()
+
+
+def test_failed_step_keeps_the_window():
+    buffer = AudioRingBuffer(capacity_seconds=30, sample_rate=RATE)
+    working = fake_transcribe()
+    failing = [True]
+
+    def transcribe(audio, prompt):
+        if failing[0]:
+            raise RuntimeError("worker died")
+        return working(audio, prompt)
+
+    transcriber = StreamingTranscriber(transcribe, buffer, step_seconds=1)
+    buffer.write(word_audio(1, 2, 3))
+    with pytest.raises(RuntimeError):
+        transcriber.step(final=True, end=2 * RATE)
+    # Nothing was committed or skipped, and the step is still due
+    assert transcriber.ready()
+    failing[0] = False
+    assert transcriber.step(final=True, end=2 * RATE) == (["w1", "w2"], "")
+    assert transcriber.step(final=True) == (["w3"], "")
@@ -0,0 +1,122 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from transcription_pool import (TranscriptionQueueFull, TranscriptionScheduler, TranscriptionTimeout, TranscriptionWorkerDied,
+                                sessions_per_worker)
+
+CRASH, SLOW = -1.0, -2.0
+
+
+def fake_worker(worker, backend, model_name, task, threads, compute_type, warmup, jobs, results):
+    # Model-free stand-in for _worker_main: echoes the prompt, or crashes / stalls on marker audio
+    results.put((worker, "ready", None, None, 0.0))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, audio, prompt = job
+        if audio[0] == CRASH:
+            os._exit(1)
+        if audio[0] == SLOW:
+            time.sleep(1.5)
+        results.put((worker, job_id, [{"start": 0.0, "end": 1.0, "text": prompt}], None, 0.01))
+
+
+def audio(marker=0.0):
+    return np.full(160, marker, dtype=np.float32)
+
+
+def wait_until(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        s = TranscriptionScheduler(num_workers=1, worker_target=fake_worker, restart_backoff=0.1, **kwargs)
+        s.start()
+        assert wait_until(lambda: s.ready)
+        schedulers.append(s)
+        return s
+
+    yield make
+    for s in schedulers:
+        s.stop()
+
+
+def test_jobs_round_trip(scheduler):
+    s = scheduler()
+    assert s.submit("a", audio(), "hello").result(timeout=10) == [{"start": 0.0, "end": 1.0, "text": "hello"}]
+    assert s.metrics()["completed"] == 1
+
+
+def test_dead_worker_fails_its_job_and_is_replaced(scheduler):
+    s = scheduler()
+    with pytest.raises(TranscriptionWorkerDied):
+        s.submit("a", audio(CRASH)).result(timeout=10)
+    assert wait_until(lambda: s.ready)
+    assert s.submit("a", audio(), "again").result(timeout=10)[0]["text"] == "again"
+    metrics = s.metrics()
+    assert metrics["worker_restarts"] == 1
+    assert metrics["in_flight"] == 0 and metrics["failed"] == 1
+
+
+def test_transcribe_fn_raises_when_the_worker_died(scheduler):
+    s = scheduler()
+    transcribe = s.transcribe_fn("a")
+    with pytest.raises(TranscriptionWorkerDied):
+        transcribe(audio(CRASH), "")
+    assert s.metrics()["timed_out"] == 0
+    assert wait_until(lambda: s.ready)
+    assert transcribe(audio(), "ok")[0]["text"] == "ok"
+
+
+def test_transcribe_fn_raises_on_a_timed_out_chunk(scheduler):
+    s = scheduler(job_timeout=0.5)
+    transcribe = s.transcribe_fn("a")
+    with pytest.raises(TranscriptionTimeout):
+        transcribe(audio(SLOW), "")
+    assert s.metrics()["timed_out"] == 1
+    # The slow job still finishes on its worker; the next chunk is served once it is free
+    assert wait_until(lambda: s.metrics()["in_flight"] == 0)
+    assert transcribe(audio(), "ok")[0]["text"] == "ok"
+
+
+def test_queue_is_bounded_and_fair():
+    s = TranscriptionScheduler(num_workers=1, max_queue=3)
+    for session, n in (("a", 1), ("a", 2), ("b", 3)):
+        s.submit(session, audio(), str(n))
+    with pytest.raises(TranscriptionQueueFull):
+        s.submit("c", audio())
+    # Round robin across sessions, one job at a time
+    assert [s._next_job()[2] for _ in range(3)] == ["1", "3", "2"]
+    assert s._next_job() is None
+
+
+def test_timed_out_job_is_dropped_from_the_queue(scheduler):
+    s = scheduler(job_timeout=0.5)
+    busy = s.submit("a", audio(SLOW))
+    with pytest.raises(TranscriptionTimeout):
+        s.transcribe_fn("b")(audio(), "queued")
+    assert s.metrics()["queue_depth"] == 0
+    busy.result(timeout=10)
+    assert s.metrics()["completed"] == 1
+
+
+def test_sessions_per_worker_follows_measured_rtf():
+    # Slow fp32 whisper: a 6 s window takes 3 s, twice the 1.5 s step, yet each worker still admits one session
+    assert sessions_per_worker(1.5, 6, 0.5) == 1
+    # int8 faster-whisper at RTF 0.05 keeps up with five
+    assert sessions_per_worker(1.5, 6, 0.05) == 5
+    with pytest.raises(ValueError):
+        sessions_per_worker(1.5, 6, 0)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from transcription import AudioRingBuffer
+from vad import VoiceGate
+
+RATE = 16000
+
+
+def silence(seconds, level=1e-4):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(RATE * seconds)) * level).astype(np.float32)
+
+
+def speech(seconds, amplitude=0.3):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def make_gate(**kwargs):
+    buffer = AudioRingBuffer(capacity_seconds=30, sample_rate=RATE)
+    return VoiceGate(buffer, **kwargs), buffer
+
+
+def test_silence_is_dropped():
+    gate, buffer = make_gate()
+    gate.write(silence(2.0))
+    assert buffer.written == 0
+    assert gate.metrics()["skipped_fraction"] == 1.0
+    assert gate.pop_boundary() is None
+
+
+def test_speech_is_kept_with_preroll_and_boundary():
+    gate, buffer = make_gate()
+    gate.write(silence(1.0))
+    gate.write(speech(1.0))
+    gate.write(silence(1.0))
+    metrics = gate.metrics()
+    assert metrics["utterances"] == 1
+    # The speech, plus the pre-roll before it and the hangover after it, but not the rest of the silence
+    assert RATE * 1.0 < buffer.written < RATE * 2.0
+    assert 0.3 < metrics["skipped_fraction"] < 0.7
+    assert gate.pop_boundary() == buffer.written
+    assert gate.pop_boundary() is None
+    # A boundary whose step failed goes back, unless a newer one has arrived
+    gate.push_boundary(5)
+    assert gate.pop_boundary() == 5
+
+
+def test_odd_sized_writes_match_one_big_write():
+    audio = np.concatenate([silence(0.5), speech(0.7), silence(1.0)])
+    whole, whole_buffer = make_gate()
+    whole.write(audio)
+    pieces, pieces_buffer = make_gate()
+    for start in range(0, len(audio), 1234):
+        pieces.write(audio[start:start + 1234])
+    assert pieces_buffer.written == whole_buffer.written
+    assert pieces.utterances == whole.utterances == 1
+
+
+def test_short_click_does_not_start_speech():
+    gate, buffer = make_gate()
+    gate.write(silence(0.5))
+    gate.write(speech(0.03))  # one frame, below start_ms
+    gate.write(silence(0.5))
+    assert buffer.written == 0
+
+
+def test_flush_keeps_word_being_confirmed():
+    gate, buffer = make_gate(start_ms=300)
+    gate.write(silence(0.5))
+    gate.write(speech(0.12))  # voiced, but not yet long enough to count as speech
+    assert buffer.written == 0
+    gate.flush()
+    assert buffer.written > 0
+
+
+def test_disabled_gate_passes_everything():
+    gate, buffer = make_gate(enabled=False)
+    gate.write(silence(1.0))
+    assert buffer.written == RATE
+    assert gate.metrics()["skipped_fraction"] == 0.0
+
+
+def test_pcm16_input():
+    gate, buffer = make_gate(enabled=False)
+    gate.write_pcm16((speech(0.1) * 32767).astype("<i2").tobytes())
+    assert buffer.written == int(RATE * 0.1)
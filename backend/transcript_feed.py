@@ -0,0 +1,35 @@
+import asyncio
+import threading
+from typing import Dict, Set, Tuple
+
+
+class TranscriptFeed:
+    """Wakes async subscribers (SSE / WebSocket handlers) when a worker thread updates a session's transcript."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id: str) -> asyncio.Event:
+        # Must be called from the event loop that will wait on the returned event
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, session_id: str, event: asyncio.Event):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is event})
+            if not subscribers:
+                del self._subscribers[session_id]
+
+    def notify(self, session_id: str):
+        # Safe to call from any thread
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for loop, event in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
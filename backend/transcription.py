@@ -0,0 +1,205 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono
+
+# transcribe(audio, prompt) -> list of whisper segments ({"start", "end", "text"}, times in seconds)
+TranscribeFn = Callable[[np.ndarray, str], List[dict]]
+
+
+class AudioRingBuffer:
+    """Fixed-size float32 ring buffer of mono PCM addressed by absolute sample index."""
+
+    def __init__(self, capacity_seconds: float = 60.0, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.capacity = int(capacity_seconds * sample_rate)
+        self._buffer = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0  # total samples ever written
+        self._lock = threading.Lock()
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        # Absolute index of the oldest sample still held
+        return max(0, self._written - self.capacity)
+
+    def write_pcm16(self, data: bytes):
+        # Raw 16-bit little endian PCM (what pyaudio.paInt16 produces) -> float32 in [-1, 1]
+        self.write(np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0)
+
+    def write(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        with self._lock:
+            start = self._written % self.capacity
+            end = start + len(samples)
+            if end <= self.capacity:
+                self._buffer[start:end] = samples
+            else:
+                split = self.capacity - start
+                self._buffer[start:] = samples[:split]
+                self._buffer[:end - self.capacity] = samples[split:]
+            self._written += len(samples)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        # Copy out samples [start, end); anything already overwritten is clipped off the front
+        with self._lock:
+            start = max(start, self.oldest)
+            end = min(end, self._written)
+            if end <= start:
+                return np.zeros(0, dtype=np.float32)
+            a = start % self.capacity
+            b = a + (end - start)
+            if b <= self.capacity:
+                return self._buffer[a:b].copy()
+            return np.concatenate((self._buffer[a:], self._buffer[:b - self.capacity]))
+
+
+class StreamingTranscriber:
+    """
+    Incrementally transcribes a growing audio stream.
+
+    Every step the audio from the last committed point up to "now" is transcribed as one window.
+    Segments that finished well before the end of the window are committed and the window start
+    moves past them; the trailing segment is only reported as partial text, because its words may
+    still be cut off. It gets transcribed again next step together with the new audio. This overlap
+    stops words at chunk boundaries from being dropped or duplicated. Committed text is passed back
+    as the prompt so the model keeps context across windows.
+    """
+
+    def __init__(
+        self,
+        transcribe: TranscribeFn,
+        buffer: AudioRingBuffer,
+        step_seconds: float = 1.5,
+        max_window_seconds: float = 20.0,
+        commit_margin_seconds: float = 1.0,
+        prompt_chars: int = 200,
+    ):
+        self.transcribe = transcribe
+        self.buffer = buffer
+        self.sample_rate = buffer.sample_rate
+        self.step_samples = int(step_seconds * self.sample_rate)
+        self.max_window_samples = int(max_window_seconds * self.sample_rate)
+        self.commit_margin = commit_margin_seconds
+        self.prompt_chars = prompt_chars
+        self.committed: List[str] = []
+        self.partial = ""
+        self._window_start = 0  # absolute sample index of the first uncommitted sample
+        self._last_end = 0  # buffer position at the previous step
+
+    def ready(self) -> bool:
+        return self.buffer.written - self._last_end >= self.step_samples
+
+    def prompt(self) -> str:
+        return " ".join(self.committed)[-self.prompt_chars:]
+
+    def step(self, final: bool = False, end: Optional[int] = None) -> Tuple[List[str], str]:
+        # Returns (newly committed segments, current partial text). With final and an end index (the end of
+        # an utterance) everything up to that point is committed and later audio is left for the next step.
+        # If transcribe raises, nothing moves: the same window is read again on the next attempt.
+        end = self.buffer.written if end is None else min(end, self.buffer.written)
+        self._window_start = max(self._window_start, self.buffer.oldest)
+        audio = self.buffer.read(self._window_start, end)
+        if len(audio) == 0:
+            self._last_end = end
+            return [], self.partial
+
+        segments = [s for s in self.transcribe(audio, self.prompt()) if s["text"].strip()]
+        self._last_end = end
+        window_seconds = len(audio) / self.sample_rate
+
+        if final:
+            commit = segments
+            keep = []
+        else:
+            # Keep the trailing segment(s) open unless the window is getting too long to re-transcribe
+            cutoff = window_seconds - self.commit_margin
+            commit = [s for s in segments[:-1] if s["end"] <= cutoff]
+            if not commit and len(audio) >= self.max_window_samples:
+                commit = segments[:-1] if len(segments) > 1 else segments
+            keep = segments[len(commit):]
+
+        new_text = [s["text"].strip() for s in commit]
+        self.committed.extend(new_text)
+        if commit:
+            self._window_start += int(commit[-1]["end"] * self.sample_rate)
+        elif not final and len(audio) >= self.max_window_samples and not segments:
+            # Nothing but silence in a full window; drop it so it isn't re-transcribed forever
+            self._window_start = end - self.step_samples
+        if final:
+            self._window_start = end
+
+        self.partial = " ".join(s["text"].strip() for s in keep)
+        return new_text, self.partial
+
+
+def whisper_transcribe_fn(model, task: str = "translate") -> TranscribeFn:
+    # Adapts an openai-whisper model to the TranscribeFn signature; audio is passed in memory
+    import whisper
+
+    def transcribe(audio: np.ndarray, prompt: str) -> List[dict]:
+        result = whisper.transcribe(
+            model,
+            audio,
+            task=task,
+            fp16=False,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False,
+        )
+        return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+    return transcribe
+
+
+def faster_whisper_transcribe_fn(model, task: str = "translate", beam_size: int = 1) -> TranscribeFn:
+    # Same adapter for a faster-whisper (CTranslate2) model; greedy by default, like whisper.transcribe
+    def transcribe(audio: np.ndarray, prompt: str) -> List[dict]:
+        segments, _ = model.transcribe(
+            audio,
+            task=task,
+            beam_size=beam_size,
+            initial_prompt=prompt or None,
+            condition_on_previous_text=False,
+        )
+        # segments is a generator; decoding happens while it is consumed
+        return [{"start": s.start, "end": s.end, "text": s.text} for s in segments]
+
+    return transcribe
+
+
+TRANSCRIBE_BACKENDS = ("whisper", "faster-whisper")
+
+
+def load_transcribe_fn(
+    backend: str = "whisper",
+    model_name: str = "base",
+    task: str = "translate",
+    threads: int = 1,
+    compute_type: str = "int8",
+) -> TranscribeFn:
+    """
+    Loads a model in the calling process and returns its TranscribeFn.
+
+    whisper is openai-whisper in fp32 on torch. faster-whisper runs the same checkpoints converted to
+    CTranslate2, where compute_type="int8" quantizes the weights; it is usually several times faster on
+    CPU for the same model size. Both are optional imports, only needed for the backend in use.
+    """
+    if backend == "whisper":
+        import torch
+        import whisper
+
+        torch.set_num_threads(threads)
+        return whisper_transcribe_fn(whisper.load_model(model_name), task=task)
+    if backend == "faster-whisper":
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads, num_workers=1)
+        return faster_whisper_transcribe_fn(model, task=task)
+    raise ValueError(f"Unknown transcription backend: {backend}")
@@ -0,0 +1,375 @@
+import itertools
+import logging
+import multiprocessing as mp
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from telemetry import observe_stage
+from transcription import TRANSCRIBE_BACKENDS, TranscribeFn
+
+
+class TranscriptionQueueFull(Exception):
+    """Raised when the job queue is at capacity; callers should back off and retry."""
+
+
+class TranscriptionWorkerDied(RuntimeError):
+    """Raised for a job whose worker process exited while running it."""
+
+
+class TranscriptionTimeout(RuntimeError):
+    """Raised by transcribe_fn for a job that didn't finish within job_timeout (queue wait included)."""
+
+
+def sessions_per_worker(step_seconds: float, window_seconds: float, rtf: float) -> int:
+    # A live session sends one pass every step_seconds over its uncommitted window; on one worker that pass
+    # takes window_seconds * rtf. This is how many sessions a worker keeps up with, and never less than one.
+    if rtf <= 0 or window_seconds <= 0:
+        raise ValueError("rtf and window_seconds must be positive")
+    return max(1, int(round(step_seconds / (window_seconds * rtf), 6)))  # round() so 4.9999999 counts as 5
+
+
+def _worker_main(worker: tuple, backend: str, model_name: str, task: str, threads: int, compute_type: str, warmup: bool, jobs, results):
+    # Runs in its own process with its own model copy; inference threads are capped per worker.
+    # worker is (slot, generation) and tags every result, so the scheduler can ignore a replaced process.
+    from transcription import SAMPLE_RATE, load_transcribe_fn
+
+    started = time.perf_counter()
+    transcribe = load_transcribe_fn(backend, model_name, task=task, threads=threads, compute_type=compute_type)
+    if warmup:
+        # One pass over a second of silence pays torch's first-call allocation before a nurse's audio does
+        transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), "")
+    results.put((worker, "ready", None, None, time.perf_counter() - started))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, audio, prompt = job
+        started = time.perf_counter()
+        try:
+            results.put((worker, job_id, transcribe(audio, prompt), None, time.perf_counter() - started))
+        except Exception as e:
+            results.put((worker, job_id, None, repr(e), time.perf_counter() - started))
+
+
+class TranscriptionScheduler:
+    """
+    Pool of whisper worker processes fed from a bounded, per-session fair queue.
+
+    Jobs wait in one queue per session and are handed out round-robin across sessions, one at a time,
+    only when a worker is free. One busy dictation can't starve the others, and the total backlog is
+    capped at max_queue (submit raises TranscriptionQueueFull beyond that).
+
+    Each worker has its own job queue, so the scheduler knows which job a worker holds. A worker that
+    exits (OOM kill, native crash) fails that job with TranscriptionWorkerDied and is respawned, with
+    backoff if it keeps dying while loading.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        backend: str = "whisper",
+        model_name: str = "base",
+        task: str = "translate",
+        threads_per_worker: int = 1,
+        max_queue: int = 32,
+        job_timeout: float = 120.0,
+        warmup: bool = True,
+        compute_type: str = "int8",
+        worker_target: Optional[Callable] = None,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 60.0,
+    ):
+        # Fail at startup on a typo rather than in every worker process
+        if backend not in TRANSCRIBE_BACKENDS:
+            raise ValueError(f"Unknown transcription backend: {backend}")
+        self.num_workers = num_workers
+        self.backend = backend
+        self.compute_type = compute_type
+        self.model_name = model_name
+        self.task = task
+        self.threads_per_worker = threads_per_worker
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.warmup = warmup
+        self.worker_target = worker_target or _worker_main  # tests swap in a model-free worker
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+
+        self._ctx = mp.get_context("spawn")
+        self._results = None
+        # Per worker slot: its process, job queue, generation, job it is running and when it may be respawned
+        self._processes: List[Optional[mp.Process]] = []
+        self._job_queues: list = []
+        self._generations: List[int] = []
+        self._assigned: Dict[int, int] = {}  # slot -> job_id
+        self._restart_at: List[float] = []
+        self._restart_delay: List[float] = []
+        self._free: Deque[int] = deque()  # slots with a loaded model and nothing to do
+
+        self._pending: "OrderedDict[str, Deque[tuple]]" = OrderedDict()
+        self._futures: Dict[int, tuple] = {}  # job_id -> (future, session_id, submitted_at)
+        self._ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self._running = False
+        self._start_lock = threading.Lock()
+
+        # Metrics
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._restarts = 0
+        self._ready_workers = 0
+        self._load_seconds: List[float] = []
+        self._latencies: Deque[tuple] = deque(maxlen=500)  # (wait_seconds, inference_seconds)
+
+    def start(self):
+        # Safe to call on every new session: only the first call spawns workers, which load in the background
+        with self._start_lock:
+            if self._running:
+                return
+            self._running = True
+            self._results = self._ctx.Queue()
+            self._processes = [None] * self.num_workers
+            self._job_queues = [None] * self.num_workers
+            self._generations = [0] * self.num_workers
+            self._restart_at = [0.0] * self.num_workers
+            self._restart_delay = [self.restart_backoff] * self.num_workers
+            for slot in range(self.num_workers):
+                self._spawn(slot)
+            threading.Thread(target=self._dispatch_loop, name="transcription-dispatch", daemon=True).start()
+            threading.Thread(target=self._collect_loop, name="transcription-collect", daemon=True).start()
+
+    def _spawn(self, slot: int):
+        self._generations[slot] += 1
+        self._job_queues[slot] = self._ctx.Queue()
+        p = self._ctx.Process(
+            target=self.worker_target,
+            args=((slot, self._generations[slot]), self.backend, self.model_name, self.task, self.threads_per_worker,
+                  self.compute_type, self.warmup, self._job_queues[slot], self._results),
+            name=f"whisper-worker-{slot}",
+            daemon=True,
+        )
+        p.start()
+        self._processes[slot] = p
+
+    def _check_workers(self):
+        # Called with the lock held: fail the job of any worker that exited and start a replacement
+        now = time.monotonic()
+        for slot, p in enumerate(self._processes):
+            if p is not None and not p.is_alive():
+                logging.warning(f"Transcription worker {slot} exited (code {p.exitcode}); restarting in {self._restart_delay[slot]:.1f}s")
+                self._processes[slot] = None
+                self._restart_at[slot] = now + self._restart_delay[slot]
+                # Doubles until the worker reports ready, so a model that can't load doesn't spin
+                self._restart_delay[slot] = min(self._restart_delay[slot] * 2, self.max_restart_backoff)
+                if slot in self._free:
+                    self._free.remove(slot)
+                    self._ready_workers -= 1
+                elif slot in self._assigned:
+                    self._ready_workers -= 1
+                job_id = self._assigned.pop(slot, None)
+                if job_id is not None:
+                    self._in_flight -= 1
+                    self._failed += 1
+                    entry = self._futures.pop(job_id, None)
+                    if entry and not entry[0].done():
+                        entry[0].set_exception(TranscriptionWorkerDied(f"Transcription worker {slot} died running job {job_id}"))
+            if self._processes[slot] is None and self._running and now >= self._restart_at[slot]:
+                self._restarts += 1
+                self._spawn(slot)
+
+    @property
+    def label(self) -> str:
+        # Stage detail for /metrics, e.g. "faster-whisper:small"
+        return f"{self.backend}:{self.model_name}"
+
+    @property
+    def started(self) -> bool:
+        return self._running
+
+    @property
+    def ready(self) -> bool:
+        return self._running and self._ready_workers >= self.num_workers
+
+    def stop(self, timeout: float = 5.0):
+        with self._start_lock:
+            if not self._running:
+                return
+            self._running = False
+        with self._lock:
+            self._lock.notify_all()
+            processes = [(p, q) for p, q in zip(self._processes, self._job_queues) if p is not None]
+        for _, jobs in processes:
+            jobs.put(None)
+        for p, _ in processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._results.put(None)
+        # Fail anything still waiting so no caller blocks forever
+        with self._lock:
+            for future, _, _ in self._futures.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Transcription scheduler stopped"))
+            self._futures.clear()
+            self._pending.clear()
+            self._processes = []
+            self._assigned.clear()
+            self._free.clear()
+            self._queued = 0
+            self._in_flight = 0
+            self._ready_workers = 0
+
+    def submit(self, session_id: str, audio: np.ndarray, prompt: str = "") -> Future:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise TranscriptionQueueFull(f"Transcription queue is full ({self.max_queue} jobs)")
+            job_id = next(self._ids)
+            future: Future = Future()
+            self._futures[job_id] = (future, session_id, time.perf_counter())
+            self._pending.setdefault(session_id, deque()).append((job_id, audio, prompt))
+            self._queued += 1
+            self._lock.notify()
+        return future
+
+    def transcribe_fn(self, session_id: str) -> TranscribeFn:
+        # Blocking TranscribeFn for StreamingTranscriber that routes through the shared pool. A chunk that
+        # times out (queue wait included) or loses its worker raises instead of coming back empty, so the
+        # transcriber keeps its window and the caller can retry the same audio.
+        def transcribe(audio: np.ndarray, prompt: str) -> List[dict]:
+            future = self.submit(session_id, audio, prompt)
+            try:
+                return future.result(timeout=self.job_timeout)
+            except FutureTimeout:
+                self._abandon(future)
+                raise TranscriptionTimeout(f"Transcription chunk for session {session_id} timed out after {self.job_timeout}s")
+        return transcribe
+
+    def _abandon(self, future: Future):
+        # Drop a job nobody is waiting for; if it is still queued it never reaches a worker
+        with self._lock:
+            self._timed_out += 1
+            for job_id, entry in list(self._futures.items()):
+                if entry[0] is future:
+                    del self._futures[job_id]
+                    queue = self._pending.get(entry[1])
+                    if queue:
+                        kept = deque(job for job in queue if job[0] != job_id)
+                        self._queued -= len(queue) - len(kept)
+                        if kept:
+                            self._pending[entry[1]] = kept
+                        else:
+                            del self._pending[entry[1]]
+                    break
+
+    def _next_job(self):
+        # Round robin: take one job from the least recently served session, then move it to the back
+        for session_id in list(self._pending):
+            queue = self._pending[session_id]
+            if queue:
+                job = queue.popleft()
+                self._pending.move_to_end(session_id)
+                if not queue:
+                    del self._pending[session_id]
+                return job
+            del self._pending[session_id]
+        return None
+
+    def _dispatch_loop(self):
+        while self._running:
+            # Hold jobs in the fair queue until a worker is actually free; worker health is checked every wake-up
+            with self._lock:
+                self._check_workers()
+                job = self._next_job() if self._free else None
+                if job is None:
+                    self._lock.wait(0.5)
+                    continue
+                slot = self._free.popleft()
+                self._assigned[slot] = job[0]
+                self._queued -= 1
+                self._in_flight += 1
+                jobs = self._job_queues[slot]
+            jobs.put(job)
+
+    def _collect_loop(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            (slot, generation), job_id, segments, error, inference_seconds = item
+            with self._lock:
+                if not self._running or generation != self._generations[slot] or self._processes[slot] is None:
+                    continue  # from a worker that has since been replaced
+                if job_id == "ready":
+                    self._ready_workers += 1
+                    self._load_seconds.append(inference_seconds)
+                    self._restart_delay[slot] = self.restart_backoff
+                    self._free.append(slot)
+                    self._lock.notify_all()
+                    continue
+                if self._assigned.get(slot) != job_id:
+                    continue
+                del self._assigned[slot]
+                self._free.append(slot)
+                self._lock.notify_all()
+                self._in_flight -= 1
+                entry = self._futures.pop(job_id, None)
+                if entry:
+                    wait_seconds = time.perf_counter() - entry[2] - inference_seconds
+                    self._latencies.append((wait_seconds, inference_seconds))
+                    observe_stage("whisper_queue_wait", wait_seconds, self.label)
+                    observe_stage("whisper_transcribe", inference_seconds, self.label)
+                    if error:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+
+            if entry is None or entry[0].done():
+                continue
+            if error:
+                logging.warning(f"Transcription job {job_id} for session {entry[1]} failed: {error}")
+                entry[0].set_exception(RuntimeError(error))
+            else:
+                entry[0].set_result(segments)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            data = {
+                "workers": self.num_workers,
+                "backend": self.backend,
+                "model": self.model_name,
+                "compute_type": self.compute_type if self.backend == "faster-whisper" else "float32",
+                "workers_ready": self._ready_workers,
+                "started": self._running,
+                "worker_load_seconds": list(self._load_seconds),
+                "queue_depth": self._queued,
+                "queue_capacity": self.max_queue,
+                "in_flight": self._in_flight,
+                "active_sessions": len(self._pending),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "worker_restarts": self._restarts,
+            }
+        if latencies:
+            totals = sorted(w + i for w, i in latencies)
+            data["latency_seconds"] = {
+                "avg_wait": sum(w for w, _ in latencies) / len(latencies),
+                "avg_inference": sum(i for _, i in latencies) / len(latencies),
+                "p50": totals[len(totals) // 2],
+                "p95": totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+                "max": totals[-1],
+            }
+        return data
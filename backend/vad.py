@@ -0,0 +1,141 @@
+import threading
+from collections import deque
+from typing import Deque, Optional
+
+import numpy as np
+
+from transcription import AudioRingBuffer
+
+
+class VoiceGate:
+    """
+    Energy-based voice activity gate in front of a session's AudioRingBuffer.
+
+    Captured audio is cut into short frames and each frame's level is compared with an adaptive noise
+    floor. Speech (plus a short pre-roll before it starts and a hangover after it stops, so soft onsets
+    and word endings survive) is written to the buffer; the silence between utterances is dropped and
+    never reaches Whisper. The buffer position where each utterance ends is kept as a boundary, so the
+    transcriber can commit there instead of waiting for more audio.
+    """
+
+    def __init__(
+        self,
+        buffer: AudioRingBuffer,
+        frame_ms: float = 30.0,
+        threshold_db: float = 10.0,
+        min_level_db: float = -50.0,
+        start_ms: float = 90.0,
+        hangover_ms: float = 600.0,
+        preroll_ms: float = 300.0,
+        floor_adapt: float = 0.05,
+        enabled: bool = True,
+    ):
+        self.buffer = buffer
+        self.enabled = enabled
+        self.frame = int(buffer.sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db  # how far above the noise floor counts as speech
+        self.min_level_db = min_level_db  # and never below this absolute level (dBFS)
+        self.start_frames = max(1, round(start_ms / frame_ms))
+        self.hangover_frames = max(1, round(hangover_ms / frame_ms))
+        self.floor_adapt = floor_adapt
+        self.noise_floor_db: Optional[float] = None
+        self.speaking = False
+        self.utterances = 0
+        self.total_samples = 0
+        self.voiced_samples = 0
+
+        self._preroll: Deque[np.ndarray] = deque(maxlen=max(self.start_frames, round(preroll_ms / frame_ms)))
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._boundary: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def write_pcm16(self, data: bytes):
+        # Raw 16-bit little endian PCM (what pyaudio.paInt16 produces) -> float32 in [-1, 1]
+        self.write(np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0)
+
+    def write(self, samples: np.ndarray):
+        samples = np.asarray(samples, dtype=np.float32)
+        with self._lock:
+            self.total_samples += len(samples)
+            if not self.enabled:
+                self._emit(samples)
+                return
+            samples = np.concatenate((self._remainder, samples)) if len(self._remainder) else samples
+            usable = len(samples) - len(samples) % self.frame
+            self._remainder = samples[usable:].copy()
+            if not usable:
+                return
+            frames = samples[:usable].reshape(-1, self.frame)
+            levels = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+            for frame, level in zip(frames, levels):
+                self._step(frame, float(level))
+
+    def _step(self, frame: np.ndarray, level: float):
+        if self.noise_floor_db is None:
+            self.noise_floor_db = level
+        voiced = level > max(self.noise_floor_db + self.threshold_db, self.min_level_db)
+        if not voiced:
+            # Follow the floor down immediately and up slowly, so a burst of speech doesn't raise it
+            if level < self.noise_floor_db:
+                self.noise_floor_db = level
+            else:
+                self.noise_floor_db += self.floor_adapt * (level - self.noise_floor_db)
+
+        if not self.speaking:
+            self._preroll.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                # Speech confirmed: send it along with the quiet lead-in that preceded it
+                self.speaking = True
+                self._silent_run = 0
+                self._emit(np.concatenate(self._preroll))
+                self._preroll.clear()
+            return
+
+        self._emit(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.hangover_frames:
+            self.speaking = False
+            self._voiced_run = 0
+            self.utterances += 1
+            self._boundary = self.buffer.written
+
+    def _emit(self, samples: np.ndarray):
+        self.voiced_samples += len(samples)
+        self.buffer.write(samples)
+
+    def flush(self):
+        # Recording stopped: keep a word that was still being confirmed (or cut off mid-frame)
+        with self._lock:
+            if self.speaking and len(self._remainder):
+                self._emit(self._remainder)
+            elif not self.speaking and self._voiced_run:
+                self._emit(np.concatenate(list(self._preroll)[-self._voiced_run:]))
+            self._remainder = np.zeros(0, dtype=np.float32)
+            self._preroll.clear()
+            self._voiced_run = 0
+
+    def pop_boundary(self) -> Optional[int]:
+        # Buffer index where the most recent finished utterance ends, once
+        with self._lock:
+            boundary, self._boundary = self._boundary, None
+            return boundary
+
+    def push_boundary(self, boundary: int):
+        # Puts back a boundary whose step failed; a newer one already covers it
+        with self._lock:
+            if self._boundary is None:
+                self._boundary = boundary
+
+    def metrics(self) -> dict:
+        with self._lock:
+            rate = self.buffer.sample_rate
+            return {
+                "audio_seconds": self.total_samples / rate,
+                "voiced_seconds": self.voiced_samples / rate,
+                "skipped_fraction": 1 - self.voiced_samples / self.total_samples if self.total_samples else 0.0,
+                "utterances": self.utterances,
+                "noise_floor_db": self.noise_floor_db,
+            }
@@ -1,31 +1,22 @@
 // app/dashboard.tsx
 import { useEffect, useState } from "react";
-import { View, Text, useWindowDimensions, StyleSheet } from "react-native";
+import { View, Text, TextInput, useWindowDimensions, StyleSheet } from "react-native";
 import DocsPanel from "@/components/DocumentationPanel";
 import PatientScroll from "@/components/PatientScroll";
 import { apiFetch } from "@/lib/api";
 import { COLORS } from "@/constants/colors";
 import { Patient } from "@/constants/types";
 import DocumentationModal from "@/components/DocumentationModal";
+import usePatientSearch from "@/hooks/usePatientSearch";
 
 export default function Dashboard() {
     const { width } = useWindowDimensions();
     const isTablet = width > 768;
-    const [patients, setPatients] = useState<any[]>([]);
+    const { query, setQuery, patients } = usePatientSearch();
     const [selectedPatient, setSelectedPatient] = useState<any | null>(null);
     const [documentationPatient, setDocumentationPatient] = useState<Patient | null>();
     const [patientSummary, setPatientSummary] = useState<string | null>(null);
 
-    const fetchPatients = async () => {
-        try {
-            const res = await apiFetch("http://localhost:8000/patients");
-            const data = await res.json();
-            setPatients(data?.patients ?? []);
-        } catch (err) {
-            console.error("Error fetching patients:", err);
-        }
-    };
-
     const fetchAndSetPatientSummary = async () => {
         let data = 'No Summary Data.';
         try {
@@ -42,10 +33,6 @@ export default function Dashboard() {
     };
 
 
-    useEffect(() => {
-        fetchPatients();
-    }, []);
-
     useEffect(() => {
         if (documentationPatient != null) {
             console.log(documentationPatient)
@@ -57,6 +44,8 @@ export default function Dashboard() {
         <View style={styles.screen}>
             <MainLayout
                 patients={patients}
+                query={query}
+                setQuery={setQuery}
                 isTablet={isTablet}
                 selectedPatient={selectedPatient}
                 setSelectedPatient={setSelectedPatient}
@@ -69,13 +58,15 @@ export default function Dashboard() {
 
 interface MainLayoutProps {
     patients: any[];
+    query: string;
+    setQuery: (q: string) => void;
     isTablet: boolean;
     selectedPatient: any | null;
     setSelectedPatient: (p: Patient) => void;
     loadPatientDocs: (p: Patient) => void;
 }
 
-function MainLayout({ patients, isTablet, selectedPatient, setSelectedPatient, loadPatientDocs }: MainLayoutProps) {
+function MainLayout({ patients, query, setQuery, isTablet, selectedPatient, setSelectedPatient, loadPatientDocs }: MainLayoutProps) {
     const flexDirection = isTablet ? "row" : "column";
 
     return (
@@ -93,6 +84,15 @@ function MainLayout({ patients, isTablet, selectedPatient, setSelectedPatient, l
                 flexShrink: 1,
             }}>
                 <Text style={{ fontSize: 18, fontWeight: "bold", marginBottom: 10 }}>Patients</Text>
+                <TextInput
+                    style={styles.search}
+                    placeholder="Search by name or ID"
+                    placeholderTextColor="#999"
+                    autoCapitalize="none"
+                    autoCorrect={false}
+                    value={query}
+                    onChangeText={setQuery}
+                />
 
                 <View style={{ flex: 1, minHeight: 0 }}>
                     <PatientScroll patients={patients} onSelectPatient={setSelectedPatient} loadDocs={loadPatientDocs} />
@@ -115,4 +115,5 @@ const styles = StyleSheet.create({
     screen: { flex: 1, minHeight: 0, backgroundColor: COLORS.background, position: "relative" },
     container: { flex: 1, padding: 20, gap: 20, minHeight: 0 },
     title: { fontSize: 18, fontWeight: "bold", marginBottom: 10, flexShrink: 1 },
+    search: { backgroundColor: COLORS.light, padding: 10, borderRadius: 10, marginBottom: 10 },
 });
@@ -1,30 +1,25 @@
-import { Text, ScrollView, View } from "react-native";
+import { Text, TextInput, ScrollView, View } from "react-native";
 import * as colors from "@/constants/colors";
-import { useEffect, useState } from "react";
-import { apiFetch } from "@/lib/api";
+import usePatientSearch from "@/hooks/usePatientSearch";
 
 export default function PatientScroll() {
-    const [patients, setPatients] = useState<any[]>([]);
-    const fetchPatients = async () => {
-        try {
-            const res = await apiFetch("http://localhost:8000/patients");
-            const data = await res.json();
-            setPatients(data?.patients ?? []);
-        } catch (err) {
-            console.error("Error fetching patients:", err);
-        }
-    };
-
-    useEffect(() => {
-        fetchPatients();
-    }, []);
+    const { query, setQuery, patients } = usePatientSearch();
 
     return (
-        <ScrollView style={{ padding: 2, flex: 1 }} contentContainerStyle={{ padding: 20 }}>
+        <ScrollView style={{ padding: 2, flex: 1 }} contentContainerStyle={{ padding: 20 }} keyboardShouldPersistTaps="handled">
+            <TextInput
+                style={{ backgroundColor: colors.COLORS.light, padding: 10, borderRadius: 10, marginBottom: 10 }}
+                placeholder="Search by name or ID"
+                placeholderTextColor="#999"
+                autoCapitalize="none"
+                autoCorrect={false}
+                value={query}
+                onChangeText={setQuery}
+            />
             {patients && patients.length > 0 ? (
                 patients.map((p: any) => (
                     <View
-                        key={p.ID}
+                        key={p.Id}
                         style={{
                             backgroundColor: colors.COLORS.primary,
                             padding: 15,
@@ -54,10 +54,16 @@ export default function DocsPanel({ selectedPatient }: DocumentationPanelProps)
     const startRecording = async (label: string) => {
         try{
             updateRecordingState(true);
-            const response = await fetch('http://127.0.0.1:8000/start-recording', { //TODO: change localhost url to supabase url
+            const response = await apiFetch('http://127.0.0.1:8000/start-recording', { //TODO: change localhost url to supabase url
                 method: 'POST',
             });
             const result = await response.json();
+            if (response.status === 429 || response.status === 503) {
+                // Rate limited or the server is busy; Retry-After says when to try again
+                updateRecordingState(false);
+                alert(`${result?.detail ?? "Server is busy"} (retry in ${response.headers.get("Retry-After") ?? "a few"}s)`);
+                return;
+            }
             setSession(result["session_id"]); // This will not set the session ID for readTranscription
             readTranscription(label, result["session_id"]); // We have to manually send it over
         } catch (error) {
@@ -65,31 +71,60 @@ export default function DocsPanel({ selectedPatient }: DocumentationPanelProps)
         }
     };
 
-    //Read transcription from backend while recording
-    const readTranscription = async (label: string, sessionID: string) => {
-        try{
-            while(recordingStateRef.current){
-                const response = await fetch(`http://127.0.0.1:8000/read-transcription/${sessionID}`, { //TODO: change localhost url to supabase url
-                method: 'GET',
-                });
-                const result = await response.json();
-                if (label === "Situation") {
-                    setSituation(result["transcription"]);
-                }
-                else if (label === "Background") {
-                    setBackground(result["transcription"]);
-                }
-                else if (label === "Assessment") {
-                    setAssessment(result["transcription"]);
+    //Read transcription from backend while recording. The server pushes new segments over a
+    //WebSocket; on a dropped connection we reconnect and resume after the last segment received.
+    const readTranscription = (label: string, sessionID: string) => {
+        const segments: string[] = [];
+        let partial = "";
+
+        const setField = (text: string) => {
+            if (label === "Situation") {
+                setSituation(text);
+            }
+            else if (label === "Background") {
+                setBackground(text);
+            }
+            else if (label === "Assessment") {
+                setAssessment(text);
+            }
+            else {
+                setRecommendation(text);
+            }
+        };
+
+        const connect = () => {
+            const socket = new WebSocket(`ws://127.0.0.1:8000/ws/transcription/${sessionID}?after=${segments.length}`); //TODO: change localhost url to supabase url
+            let done = false;
+
+            socket.onmessage = (event) => {
+                const update = JSON.parse(event.data);
+                if (update.type === "segment") {
+                    segments[update.seq - 1] = update.text;
+                    partial = "";
+                } else if (update.type === "partial") {
+                    partial = update.text;
+                } else if (update.type === "done") {
+                    done = true;
+                    partial = "";
+                } else {
+                    return;
                 }
-                else {
-                    setRecommendation(result["transcription"]);
+                setField([...segments, partial].filter(Boolean).join(" "));
+            };
+
+            socket.onerror = (error) => {
+                console.error('Problem reading transcription', error);
+            };
+
+            socket.onclose = async () => {
+                if (!done && recordingStateRef.current) {
+                    await delay(1000);
+                    connect();
                 }
-                await delay(5000); // Wait a bit for whisper's analysis before reading-transcription again
-            }
-        } catch (error) {
-            console.error('Problem reading transcription', error);
-        }
+            };
+        };
+
+        connect();
     };
 
     //Tell backend to stop recording when button toggled
@@ -182,7 +217,9 @@ export default function DocsPanel({ selectedPatient }: DocumentationPanelProps)
             const data = await res.json();
             setLoading(false);
 
-            if (data?.summary) {
+            if (res.status === 429 || res.status === 503) {
+                setMessage(`${data?.detail ?? "Server is busy"}; try again in ${res.headers.get("Retry-After") ?? "a few"}s`);
+            } else if (data?.summary) {
                 setMessage(data.summary);
             } else {
                 setMessage("Error generating summary");
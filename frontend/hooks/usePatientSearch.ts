@@ -0,0 +1,36 @@
+import { useEffect, useRef, useState } from "react";
+import { apiFetch } from "@/lib/api";
+
+const SEARCH_DEBOUNCE_MS = 150;
+
+// Patient list with typeahead: an empty query shows the first page of /patients, anything else
+// asks the server's search index. Keystrokes are debounced and out-of-order replies are dropped.
+export default function usePatientSearch() {
+    const [query, setQuery] = useState("");
+    const [patients, setPatients] = useState<any[]>([]);
+    const [loading, setLoading] = useState(false);
+    const latest = useRef(0);
+
+    useEffect(() => {
+        const request = ++latest.current;
+        const q = query.trim();
+        const timer = setTimeout(async () => {
+            setLoading(true);
+            try {
+                const url = q
+                    ? `http://localhost:8000/patients/search?q=${encodeURIComponent(q)}&limit=25`
+                    : "http://localhost:8000/patients";
+                const res = await apiFetch(url);
+                const data = await res.json();
+                if (request === latest.current) setPatients(data?.patients ?? []);
+            } catch (err) {
+                console.error("Error fetching patients:", err);
+            } finally {
+                if (request === latest.current) setLoading(false);
+            }
+        }, q ? SEARCH_DEBOUNCE_MS : 0);
+        return () => clearTimeout(timer);
+    }, [query]);
+
+    return { query, setQuery, patients, loading };
+}